@@ -1,3 +1,11 @@
 """Embodied DataHub CLI - Upload and download robot datasets."""
 
 __version__ = "0.1.0"
+
+
+def __getattr__(name):
+    # Imported lazily so the CLI does not load pyarrow and the API client on startup
+    if name == "stream":
+        from .streaming import stream
+        return stream
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
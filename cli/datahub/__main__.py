@@ -0,0 +1,18 @@
+"""Entry point of the datahub command; commands go to the agent when one is running."""
+
+import sys
+
+from .agent import run_in_agent
+
+
+def main() -> None:
+    code = run_in_agent(sys.argv[1:])
+    if code is not None:
+        sys.exit(code)
+    
+    from .cli import main as cli_main
+    cli_main()
+
+
+if __name__ == "__main__":
+    main()
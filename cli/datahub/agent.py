@@ -0,0 +1,526 @@
+"""Background agent that serves CLI commands from one warm process (datahub agent)."""
+
+import contextvars
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from . import __version__
+from .config import CONFIG_DIR, ensure_config_dir
+
+AGENT_SOCKET = CONFIG_DIR / "agent.sock"
+AGENT_LOG = CONFIG_DIR / "agent.log"
+
+# Set to 0 to run every command in the calling process
+AGENT_ENV = "DATAHUB_AGENT"
+
+# Commands that prompt on the terminal or manage the agent itself
+LOCAL_COMMANDS = {"agent", "login", "logout", "config", "delete"}
+
+# Options that keep a command running until it is interrupted, or that
+# profile the process running the command
+LOCAL_OPTIONS = {"--watch", "--profile"}
+
+# Transfer workers shared by all commands the agent serves
+DEFAULT_AGENT_WORKERS = 16
+
+# Modules the commands import lazily; the agent imports them up front
+_WARM_MODULES = [
+    "rich.progress",
+    "rich.table",
+    "datahub.api",
+    "datahub.backfill",
+    "datahub.cache",
+    "datahub.catalog",
+    "datahub.cos",
+    "datahub.dataset_index",
+    "datahub.feature_stats",
+    "datahub.parquet_optimize",
+    "datahub.parquet_preview",
+    "pyarrow.parquet",
+]
+
+# Working directory of the client whose command is being served
+CLIENT_CWD: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("datahub_client_cwd", default=None)
+
+_client_console: "contextvars.ContextVar[Any]" = contextvars.ContextVar("datahub_client_console", default=None)
+_client_streams: "contextvars.ContextVar[Optional[Tuple[IO[str], IO[str]]]]" = contextvars.ContextVar(
+    "datahub_client_streams", default=None
+)
+
+
+def client_path(path: str) -> str:
+    """Resolve a path given on the command line against the caller's working directory."""
+    cwd = CLIENT_CWD.get()
+    return os.path.join(cwd, path) if cwd else path
+
+
+def _client_env() -> Dict[str, str]:
+    """DataHub and COS settings from the environment, which must match between client and agent."""
+    return {
+        key: value for key, value in os.environ.items()
+        if key.startswith(("DATAHUB_", "COS_")) and key != AGENT_ENV
+    }
+
+
+def _connect() -> Optional[socket.socket]:
+    """Connect to the agent socket, or None if no agent is running."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(AGENT_SOCKET))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _send(sock: socket.socket, message: Dict[str, Any]) -> None:
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def run_in_agent(argv: List[str]) -> Optional[int]:
+    """
+    Run a command in the agent, if one is running and can serve it.
+    
+    The command's output is copied to this process's stdout and stderr. On
+    Ctrl+C the client detaches; the agent finishes the command.
+    
+    Args:
+        argv: Command-line arguments (without the program name)
+        
+    Returns:
+        Exit code of the command, or None to run it in this process
+    """
+    if os.environ.get(AGENT_ENV) == "0" or not argv or argv[0] in LOCAL_COMMANDS:
+        return None
+    if any(arg in LOCAL_OPTIONS for arg in argv):
+        return None
+    
+    sock = _connect()
+    if sock is None:
+        return None
+    
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": _client_env(),
+        "version": __version__,
+        "color": sys.stdout.isatty() and "NO_COLOR" not in os.environ,
+        "term": os.environ.get("TERM", ""),
+        "colorterm": os.environ.get("COLORTERM", ""),
+        "width": shutil.get_terminal_size().columns,
+    }
+    
+    try:
+        with sock, sock.makefile("rb") as replies:
+            _send(sock, request)
+            for line in replies:
+                reply = json.loads(line)
+                if "out" in reply:
+                    sys.stdout.write(reply["out"])
+                    sys.stdout.flush()
+                elif "err" in reply:
+                    sys.stderr.write(reply["err"])
+                    sys.stderr.flush()
+                elif "exit" in reply:
+                    return reply["exit"]
+                elif "fallback" in reply:
+                    # Sent before any output, e.g. for a different DATAHUB_* environment
+                    return None
+    except KeyboardInterrupt:
+        sys.stderr.write(f"\nDetached; the agent finishes the command (log: {AGENT_LOG})\n")
+        return 130
+    except OSError as e:
+        sys.stderr.write(f"Error: Lost connection to the agent: {e}\n")
+        return 1
+    
+    sys.stderr.write("Error: The agent closed the connection\n")
+    return 1
+
+
+def request_agent(control: str) -> Optional[Dict[str, Any]]:
+    """
+    Send a control request ("status" or "stop") to the agent.
+    
+    Returns:
+        The agent's reply, or None if no agent is running
+    """
+    sock = _connect()
+    if sock is None:
+        return None
+    try:
+        with sock, sock.makefile("rb") as replies:
+            _send(sock, {"control": control})
+            line = replies.readline()
+    except OSError:
+        return None
+    return json.loads(line) if line else None
+
+
+def start_agent(workers: int = DEFAULT_AGENT_WORKERS, preview_workers: Optional[int] = None, timeout: float = 30.0) -> int:
+    """
+    Start the agent in the background and wait until it accepts commands.
+    
+    Args:
+        workers: Transfer workers shared by all commands
+        preview_workers: Number of parquet preview processes
+        timeout: Seconds to wait for the agent
+        
+    Returns:
+        Process ID of the agent
+    """
+    import subprocess
+    
+    ensure_config_dir()
+    command = [sys.executable, "-m", "datahub", "agent", "start", "--foreground", "--workers", str(workers)]
+    if preview_workers:
+        command += ["--preview-workers", str(preview_workers)]
+    
+    with open(AGENT_LOG, "ab") as log:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Agent exited with code {process.returncode}; see {AGENT_LOG}")
+        status = request_agent("status")
+        if status:
+            return status["pid"]
+        time.sleep(0.1)
+    raise RuntimeError(f"Agent did not start within {timeout:g}s; see {AGENT_LOG}")
+
+
+class _ClientConnection:
+    """Sends a command's output and exit code to a client as JSON lines."""
+    
+    def __init__(self, sock: socket.socket):
+        self._sock = sock
+        self._lock = threading.Lock()
+        self.closed = False
+    
+    def send(self, **message: Any) -> None:
+        data = json.dumps(message).encode() + b"\n"
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self._sock.sendall(data)
+            except OSError:
+                # The client went away (e.g. Ctrl+C); the command still runs
+                # to completion, without output
+                self.closed = True
+
+
+class _ClientStream(io.TextIOBase):
+    """A client's stdout or stderr."""
+    
+    encoding = "utf-8"
+    errors = "strict"
+    
+    def __init__(self, connection: _ClientConnection, name: str):
+        self._connection = connection
+        self._name = name
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, text: str) -> int:
+        if not isinstance(text, str):
+            # Also tells click this is a text stream, not a binary one
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        if text:
+            self._connection.send(**{self._name: text})
+        return len(text)
+
+
+class _StreamRouter:
+    """Stands in for sys.stdout or sys.stderr: writes to the client being served, else to the log."""
+    
+    def __init__(self, default: IO[str], index: int):
+        self._default = default
+        self._index = index
+    
+    def _target(self) -> IO[str]:
+        streams = _client_streams.get()
+        return streams[self._index] if streams else self._default
+    
+    def write(self, text: str) -> int:
+        return self._target().write(text)
+    
+    def flush(self) -> None:
+        self._target().flush()
+    
+    def isatty(self) -> bool:
+        return self._target().isatty()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target(), name)
+
+
+class _ConsoleRouter:
+    """Stands in for the CLI's console: forwards to the console of the client being served, else to the log."""
+    
+    def __init__(self, default: Any):
+        self._default = default
+    
+    def _target(self) -> Any:
+        return _client_console.get() or self._default
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target(), name)
+    
+    def __enter__(self) -> Any:
+        return self._target().__enter__()
+    
+    def __exit__(self, *exc_info) -> Any:
+        return self._target().__exit__(*exc_info)
+
+
+def _color_system(request: Dict[str, Any]) -> Optional[str]:
+    """Rich color system for the client's terminal."""
+    if not request.get("color"):
+        return None
+    if request.get("colorterm") in ("truecolor", "24bit"):
+        return "truecolor"
+    if "256color" in request.get("term", ""):
+        return "256"
+    return "standard"
+
+
+class Agent:
+    """
+    Serves CLI commands from one long-running process.
+    
+    Every command runs on its own thread with the agent's warm state: SDKs
+    already imported, keep-alive API and COS connection pools, a running
+    parquet preview process pool, and one TransferScheduler that all
+    uploads and downloads share, so transfers of concurrent callers are
+    interleaved instead of competing for bandwidth. Output goes back to the
+    calling client over the Unix socket.
+    
+    Progress bars are printed when each step finishes rather than redrawn
+    while it runs.
+    """
+    
+    def __init__(self, workers: int = DEFAULT_AGENT_WORKERS, preview_workers: Optional[int] = None):
+        """
+        Args:
+            workers: Transfer workers shared by all commands
+            preview_workers: Number of parquet preview processes (default: CPU count)
+        """
+        self.workers = workers
+        self.preview_workers = preview_workers
+        self.started = time.time()
+        self.served = 0
+        self._active: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler = None
+    
+    def status(self) -> Dict[str, Any]:
+        """Get the agent's process ID, uptime, and running commands."""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "version": __version__,
+                "uptime": time.time() - self.started,
+                "workers": self.workers,
+                "served": self.served,
+                "active": [" ".join(argv) for argv in self._active.values()],
+                "queuedTransfers": self._scheduler.pending() if self._scheduler else 0,
+            }
+    
+    def stop(self) -> None:
+        """Stop accepting commands; serve_forever returns once running commands finish."""
+        self._stop.set()
+    
+    def serve_forever(self) -> None:
+        """Listen on the agent socket and serve commands until stopped."""
+        import importlib
+        import signal
+        
+        from . import cli
+        from .cos import create_preview_executor, set_shared_preview_executor
+        from .scheduler import TransferScheduler, set_shared_scheduler
+        
+        for module in _WARM_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+                
+        server = self._listen()
+        self._scheduler = TransferScheduler(max_workers=self.workers)
+        preview_executor = create_preview_executor(self.preview_workers)
+        set_shared_scheduler(self._scheduler)
+        set_shared_preview_executor(preview_executor)
+        
+        default_console = cli.console
+        default_streams = sys.stdout, sys.stderr
+        cli.console = _ConsoleRouter(default_console)
+        sys.stdout = _StreamRouter(default_streams[0], 0)
+        sys.stderr = _StreamRouter(default_streams[1], 1)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        
+        self._log(f"Agent {os.getpid()} listening on {AGENT_SOCKET}")
+        threads: List[threading.Thread] = []
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                except KeyboardInterrupt:
+                    break
+                thread = threading.Thread(target=self._handle, args=(conn,), name="datahub-agent-client", daemon=True)
+                thread.start()
+                threads = [t for t in threads if t.is_alive()] + [thread]
+        finally:
+            server.close()
+            try:
+                os.unlink(AGENT_SOCKET)
+            except OSError:
+                pass
+            for thread in threads:
+                thread.join()
+            set_shared_scheduler(None)
+            set_shared_preview_executor(None)
+            self._scheduler.shutdown()
+            preview_executor.shutdown()
+            cli.console = default_console
+            sys.stdout, sys.stderr = default_streams
+            self._log(f"Agent {os.getpid()} stopped after {self.served} commands")
+    
+    def _listen(self) -> socket.socket:
+        """Bind the agent socket (readable by this user only)."""
+        ensure_config_dir()
+        if request_agent("status"):
+            raise RuntimeError("An agent is already running")
+        if AGENT_SOCKET.exists():
+            # Left behind by an agent that did not shut down cleanly
+            AGENT_SOCKET.unlink()
+        
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(str(AGENT_SOCKET))
+        finally:
+            os.umask(old_umask)
+        server.listen(64)
+        # Wake up regularly to notice stop requests
+        server.settimeout(0.5)
+        return server
+    
+    def _log(self, message: str) -> None:
+        stream = sys.__stderr__
+        if stream is not None:
+            stream.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}\n")
+            stream.flush()
+    
+    def _handle(self, sock: socket.socket) -> None:
+        """Serve one client connection."""
+        sock.settimeout(None)
+        connection = _ClientConnection(sock)
+        try:
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            
+            control = request.get("control")
+            if control == "status":
+                connection.send(**self.status())
+            elif control == "stop":
+                self.stop()
+                connection.send(**self.status())
+            elif request.get("version") != __version__:
+                connection.send(fallback=f"agent runs version {__version__}")
+            elif request.get("env") != _client_env():
+                connection.send(fallback="DATAHUB_* or COS_* environment differs from the agent's")
+            else:
+                code = self._run_command(request, connection)
+                connection.send(exit=code)
+        except Exception as e:
+            self._log(f"Failed to serve a client: {e}")
+        finally:
+            sock.close()
+    
+    def _run_command(self, request: Dict[str, Any], connection: _ClientConnection) -> int:
+        """Run a CLI command with its output going to the client."""
+        import traceback
+        
+        import click
+        from rich.console import Console
+        
+        from . import cli
+        
+        argv = request["argv"]
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = argv
+        
+        stdout = _ClientStream(connection, "out")
+        stderr = _ClientStream(connection, "err")
+        CLIENT_CWD.set(request["cwd"])
+        _client_streams.set((stdout, stderr))
+        _client_console.set(Console(
+            file=stdout,
+            width=request.get("width") or 80,
+            color_system=_color_system(request),
+            force_terminal=False,
+            force_interactive=False,
+        ))
+        
+        started = time.monotonic()
+        try:
+            result = cli.main.main(args=argv, prog_name="datahub", standalone_mode=False)
+            code = result if isinstance(result, int) else 0
+        except click.ClickException as e:
+            e.show(file=stderr)
+            code = e.exit_code
+        except click.Abort:
+            stderr.write("Aborted!\n")
+            code = 1
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                stderr.write(f"{e.code}\n")
+                code = 1
+        except Exception:
+            traceback.print_exc(file=stderr)
+            code = 1
+        finally:
+            with self._lock:
+                del self._active[ident]
+                self.served += 1
+        
+        self._log(f"datahub {' '.join(argv)} -> {code} ({time.monotonic() - started:.2f}s)")
+        return code
+
+
+def serve(workers: int = DEFAULT_AGENT_WORKERS, preview_workers: Optional[int] = None) -> None:
+    """
+    Run the agent in this process until it is stopped.
+    
+    Args:
+        workers: Transfer workers shared by all commands
+        preview_workers: Number of parquet preview processes (default: CPU count)
+    """
+    Agent(workers, preview_workers).serve_forever()
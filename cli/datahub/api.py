@@ -1,10 +1,53 @@
 """API client for DataHub CLI."""
 
-from typing import Any, Dict, List, Optional
+import contextlib
+import gzip
+import hashlib
+import http.cookiejar
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from .config import get_api_url, get_token
+from .config import CONFIG_DIR, get_api_url, get_token
+from .manifest import iter_chunks
+from .profiling import timer
+
+# Target uncompressed size of each upload_complete manifest chunk
+MANIFEST_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Directory of ETag-validated GET responses
+RESPONSE_CACHE_DIR = CONFIG_DIR / "responses"
+
+# Retry policy for idempotent requests
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Get the keep-alive connection pool shared by all API clients of the process."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            # Clients authenticate with their own token; a login cookie kept
+            # here would outlive `datahub logout`
+            _session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
 
 
 class APIError(Exception):
@@ -22,6 +65,9 @@ class APIClient:
     def __init__(self):
         self.base_url = get_api_url()
         self.token = get_token()
+        # Keep-alive connections are reused across clients, so commands
+        # served by the agent skip the TCP and TLS handshakes
+        self.session = _get_session()
     
     def _headers(self) -> Dict[str, str]:
         """Get request headers."""
@@ -36,18 +82,66 @@ class APIClient:
         endpoint: str,
         data: Optional[Dict] = None,
         params: Optional[Dict] = None,
+        compress: bool = False,
+        timeout: int = 30,
+        retry: Optional[bool] = None,
+        cache: bool = False,
     ) -> Any:
-        """Make an API request."""
+        """
+        Make an API request, optionally with a gzip-compressed JSON body.
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint below /api
+            data: JSON body
+            params: Query parameters
+            compress: Send the body gzip-compressed
+            timeout: Request timeout in seconds
+            retry: Retry connection errors and 429/5xx responses with
+                exponential backoff (default: only for idempotent methods)
+            cache: Keep the response on disk and revalidate it with
+                If-None-Match on later calls (GET only)
+        """
         url = f"{self.base_url}/api{endpoint}"
+        headers = self._headers()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
         
-        response = requests.request(
-            method=method,
-            url=url,
-            headers=self._headers(),
-            json=data,
-            params=params,
-            timeout=30,
-        )
+        body = None
+        if data is not None and compress:
+            body = gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+            headers["Content-Encoding"] = "gzip"
+        
+        cache_path = self._cache_path(url, params) if cache and method == "GET" else None
+        cached = _read_cached_response(cache_path) if cache_path else None
+        if cached is not None:
+            headers["If-None-Match"] = cached["etag"]
+        
+        attempt = 0
+        while True:
+            try:
+                with timer(f"api.{method}"):
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        json=data if body is None else None,
+                        data=body,
+                        params=params,
+                        timeout=timeout,
+                    )
+                if not (retry and response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES):
+                    break
+                delay = _retry_delay(attempt, response.headers.get("Retry-After"))
+            except (requests.ConnectionError, requests.Timeout):
+                if not retry or attempt >= MAX_RETRIES:
+                    raise
+                delay = _retry_delay(attempt)
+            time.sleep(delay)
+            attempt += 1
+        
+        if response.status_code == 304 and cached is not None:
+            return cached["body"]
         
         if response.status_code >= 400:
             try:
@@ -59,8 +153,18 @@ class APIClient:
         
         if response.status_code == 204:
             return None
-            
-        return response.json()
+        
+        result = response.json()
+        if cache_path and response.headers.get("ETag"):
+            _write_cached_response(cache_path, response.headers["ETag"], result)
+        return result
+    
+    def _cache_path(self, url: str, params: Optional[Dict]) -> str:
+        """Get the response cache file for a GET request."""
+        # Responses depend on who is asking, so each token gets its own entries
+        token_key = hashlib.sha256(self.token.encode("utf-8")).hexdigest() if self.token else None
+        key = json.dumps([url, sorted((params or {}).items()), token_key])
+        return str(RESPONSE_CACHE_DIR / (hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json.gz"))
     
     def login(self, username: str, password: str) -> str:
         """
@@ -95,7 +199,41 @@ class APIClient:
         Returns:
             List of dataset info
         """
-        return self._request("GET", "/datasets")
+        return self._request("GET", "/datasets", cache=True)
+    
+    def iter_datasets(
+        self,
+        page_size: int = 50,
+        fields: Optional[List[str]] = None,
+        **filters: Optional[str],
+    ) -> Iterator[List[Dict]]:
+        """
+        List datasets page by page.
+        
+        Args:
+            page_size: Datasets per page (max 200)
+            fields: Fields to return (default: all; id is always included)
+            **filters: Exact-match filters: author, robotType, taskType, format
+            
+        Yields:
+            Lists of dataset info, one per page
+        """
+        params: Dict[str, Any] = {k: v for k, v in filters.items() if v}
+        params["limit"] = page_size
+        if fields:
+            params["fields"] = ",".join(fields)
+        
+        while True:
+            page = self._request("GET", "/datasets", params=params)
+            if isinstance(page, list):
+                # Server without pagination support returned everything
+                yield page
+                return
+            if page["items"]:
+                yield page["items"]
+            if not page.get("hasMore") or not page.get("nextCursor"):
+                return
+            params["cursor"] = page["nextCursor"]
     
     def get_dataset(self, dataset_id: str) -> Dict:
         """
@@ -107,7 +245,7 @@ class APIClient:
         Returns:
             Dataset info
         """
-        return self._request("GET", f"/datasets/{dataset_id}")
+        return self._request("GET", f"/datasets/{dataset_id}", cache=True)
     
     def create_dataset(self, data: Dict) -> Dict:
         """
@@ -143,20 +281,113 @@ class APIClient:
         """
         self._request("DELETE", f"/datasets/{dataset_id}")
     
-    def upload_complete(self, dataset_id: str, files: List[Dict], total_size: int) -> Dict:
+    def upload_complete(
+        self,
+        dataset_id: str,
+        files: Iterable[Dict],
+        total_size: Optional[int],
+        aggregates: Optional[Dict] = None,
+        merge: bool = False,
+    ) -> Dict:
         """
         Notify the server that upload is complete.
         
+        The file manifest is sent as gzip-compressed chunks of bounded size
+        under a single upload ID, followed by a finalize request. Chunks and
+        finalize are idempotent, so any of them can be retried safely.
+        
         Args:
             dataset_id: Dataset ID
-            files: List of uploaded file info
+            files: Uploaded file info (a list or a ManifestSpool)
             total_size: Total size of all files
+            aggregates: Optional dataset fields derived from the data
+                (totalEpisodes, totalFrames, fps)
+            merge: Add the files to the dataset, replacing files with the
+                same path, instead of replacing its whole file list;
+                total_size is then the size of the whole dataset, and
+                None leaves the dataset size unchanged
             
         Returns:
             Updated dataset info
         """
+        endpoint = f"/datasets/{dataset_id}/upload-complete"
+        upload_id = uuid.uuid4().hex
+        
+        total_chunks = 0
+        for chunk in iter_chunks(files, max_bytes=MANIFEST_CHUNK_BYTES):
+            self._request(
+                "POST",
+                endpoint,
+                data={"uploadId": upload_id, "chunkIndex": total_chunks, "files": chunk},
+                compress=True,
+                retry=True,
+            )
+            total_chunks += 1
+        
         return self._request(
             "POST",
-            f"/datasets/{dataset_id}/upload-complete",
-            data={"files": files, "totalSize": total_size},
+            endpoint,
+            data={
+                "uploadId": upload_id,
+                "finalize": True,
+                "totalChunks": total_chunks,
+                **({"totalSize": total_size} if total_size is not None else {}),
+                "merge": merge,
+                **(aggregates or {}),
+            },
+            compress=True,
+            timeout=300,
+            retry=True,
         )
+    
+    def update_file_metadata(self, dataset_id: str, files: List[Dict]) -> Dict:
+        """
+        Set preview data and/or footer summaries of existing dataset files.
+        
+        Args:
+            dataset_id: Dataset ID
+            files: Entries with 'path' and optional 'previewData' and 'summary'
+            
+        Returns:
+            Server response with the number of updated files
+        """
+        return self._request(
+            "PATCH",
+            f"/datasets/{dataset_id}/files",
+            data={"files": files},
+            compress=True,
+            timeout=120,
+            retry=True,
+        )
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Get the backoff before a retry, honoring a numeric Retry-After header."""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), 60.0)
+    return RETRY_BACKOFF * (2 ** attempt)
+
+
+def _read_cached_response(path: str) -> Optional[Dict[str, Any]]:
+    """Read a cached response ({"etag", "body"}), or None if missing or unreadable."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, EOFError, ValueError):
+        # EOFError: truncated gzip stream
+        return None
+
+
+def _write_cached_response(path: str, etag: str, body: Any) -> None:
+    """Store a response atomically; failures only cost a full fetch next time."""
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump({"etag": etag, "body": body}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
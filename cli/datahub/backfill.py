@@ -0,0 +1,111 @@
+"""Remote parquet preview backfill for DataHub CLI."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.progress import Progress, TaskID
+
+from .api import APIClient
+from .cos import open_cos_object, open_http_object
+from .parquet_preview import analyze_parquet_file, is_parquet_file
+
+
+def find_backfill_candidates(files: List[Dict[str, Any]], force: bool = False) -> List[Dict[str, Any]]:
+    """
+    Select the parquet files of a dataset manifest that need a preview.
+    
+    Args:
+        files: File entries from APIClient.get_dataset
+        force: Also include files that already have preview data and a summary
+        
+    Returns:
+        File entries to backfill
+    """
+    return [
+        f for f in files
+        if is_parquet_file(f.get("path", ""))
+        and (force or not f.get("previewData") or not f.get("summary"))
+    ]
+
+
+def backfill_previews(
+    client: APIClient,
+    dataset_id: str,
+    files: List[Dict[str, Any]],
+    progress: Progress,
+    task_id: TaskID,
+    use_cos: bool = True,
+    max_workers: int = 8,
+    batch_size: int = 50,
+) -> Dict[str, int]:
+    """
+    Build previews and footer summaries for remote parquet files.
+    
+    Each file is opened with ranged reads: the footer comes from a single
+    suffix request and only the first pages needed for the preview rows
+    are fetched. Results are sent to the server in batched metadata updates.
+    
+    Args:
+        client: API client used for the metadata updates
+        dataset_id: Dataset ID
+        files: Parquet file entries to backfill (with 'path' and 'ossUrl')
+        progress: Rich progress instance
+        task_id: Progress task ID
+        use_cos: Read through the COS SDK instead of public URLs
+        max_workers: Number of files processed in parallel
+        batch_size: Number of files per metadata update request
+        
+    Returns:
+        Counts of updated and failed files and of bytes fetched
+    """
+    result = {"updated": 0, "failed": 0, "bytesFetched": 0}
+    pending: List[Dict[str, Any]] = []
+    
+    def flush() -> None:
+        # A failed update fails its whole batch, not the file that filled it
+        if not pending:
+            return
+        try:
+            client.update_file_metadata(dataset_id, list(pending))
+            result["updated"] += len(pending)
+        except Exception as e:
+            result["failed"] += len(pending)
+            progress.console.print(f"[red]Failed to update metadata of {len(pending)} files: {e}[/red]")
+        finally:
+            pending.clear()
+    
+    def backfill_single(file_info: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], int]:
+        rel_path = file_info["path"]
+        if use_cos:
+            remote_file = open_cos_object(f"datasets/{dataset_id}/{rel_path}")
+        elif file_info.get("ossUrl"):
+            remote_file = open_http_object(file_info["ossUrl"])
+        else:
+            raise ValueError("missing ossUrl")
+        
+        fields = analyze_parquet_file(remote_file, max_rows=100)
+        update = {"path": rel_path, **fields} if fields else None
+        return update, remote_file.bytes_fetched
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(backfill_single, f): f for f in files}
+        
+        for future in as_completed(futures):
+            file_path = futures[future]["path"]
+            try:
+                update, bytes_fetched = future.result()
+                result["bytesFetched"] += bytes_fetched
+                if update is None:
+                    result["failed"] += 1
+                    progress.console.print(f"[yellow]No preview extracted for {file_path}[/yellow]")
+                else:
+                    pending.append(update)
+            except Exception as e:
+                result["failed"] += 1
+                progress.console.print(f"[red]Failed to backfill {file_path}: {e}[/red]")
+            if len(pending) >= batch_size:
+                flush()
+            progress.advance(task_id)
+    
+    flush()
+    return result
@@ -0,0 +1,209 @@
+"""Persistent local cache of per-file results for DataHub CLI."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .config import CACHE_FILE, ensure_config_dir, get_cache_max_bytes
+
+# Bump when the layout of the cache database changes
+SCHEMA_VERSION = 1
+
+# Identity of a local file: (size, mtime_ns, inode)
+FileIdentity = Tuple[int, int, int]
+
+
+def file_identity(file_path: str) -> FileIdentity:
+    """Get the (size, mtime_ns, inode) identity of a file."""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+class ResultCache:
+    """
+    SQLite-backed cache of per-file results (parquet previews, footer
+    summaries, episode runs, feature statistics, ...).
+    
+    Entries are keyed by absolute path and result kind, and are only
+    returned while the file's size, mtime_ns and inode are unchanged, so
+    reruns on unchanged data skip all extraction work. Values are stored as
+    compressed JSON and the least recently used entries are evicted once
+    the total stored size exceeds max_bytes.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: Database file (default: ~/.datahub/cache.db)
+            max_bytes: Size bound of stored values (default: from config)
+        """
+        if path is None:
+            ensure_config_dir()
+            path = CACHE_FILE
+        self.path = Path(path)
+        self.max_bytes = get_cache_max_bytes() if max_bytes is None else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self._total_bytes = self._stored_bytes()
+    
+    def __enter__(self) -> "ResultCache":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _init_schema(self) -> None:
+        with self._lock, self._db:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS entries")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    path TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    value BLOB NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    accessed REAL NOT NULL,
+                    PRIMARY KEY (path, kind)
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def _stored_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+    
+    def get(self, file_path: str, kind: str, identity: Optional[FileIdentity] = None) -> Optional[Any]:
+        """
+        Look up a cached result.
+        
+        Args:
+            file_path: Local file path
+            kind: Result kind, including anything the result depends on
+                (e.g. "parquet-analysis/v1/100")
+            identity: File identity to match (default: current stat of the file)
+            
+        Returns:
+            The cached value, or None if missing or stale
+        """
+        try:
+            identity = identity or file_identity(file_path)
+        except OSError:
+            return None
+        key = os.path.abspath(file_path)
+        
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns, inode, value FROM entries WHERE path = ? AND kind = ?",
+                (key, kind),
+            ).fetchone()
+            if row is None or tuple(row[:3]) != tuple(identity):
+                self.misses += 1
+                return None
+            with self._db:
+                self._db.execute(
+                    "UPDATE entries SET accessed = ? WHERE path = ? AND kind = ?",
+                    (time.time(), key, kind),
+                )
+            self.hits += 1
+        
+        return json.loads(zlib.decompress(row[3]))
+    
+    def put(self, file_path: str, kind: str, value: Any, identity: Optional[FileIdentity] = None) -> None:
+        """
+        Store a result.
+        
+        Only results of successful computations belong here: a stored
+        failure would be reused until the file changes.
+        
+        Args:
+            file_path: Local file path
+            kind: Result kind
+            value: JSON-serializable result
+            identity: Identity of the file the value was computed from; pass
+                the identity taken before computing so later edits invalidate it
+        """
+        try:
+            identity = identity or file_identity(file_path)
+        except OSError:
+            return
+        key = os.path.abspath(file_path)
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        
+        with self._lock, self._db:
+            old = self._db.execute(
+                "SELECT bytes FROM entries WHERE path = ? AND kind = ?", (key, kind)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (path, kind, size, mtime_ns, inode, value, bytes, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, identity[0], identity[1], identity[2], blob, len(blob), time.time()),
+            )
+            self._total_bytes += len(blob) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries down to 90% of max_bytes (lock held)."""
+        target = int(self.max_bytes * 0.9)
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+        rows = self._db.execute("SELECT path, kind, bytes FROM entries ORDER BY accessed").fetchall()
+        
+        victims = []
+        for path, kind, size in rows:
+            if self._total_bytes <= target:
+                break
+            victims.append((path, kind))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM entries WHERE path = ? AND kind = ?", victims)
+    
+    def info(self) -> Dict[str, Any]:
+        """Get the number of entries and stored size."""
+        with self._lock:
+            entries, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": stored,
+            "maxBytes": self.max_bytes,
+        }
+    
+    def clear(self) -> None:
+        """Delete all entries."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM entries")
+            self._total_bytes = 0
+        with self._lock:
+            self._db.execute("VACUUM")
+    
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+def open_result_cache() -> Optional[ResultCache]:
+    """Open the default result cache, or return None if it cannot be used."""
+    try:
+        return ResultCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: Local cache unavailable: {e}")
+        return None
@@ -0,0 +1,299 @@
+"""Offline dataset catalog with full-text and faceted search for DataHub CLI."""
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .config import CONFIG_DIR, ensure_config_dir
+
+if TYPE_CHECKING:
+    from .api import APIClient
+
+CATALOG_FILE = CONFIG_DIR / "catalog.db"
+
+# Bump when the layout of the catalog database changes
+SCHEMA_VERSION = 1
+
+# Fields pulled from the listing endpoint (everything but the readme)
+SYNC_FIELDS = [
+    "name",
+    "author",
+    "description",
+    "tags",
+    "downloads",
+    "updatedAt",
+    "size",
+    "license",
+    "datasetFormat",
+    "robotType",
+    "taskType",
+    "totalEpisodes",
+    "totalFrames",
+    "fps",
+]
+
+# Facet name -> catalog column
+FACETS = {
+    "robotType": "robot_type",
+    "taskType": "task_type",
+    "format": "dataset_format",
+    "author": "author",
+}
+
+# Sort option -> ORDER BY clause
+SORTS = {
+    "relevance": "rank, downloads DESC",
+    "downloads": "downloads DESC, name",
+    "size": "size_bytes DESC, name",
+    "updated": "updated_at DESC, name",
+    "name": "name COLLATE NOCASE",
+}
+
+class Catalog:
+    """
+    Local SQLite copy of the dataset listing with an FTS5 index over name,
+    description, author, tags, robot type and task type.
+    
+    sync() only pulls datasets updated since the newest updatedAt seen in the
+    previous sync, and drops datasets that no longer exist on the server.
+    """
+    
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Database file (default: ~/.datahub/catalog.db)
+        """
+        if path is None:
+            ensure_config_dir()
+            path = CATALOG_FILE
+        self.path = Path(path)
+        self._db = sqlite3.connect(str(self.path))
+        self._db.row_factory = sqlite3.Row
+        self._init_schema()
+    
+    def __enter__(self) -> "Catalog":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _init_schema(self) -> None:
+        with self._db:
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS datasets")
+                self._db.execute("DROP TABLE IF EXISTS datasets_fts")
+                self._db.execute("DROP TABLE IF EXISTS sync_state")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS datasets (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    author TEXT,
+                    description TEXT,
+                    robot_type TEXT,
+                    task_type TEXT,
+                    dataset_format TEXT,
+                    size_bytes INTEGER,
+                    downloads INTEGER,
+                    updated_at TEXT,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+            self._db.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS datasets_fts USING fts5(
+                    id UNINDEXED, name, description, author, tags, robot_type, task_type,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_state(self, key: str, value: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+    
+    def sync(self, client: "APIClient", full: bool = False) -> Dict[str, Any]:
+        """
+        Pull dataset metadata changed since the last sync.
+        
+        Args:
+            client: API client
+            full: Re-pull every dataset instead of only recent changes
+            
+        Returns:
+            Dictionary with the number of updated and removed datasets and
+            the total number of datasets in the catalog
+        """
+        # A catalog synced from another server starts over
+        if self._get_state("api_url") != client.base_url:
+            full = True
+        since = None if full else self._get_state("updated_since")
+        
+        updated = 0
+        newest = since
+        with self._db:
+            if full:
+                self._db.execute("DELETE FROM datasets")
+                self._db.execute("DELETE FROM datasets_fts")
+            
+            # updatedSince is inclusive (dates have day granularity), so the
+            # last day is pulled again; upserts make that harmless
+            for page in client.iter_datasets(page_size=200, fields=SYNC_FIELDS, updatedSince=since):
+                for dataset in page:
+                    self._upsert(dataset)
+                    updated += 1
+                    if dataset.get("updatedAt") and (newest is None or dataset["updatedAt"] > newest):
+                        newest = dataset["updatedAt"]
+            
+            # Deletions do not show up as changes; compare against the id list
+            removed = 0
+            if not full:
+                server_ids = set()
+                for page in client.iter_datasets(page_size=200, fields=["id"]):
+                    server_ids.update(d["id"] for d in page)
+                local_ids = {row[0] for row in self._db.execute("SELECT id FROM datasets")}
+                for dataset_id in local_ids - server_ids:
+                    self._db.execute("DELETE FROM datasets WHERE id = ?", (dataset_id,))
+                    self._db.execute("DELETE FROM datasets_fts WHERE id = ?", (dataset_id,))
+                    removed += 1
+            
+            self._set_state("api_url", client.base_url)
+            if newest:
+                self._set_state("updated_since", newest)
+        
+        total = self._db.execute("SELECT COUNT(*) FROM datasets").fetchone()[0]
+        return {"updated": updated, "removed": removed, "total": total}
+    
+    def _upsert(self, dataset: Dict[str, Any]) -> None:
+        """Insert or replace a dataset and its full-text entry."""
+        # Imported here: the CLI imports this module at startup
+        from .cos import parse_size
+        
+        tags = " ".join(dataset.get("tags") or [])
+        self._db.execute(
+            "INSERT OR REPLACE INTO datasets "
+            "(id, name, author, description, robot_type, task_type, dataset_format, "
+            "size_bytes, downloads, updated_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                dataset["id"],
+                dataset.get("name", ""),
+                dataset.get("author", ""),
+                dataset.get("description", ""),
+                dataset.get("robotType", ""),
+                dataset.get("taskType", ""),
+                dataset.get("datasetFormat", ""),
+                parse_size(dataset.get("size", "")) or 0,
+                int(dataset.get("downloads") or 0),
+                dataset.get("updatedAt", ""),
+                json.dumps(dataset, separators=(",", ":")),
+            ),
+        )
+        self._db.execute("DELETE FROM datasets_fts WHERE id = ?", (dataset["id"],))
+        self._db.execute(
+            "INSERT INTO datasets_fts (id, name, description, author, tags, robot_type, task_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                dataset["id"],
+                dataset.get("name", ""),
+                dataset.get("description", ""),
+                dataset.get("author", ""),
+                tags,
+                dataset.get("robotType", ""),
+                dataset.get("taskType", ""),
+            ),
+        )
+    
+    def search(
+        self,
+        query: str = "",
+        filters: Optional[Dict[str, str]] = None,
+        sort: str = "relevance",
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], int, Dict[str, List[Tuple[str, int]]]]:
+        """
+        Search the catalog.
+        
+        Every word of the query must match (as a prefix) the name,
+        description, author, tags, robot type or task type.
+        
+        Args:
+            query: Free-text query
+            filters: Exact-match facet filters (keys from FACETS)
+            sort: One of SORTS
+            limit: Maximum number of results
+            
+        Returns:
+            Tuple of (datasets, total number of matches, facet counts of the
+            matches as {facet: [(value, count), ...]})
+        """
+        conditions = []
+        params: List[Any] = []
+        
+        match = _fts_query(query)
+        if match:
+            source = (
+                "datasets d JOIN (SELECT id, bm25(datasets_fts) AS rank FROM datasets_fts "
+                "WHERE datasets_fts MATCH ?) f ON f.id = d.id"
+            )
+            params.append(match)
+        else:
+            source = "datasets d"
+            if sort == "relevance":
+                sort = "downloads"
+        
+        for facet, value in (filters or {}).items():
+            if value:
+                conditions.append(f"d.{FACETS[facet]} = ? COLLATE NOCASE")
+                params.append(value)
+        
+        def base(extra: Optional[str] = None) -> str:
+            clauses = conditions + ([extra] if extra else [])
+            return f"FROM {source}" + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+        
+        total = self._db.execute(f"SELECT COUNT(*) {base()}", params).fetchone()[0]
+        rows = self._db.execute(
+            f"SELECT d.data {base()} ORDER BY {SORTS[sort]} LIMIT ?", params + [limit]
+        ).fetchall()
+        
+        facets = {}
+        for facet, column in FACETS.items():
+            non_empty = f"d.{column} != ''"
+            facets[facet] = [
+                (value, count) for value, count in self._db.execute(
+                    f"SELECT d.{column}, COUNT(*) AS n {base(non_empty)} "
+                    f"GROUP BY d.{column} ORDER BY n DESC, d.{column} LIMIT 10",
+                    params,
+                )
+            ]
+        
+        return [json.loads(row[0]) for row in rows], total, facets
+    
+    def info(self) -> Dict[str, Any]:
+        """Get the number of datasets and the sync state."""
+        return {
+            "path": str(self.path),
+            "datasets": self._db.execute("SELECT COUNT(*) FROM datasets").fetchone()[0],
+            "apiUrl": self._get_state("api_url"),
+            "updatedSince": self._get_state("updated_since"),
+        }
+    
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    words = re.findall(r"\w+", query or "", re.UNICODE)
+    return " ".join(f'"{word}"*' for word in words)
@@ -1,44 +1,109 @@
 """Main CLI entry point for DataHub."""
 
+import contextlib
+import contextvars
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
 import click
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-from rich.table import Table
 
 from . import __version__
-from .api import APIClient, APIError
+from .agent import DEFAULT_AGENT_WORKERS, client_path
+from .catalog import SORTS
 from .config import (
     clear_token,
     get_api_url,
     get_cos_config,
+    get_endpoint_specs,
+    get_rate_limits,
     get_token,
     set_api_url,
     set_cos_config,
+    set_endpoint_specs,
+    set_rate_limits,
     set_token,
 )
-from .cos import (
-    collect_files,
-    download_dataset,
-    download_dataset_http,
-    format_size,
-    list_objects,
-    upload_folder,
-)
 
+# Everything else (the API client, COS SDK, pyarrow, rich tables and
+# progress bars) is imported inside the commands that use it, so that
+# `datahub --help` and the config commands start quickly.
+
+# Datasets prepared and finalized at the same time by upload-many and
+# multi-dataset downloads; their file transfers always share one scheduler
+BATCH_DATASET_CONCURRENCY = 8
+
+# Seconds between partial manifest publishes during an upload
+DEFAULT_CHECKPOINT_INTERVAL = 5.0
+
+# Values of upload --compress
+COMPRESS_CHOICES = ("none", "gzip", "zstd")
+
+if TYPE_CHECKING:
+    from rich.progress import Progress, TaskID
+    
+    from .api import APIClient
+    from .cache import ResultCache
+    from .profiling import Profile
+    from .scheduler import TransferScheduler
+    from .staging import StagingArea
 
 console = Console()
 
 
+class LocalPath(click.Path):
+    """click.Path relative to the caller's working directory (not the agent's)."""
+    
+    def convert(self, value: Any, param: Optional[click.Parameter], ctx: Optional[click.Context]) -> Any:
+        if isinstance(value, str):
+            value = client_path(value)
+        return super().convert(value, param, ctx)
+
+
 @click.group()
 @click.version_option(version=__version__, prog_name="datahub")
-def main():
+@click.option("--profile", is_flag=True, help="Profile the command: print hot-path timings and write .pstats and .folded (flamegraph) files")
+@click.pass_context
+def main(ctx: click.Context, profile: bool):
     """Embodied DataHub CLI - Upload and download robot datasets."""
-    pass
+    if profile:
+        from .profiling import Profile
+        
+        prefix = f"datahub-profile-{ctx.invoked_subcommand}-{time.strftime('%Y%m%d-%H%M%S')}"
+        session = Profile(client_path(prefix))
+        session.start()
+        ctx.call_on_close(lambda: _print_profile(session))
+
+
+def _print_profile(session: "Profile") -> None:
+    """Stop a profile, write its files and print the hot-path timings."""
+    from rich.table import Table
+    
+    timers = session.finish()
+    table = Table(title=f"Profile ({session.elapsed:.2f}s wall clock)")
+    table.add_column("Timer", style="cyan")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total", justify="right")
+    table.add_column("Mean", justify="right")
+    table.add_column("Max", justify="right")
+    for name, calls, total, longest in timers:
+        table.add_row(
+            name,
+            str(calls),
+            f"{total * 1000:.1f} ms",
+            f"{total * 1000 / calls:.3f} ms",
+            f"{longest * 1000:.1f} ms",
+        )
+    
+    console.print()
+    console.print(table)
+    console.print("[dim]Totals add up across threads and preview processes.[/dim]")
+    console.print(f"[green]Wrote {session.prefix}.pstats (cProfile of the main thread)[/green]")
+    console.print(f"[green]Wrote {session.prefix}.folded (stack samples of all threads, for flamegraph.pl or speedscope)[/green]")
 
 
 # ============== Config Commands ==============
@@ -72,9 +137,82 @@ def config_cos(secret_id: str, secret_key: str, region: str, bucket: str):
     console.print("[green]COS configuration saved successfully![/green]")
 
 
+@config.command("endpoints")
+@click.argument("specs", nargs=-1)
+@click.option("--clear", is_flag=True, help="Use only the configured region")
+def config_endpoints(specs: Tuple[str, ...], clear: bool):
+    """
+    Set or probe additional COS endpoints.
+    
+    SPECS are "accelerate" (global acceleration of the bucket), URLs of
+    domains serving the bucket, or BUCKET@REGION for read-only mirror
+    buckets. Each transfer goes to the endpoint measured fastest.
+    """
+    from rich.table import Table
+    
+    from .endpoints import EndpointSelector, configured_endpoints, parse_endpoint
+    
+    cos_config = get_cos_config()
+    if clear or specs:
+        try:
+            for spec in specs:
+                parse_endpoint(spec, cos_config["bucket"], cos_config["region"])
+        except ValueError as e:
+            console.print(f"[red]Error: {e}[/red]")
+            sys.exit(1)
+        set_endpoint_specs(list(specs))
+        console.print(f"[green]Endpoints set to:[/green] {cos_config['region']}" + "".join(f", {spec}" for spec in specs))
+        return
+    
+    selector = EndpointSelector(configured_endpoints(cos_config["bucket"], cos_config["region"], get_endpoint_specs()))
+    selector.probe()
+    
+    table = Table(title="COS Endpoints")
+    table.add_column("Endpoint", style="cyan")
+    table.add_column("URL")
+    table.add_column("Access")
+    table.add_column("Latency", justify="right", style="green")
+    
+    for endpoint in selector.endpoints:
+        latency = f"{endpoint.latency * 1000:.0f} ms" if endpoint.latency is not None and not endpoint.failures else "[red]unreachable[/red]"
+        table.add_row(endpoint.name, endpoint.base_url, "read-write" if endpoint.writable else "read-only", latency)
+    
+    console.print(table)
+
+
+def _format_limits(bytes_per_sec: float, requests_per_sec: float) -> Tuple[str, str]:
+    """Describe the host-wide transfer limits for display."""
+    bandwidth = f"{bytes_per_sec / (1024 * 1024):g} MB/s" if bytes_per_sec > 0 else "unlimited"
+    request_rate = f"{requests_per_sec:g} requests/s" if requests_per_sec > 0 else "unlimited"
+    return bandwidth, request_rate
+
+
+@config.command("limits")
+@click.option("--bandwidth-mb", type=click.FloatRange(min=0), help="Host-wide bandwidth limit in MB/s (0 for unlimited)")
+@click.option("--request-rate", type=click.FloatRange(min=0), help="Host-wide COS request limit per second (0 for unlimited)")
+def config_limits(bandwidth_mb: Optional[float], request_rate: Optional[float]):
+    """Set or show the transfer limits shared by all datahub processes on this host."""
+    bytes_per_sec, requests_per_sec = get_rate_limits()
+    if bandwidth_mb is None and request_rate is None:
+        bandwidth, rate = _format_limits(bytes_per_sec, requests_per_sec)
+        console.print(f"[blue]Bandwidth:[/blue] {bandwidth}")
+        console.print(f"[blue]Request rate:[/blue] {rate}")
+        return
+    
+    if bandwidth_mb is None:
+        bandwidth_mb = bytes_per_sec / (1024 * 1024)
+    if request_rate is None:
+        request_rate = requests_per_sec
+    set_rate_limits(bandwidth_mb, request_rate)
+    bandwidth, rate = _format_limits(bandwidth_mb * 1024 * 1024, request_rate)
+    console.print(f"[green]Transfer limits set to:[/green] {bandwidth}, {rate}")
+
+
 @config.command("show")
 def config_show():
     """Show current configuration."""
+    from rich.table import Table
+    
     api_url = get_api_url()
     cos_config = get_cos_config()
     token = get_token()
@@ -88,10 +226,57 @@ def config_show():
     table.add_row("COS Region", cos_config["region"] or "(not set)")
     table.add_row("COS Bucket", cos_config["bucket"] or "(not set)")
     table.add_row("COS Secret ID", cos_config["secret_id"][:8] + "..." if cos_config["secret_id"] else "(not set)")
+    bandwidth, request_rate = _format_limits(*get_rate_limits())
+    table.add_row("Bandwidth Limit", bandwidth)
+    table.add_row("Request Limit", request_rate)
     
     console.print(table)
 
 
+@main.group()
+def cache():
+    """Manage the local preview/index result cache."""
+    pass
+
+
+@cache.command("info")
+def cache_info():
+    """Show local cache usage."""
+    from rich.table import Table
+    
+    from .cache import ResultCache
+    from .cos import format_size
+    from .staging import StagingArea
+    
+    with ResultCache() as result_cache:
+        info = result_cache.info()
+    staging_info = StagingArea().info()
+    
+    table = Table(title="DataHub Cache")
+    table.add_column("Setting", style="cyan")
+    table.add_column("Value", style="green")
+    
+    table.add_row("Location", info["path"])
+    table.add_row("Entries", str(info["entries"]))
+    table.add_row("Size", f"{format_size(info['bytes'])} / {format_size(info['maxBytes'])}")
+    table.add_row("Rewritten Files", staging_info["path"])
+    table.add_row("Rewritten Size", f"{format_size(staging_info['bytes'])} / {format_size(staging_info['maxBytes'])}")
+    
+    console.print(table)
+
+
+@cache.command("clear")
+def cache_clear():
+    """Delete all cached results and rewritten files."""
+    from .cache import ResultCache
+    from .staging import StagingArea
+    
+    with ResultCache() as result_cache:
+        result_cache.clear()
+    StagingArea().clear()
+    console.print("[green]Cache cleared.[/green]")
+
+
 # ============== Auth Commands ==============
 
 @main.command()
@@ -99,6 +284,8 @@ def config_show():
 @click.option("--password", "-p", prompt="Password", hide_input=True, help="Admin password")
 def login(username: str, password: str):
     """Login to DataHub."""
+    from .api import APIClient, APIError
+    
     try:
         client = APIClient()
         token = client.login(username, password)
@@ -119,6 +306,8 @@ def logout():
 @main.command()
 def whoami():
     """Check login status."""
+    from .api import APIClient
+    
     token = get_token()
     if not token:
         console.print("[yellow]Not logged in.[/yellow]")
@@ -138,43 +327,181 @@ def whoami():
 # ============== Dataset Commands ==============
 
 @main.command("list")
-def list_datasets():
+@click.option("--author", help="Only datasets by this author")
+@click.option("--robot-type", help="Only datasets for this robot type")
+@click.option("--task-type", help="Only datasets for this task type")
+@click.option("--format", "dataset_format", type=click.Choice(["lerobot", "corobot"]), help="Only datasets in this format")
+@click.option("--page-size", default=50, help="Datasets fetched per request")
+def list_datasets(
+    author: Optional[str],
+    robot_type: Optional[str],
+    task_type: Optional[str],
+    dataset_format: Optional[str],
+    page_size: int,
+):
     """List all datasets."""
+    from rich import box
+    from rich.table import Table
+    
+    from .api import APIClient, APIError
+    
     try:
         client = APIClient()
-        datasets = client.list_datasets()
-        
-        if not datasets:
-            console.print("[yellow]No datasets found.[/yellow]")
-            return
-        
-        table = Table(title="Datasets")
-        table.add_column("ID", style="cyan")
-        table.add_column("Name", style="green")
-        table.add_column("Author", style="blue")
-        table.add_column("Size", style="magenta")
-        table.add_column("Downloads", style="yellow")
+        pages = client.iter_datasets(
+            page_size=page_size,
+            fields=["name", "author", "size", "downloads"],
+            author=author,
+            robotType=robot_type,
+            taskType=task_type,
+            format=dataset_format,
+        )
         
-        for ds in datasets:
-            table.add_row(
-                ds.get("id", ""),
-                ds.get("name", ""),
-                ds.get("author", ""),
-                ds.get("size", ""),
-                str(ds.get("downloads", 0)),
+        # Each page is printed as it arrives, as a continuation of one table
+        total = 0
+        for page in pages:
+            table = Table(
+                title="Datasets" if total == 0 else None,
+                show_header=total == 0,
+                box=box.SIMPLE_HEAD,
+                show_edge=False,
+                expand=True,
             )
+            # Ratio widths keep the columns of every page aligned
+            table.add_column("ID", style="cyan", ratio=3, no_wrap=True)
+            table.add_column("Name", style="green", ratio=3, no_wrap=True)
+            table.add_column("Author", style="blue", ratio=2, no_wrap=True)
+            table.add_column("Size", style="magenta", ratio=1, no_wrap=True)
+            table.add_column("Downloads", style="yellow", ratio=1, min_width=9, justify="right")
+            
+            for ds in page:
+                table.add_row(
+                    ds.get("id", ""),
+                    ds.get("name", ""),
+                    ds.get("author", ""),
+                    ds.get("size", ""),
+                    str(ds.get("downloads", 0)),
+                )
+            
+            console.print(table)
+            total += len(page)
         
-        console.print(table)
+        if total == 0:
+            console.print("[yellow]No datasets found.[/yellow]")
+        else:
+            console.print(f"\n[dim]{total} datasets[/dim]")
+        
+    except APIError as e:
+        console.print(f"[red]Error:[/red] {e.message}")
+        sys.exit(1)
+
+
+# ============== Catalog Commands ==============
+
+@main.group()
+def catalog():
+    """Manage the offline dataset catalog."""
+    pass
+
+
+@catalog.command("sync")
+@click.option("--full", is_flag=True, help="Re-pull all datasets instead of only recent changes")
+def catalog_sync(full: bool):
+    """Pull dataset metadata changed since the last sync."""
+    from .api import APIClient, APIError
+    from .catalog import Catalog
+    
+    try:
+        with Catalog() as local_catalog:
+            with console.status("Syncing catalog..."):
+                result = local_catalog.sync(APIClient(), full=full)
         
+        console.print(
+            f"[green]Catalog synced:[/green] {result['updated']} updated, "
+            f"{result['removed']} removed, {result['total']} datasets"
+        )
+    
     except APIError as e:
         console.print(f"[red]Error:[/red] {e.message}")
         sys.exit(1)
 
 
+@main.command("search")
+@click.argument("query", required=False, default="")
+@click.option("--author", help="Only datasets by this author")
+@click.option("--robot-type", help="Only datasets for this robot type")
+@click.option("--task-type", help="Only datasets for this task type")
+@click.option("--format", "dataset_format", type=click.Choice(["lerobot", "corobot"]), help="Only datasets in this format")
+@click.option("--sort", type=click.Choice(list(SORTS)), default="relevance", help="Sort order")
+@click.option("--limit", "-n", default=20, help="Maximum number of results")
+def search(
+    query: str,
+    author: Optional[str],
+    robot_type: Optional[str],
+    task_type: Optional[str],
+    dataset_format: Optional[str],
+    sort: str,
+    limit: int,
+):
+    """Search the offline catalog (run 'datahub catalog sync' first)."""
+    from rich.table import Table
+    
+    from .catalog import Catalog
+    
+    with Catalog() as local_catalog:
+        if local_catalog.info()["datasets"] == 0:
+            console.print("[yellow]The local catalog is empty. Run: datahub catalog sync[/yellow]")
+            return
+        
+        results, total, facets = local_catalog.search(
+            query,
+            filters={
+                "author": author,
+                "robotType": robot_type,
+                "taskType": task_type,
+                "format": dataset_format,
+            },
+            sort=sort,
+            limit=limit,
+        )
+    
+    if not results:
+        console.print("[yellow]No matching datasets.[/yellow]")
+        return
+    
+    table = Table(title=f"{total} matching datasets" + (f" (showing {len(results)})" if total > len(results) else ""))
+    table.add_column("ID", style="cyan")
+    table.add_column("Name", style="green")
+    table.add_column("Robot", style="blue")
+    table.add_column("Task", style="blue")
+    table.add_column("Size", style="magenta")
+    table.add_column("Downloads", style="yellow", justify="right")
+    
+    for ds in results:
+        table.add_row(
+            ds.get("id", ""),
+            ds.get("name", ""),
+            ds.get("robotType", ""),
+            ds.get("taskType", ""),
+            ds.get("size", ""),
+            str(ds.get("downloads", 0)),
+        )
+    
+    console.print(table)
+    
+    for facet, label in [("robotType", "Robot"), ("taskType", "Task"), ("format", "Format"), ("author", "Author")]:
+        if facets[facet]:
+            counts = ", ".join(f"{value} ({count})" for value, count in facets[facet])
+            console.print(f"[dim]{label}:[/dim] {counts}")
+
+
 @main.command("info")
 @click.argument("dataset_id")
 def dataset_info(dataset_id: str):
     """Show dataset details."""
+    from rich.table import Table
+    
+    from .api import APIClient, APIError
+    
     try:
         client = APIClient()
         ds = client.get_dataset(dataset_id)
@@ -209,6 +536,16 @@ def dataset_info(dataset_id: str):
             if len(files) > 10:
                 console.print(f"  ... and {len(files) - 10} more files")
         
+        # Versions are read from the bucket; datasets without any are common
+        try:
+            versions = _version_store(dataset_id, files).versions()
+        except Exception as e:
+            console.print(f"\n[dim]Could not read versions: {e}[/dim]")
+            versions = []
+        if versions:
+            console.print()
+            _print_versions(dataset_id, versions)
+        
     except APIError as e:
         console.print(f"[red]Error:[/red] {e.message}")
         sys.exit(1)
@@ -232,6 +569,8 @@ def create_dataset(
     license_: str,
 ):
     """Create a new dataset (metadata only)."""
+    from .api import APIClient, APIError
+    
     if not get_token():
         console.print("[red]Please login first: datahub login[/red]")
         sys.exit(1)
@@ -268,12 +607,356 @@ def create_dataset(
         sys.exit(1)
 
 
+def _check_compression(compress: str) -> Optional[str]:
+    """Turn an --compress value into an encoding, exiting if it is not available."""
+    from .compression import check_zstd_available
+    
+    if compress == "none":
+        return None
+    if compress == "zstd" and not check_zstd_available():
+        console.print("[red]zstd compression requires zstandard: pip install zstandard[/red]")
+        sys.exit(1)
+    return compress
+
+
+def _print_plan(title: str, plan: Dict[str, Any], workers: int, compression: Optional[str] = None) -> None:
+    """Print a transfer plan (see plan.plan_upload and plan.plan_download) with its projected duration."""
+    from rich.table import Table
+    
+    from .cos import format_size
+    from .plan import estimate_seconds, format_duration
+    
+    upload = plan["direction"] == "upload"
+    
+    table = Table(title=title)
+    table.add_column("Size class", style="cyan")
+    table.add_column("Files", justify="right")
+    table.add_column("Size", style="magenta", justify="right")
+    for label, group in plan["classes"].items():
+        if group["files"]:
+            table.add_row(label, str(group["files"]), format_size(group["bytes"]))
+    table.add_row("[bold]Total[/bold]", f"[bold]{plan['files']}[/bold]", f"[bold]{format_size(plan['bytes'])}[/bold]")
+    console.print(table)
+    
+    multipart = plan["multipart"]
+    if multipart["files"]:
+        parts = "1 MB parts" if upload else "parts of 20 MB or more"
+        console.print(
+            f"Multipart: {multipart['files']} files over 20 MB ({format_size(multipart['bytes'])}) "
+            f"in {parts}, the rest in single requests"
+        )
+    else:
+        console.print("Multipart: none, every file is sent in a single request")
+    
+    unchanged = plan["unchanged"]
+    if upload:
+        console.print(
+            f"Stored copies: {plan['new']} new, {plan['changed']} changed, "
+            f"{unchanged['files']} unchanged by size ({format_size(unchanged['bytes'])}, sent again)"
+        )
+        if plan["removed"]:
+            console.print(f"[yellow]{plan['removed']} stored files are not in the folder and leave the file list[/yellow]")
+        if compression:
+            encoded = plan["encoded"]
+            console.print(
+                f"Compression: {encoded['files']} files ({format_size(encoded['bytes'])}) encoded with {compression}, "
+                f"{plan['files'] - encoded['files']} sent as they are"
+            )
+        if plan["parquet"]:
+            console.print(
+                f"Parquet previews: {plan['previewsCached']} of {plan['parquet']} reused from the cache (unchanged), "
+                f"{plan['parquet'] - plan['previewsCached']} to extract"
+            )
+    else:
+        console.print(
+            f"Local copies: {plan['new']} missing, {plan['changed']} different, "
+            f"{unchanged['files']} unchanged by size ({format_size(unchanged['bytes'])}, downloaded again)"
+        )
+        if plan["unknownSizes"]:
+            console.print(f"[yellow]{plan['unknownSizes']} files have no size in the file list and count as empty[/yellow]")
+    
+    requests = plan["requests"]
+    console.print(
+        f"Requests: {requests['read']} COS reads, {requests['write']} COS writes, "
+        f"{requests['api']} DataHub API calls"
+    )
+    
+    estimate = estimate_seconds(plan["direction"], plan, workers)
+    if estimate is None:
+        console.print(f"[dim]Duration: no measured {plan['direction']}s yet; estimates start after the first one[/dim]")
+        return
+    
+    line = f"Duration: about {format_duration(estimate['seconds'])} with {workers} workers"
+    if estimate["perFile"] > 0:
+        alternatives = ", ".join(
+            f"{count} workers: {format_duration(estimate_seconds(plan['direction'], plan, count)['seconds'])}"
+            for count in (workers * 2, workers * 4)
+        )
+        line += f" ({alternatives})"
+    console.print(line)
+    console.print(
+        f"[dim]From {estimate['runs']} recent {plan['direction']}s: {format_size(estimate['bandwidth'])}/s, "
+        f"{estimate['perFile']:.2f}s per file and worker[/dim]"
+    )
+
+
+def _plan_uploads(entries: List[Dict[str, Any]], workers: int, compression: Optional[str], no_cache: bool) -> None:
+    """Print the plan of uploading datasets (entries with id, files, index and compute_stats) without uploading."""
+    from rich.table import Table
+    
+    from .cache import open_result_cache
+    from .cos import dataset_objects, format_size
+    from .plan import merge_plans, plan_upload
+    
+    cache = None if no_cache else open_result_cache()
+    plans = []
+    try:
+        for entry in entries:
+            prefix = f"datasets/{entry['id']}/"
+            remote = {obj["Key"][len(prefix):]: obj["Size"] for obj in dataset_objects(entry["id"])}
+            plans.append(plan_upload(
+                entry["files"],
+                remote,
+                build_index=entry["index"],
+                compute_stats=entry["compute_stats"],
+                cache=cache,
+                compression=compression,
+            ))
+    finally:
+        if cache:
+            cache.close()
+    
+    if len(entries) > 1:
+        table = Table(title="Datasets")
+        table.add_column("Dataset", style="cyan")
+        table.add_column("Files", justify="right")
+        table.add_column("Size", style="magenta", justify="right")
+        table.add_column("Unchanged", justify="right")
+        table.add_column("Requests", justify="right")
+        for entry, plan in zip(entries, plans):
+            requests = plan["requests"]
+            table.add_row(
+                entry["id"],
+                str(plan["files"]),
+                format_size(plan["bytes"]),
+                str(plan["unchanged"]["files"]),
+                str(requests["read"] + requests["write"]),
+            )
+        console.print(table)
+    
+    _print_plan("Upload Plan", merge_plans(plans), workers, compression)
+    console.print("\n[dim]Nothing was uploaded (--plan).[/dim]")
+
+
+def _plan_downloads(dataset_ids: List[str], output_path: str, workers: int) -> None:
+    """Print the plan of downloading datasets into output_path without downloading."""
+    from rich.table import Table
+    
+    from .api import APIClient
+    from .cos import dataset_objects, format_size
+    from .cos import parse_size
+    from .plan import merge_plans, plan_download
+    
+    cos_config = get_cos_config()
+    use_cos = bool(cos_config["secret_id"] and cos_config["bucket"])
+    if not use_cos:
+        console.print("[dim]Using HTTP download (sizes come from the dataset's file list and are approximate)[/dim]")
+    
+    client = APIClient()
+    plans = []
+    for dataset_id in dataset_ids:
+        ds = client.get_dataset(dataset_id)
+        if use_cos:
+            prefix = f"datasets/{dataset_id}/"
+            objects = [(obj["Key"][len(prefix):], obj["Size"]) for obj in dataset_objects(dataset_id)]
+        else:
+            objects = [(f["path"], parse_size(f.get("size"))) for f in ds.get("files", []) if f.get("ossUrl")]
+        plans.append(plan_download(objects, str(Path(output_path) / dataset_id), listed=use_cos))
+    
+    if len(dataset_ids) > 1:
+        table = Table(title="Datasets")
+        table.add_column("Dataset", style="cyan")
+        table.add_column("Files", justify="right")
+        table.add_column("Size", style="magenta", justify="right")
+        table.add_column("Present", justify="right")
+        table.add_column("Requests", justify="right")
+        for dataset_id, plan in zip(dataset_ids, plans):
+            table.add_row(
+                dataset_id,
+                str(plan["files"]),
+                format_size(plan["bytes"]),
+                str(plan["unchanged"]["files"]),
+                str(plan["requests"]["read"]),
+            )
+        console.print(table)
+    
+    _print_plan("Download Plan", merge_plans(plans), workers)
+    console.print("\n[dim]Nothing was downloaded (--plan).[/dim]")
+
+
+def _publish_dataset(
+    client: "APIClient",
+    dataset_id: str,
+    files: List[Tuple[str, str]],
+    progress: "Progress",
+    task_id: "TaskID",
+    max_workers: int = 4,
+    preview_workers: Optional[int] = None,
+    build_index: bool = True,
+    compute_stats: bool = False,
+    cache: Optional["ResultCache"] = None,
+    scheduler: Optional["TransferScheduler"] = None,
+    preview_executor: Optional[ProcessPoolExecutor] = None,
+    checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    compression: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Upload a dataset's files and its index/statistics sidecars, then notify
+    the server with upload_complete.
+    
+    The episode index and feature statistics are built while files upload.
+    Metadata and small parquet files are uploaded first, and the files
+    uploaded so far are published every checkpoint_interval seconds with a
+    merging upload_complete, so the dataset is browsable early and a run
+    that dies halfway keeps what it uploaded. The final upload_complete
+    replaces the file list with the complete manifest.
+    
+    Args:
+        client: API client
+        dataset_id: Dataset ID
+        files: Files to upload as (absolute_path, relative_path) tuples
+        progress: Rich progress instance
+        task_id: Progress task ID
+        max_workers: Number of parallel upload workers (without a scheduler)
+        preview_workers: Number of parquet preview processes (without a preview executor)
+        build_index: Build the episode index
+        compute_stats: Compute per-feature normalization statistics
+        cache: Optional local result cache
+        scheduler: Shared transfer scheduler for multi-dataset uploads
+        preview_executor: Shared parquet preview process pool
+        checkpoint_interval: Seconds between partial manifest publishes
+            (0 disables checkpoints)
+        compression: Encoding for compressible files ("gzip" or "zstd")
+        
+    Returns:
+        Dictionary with the number of uploaded files, their total size, and
+        the episode index and feature statistics (None if not built)
+    """
+    from .api import APIError
+    from .cos import upload_bytes, upload_folder
+    from .dataset_index import INDEX_KEY, build_dataset_index, dataset_aggregates, encode_index
+    from .feature_stats import STATS_KEY, compute_feature_stats, encode_stats
+    from .manifest import ManifestCheckpointer, ManifestSpool
+    
+    total_size = sum(os.path.getsize(f[0]) for f in files)
+    uploaded_files = ManifestSpool()
+    
+    def publish_checkpoint(entries: Iterable[Dict[str, Any]]) -> None:
+        # No size: the dataset size is only set by the final upload_complete
+        client.upload_complete(dataset_id, entries, None, merge=True)
+    
+    def checkpoint_failed(error: Exception) -> None:
+        message = error.message if isinstance(error, APIError) else str(error)
+        progress.console.print(f"[yellow]Warning: Failed to publish a checkpoint, will retry: {message}[/yellow]")
+    
+    checkpointer = ManifestCheckpointer(
+        uploaded_files,
+        publish_checkpoint,
+        interval=checkpoint_interval,
+        on_error=checkpoint_failed,
+    ) if checkpoint_interval > 0 else contextlib.nullcontext()
+    
+    metadata_executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        index_future = metadata_executor.submit(build_dataset_index, files, cache=cache) if build_index else None
+        stats_future = metadata_executor.submit(compute_feature_stats, files, cache=cache) if compute_stats else None
+        
+        with checkpointer:
+            upload_folder(
+                "",
+                dataset_id,
+                progress,
+                task_id,
+                max_workers=max_workers,
+                preview_workers=preview_workers,
+                cache=cache,
+                files=files,
+                scheduler=scheduler,
+                preview_executor=preview_executor,
+                manifest=uploaded_files,
+                compression=compression,
+            )
+        
+        index = index_future.result() if index_future else None
+        stats = stats_future.result() if stats_future else None
+    except BaseException:
+        # Only after the checkpointer has published the last entries
+        uploaded_files.close()
+        raise
+    finally:
+        metadata_executor.shutdown()
+    
+    with uploaded_files:
+        aggregates = None
+        if index:
+            upload_bytes(encode_index(index), f"datasets/{dataset_id}/{INDEX_KEY}")
+            aggregates = dataset_aggregates(index)
+        if stats:
+            upload_bytes(encode_stats(stats), f"datasets/{dataset_id}/{STATS_KEY}")
+        
+        # Notify server of upload completion
+        progress.update(task_id, description="Updating dataset metadata...")
+        client.upload_complete(dataset_id, uploaded_files, total_size, aggregates)
+        
+        return {"files": len(uploaded_files), "size": total_size, "index": index, "stats": stats}
+
+
 @main.command("upload")
 @click.argument("dataset_id")
-@click.argument("folder_path", type=click.Path(exists=True, file_okay=False, dir_okay=True))
+@click.argument("folder_path", type=LocalPath(exists=True, file_okay=False, dir_okay=True))
 @click.option("--workers", "-w", default=4, help="Number of parallel upload workers")
-def upload_dataset(dataset_id: str, folder_path: str, workers: int):
+@click.option("--preview-workers", type=int, default=None, help="Number of parquet preview processes (default: CPU count)")
+@click.option("--no-index", is_flag=True, help="Skip building the episode index from parquet metadata")
+@click.option("--compute-stats", is_flag=True, help="Compute per-feature normalization statistics (mean/std/min/max)")
+@click.option("--no-cache", is_flag=True, help="Recompute previews, index and statistics instead of using the local cache")
+@click.option("--optimize-parquet", is_flag=True, help="Rewrite parquet files with bounded row groups, page indexes, statistics and zstd")
+@click.option("--faststart", is_flag=True, help="Rewrite MP4 files that keep their index (moov) at the end so playback can start right away")
+@click.option("--watch", is_flag=True, help="Keep running and upload new or changed files as they are written")
+@click.option("--settle-seconds", type=float, default=5.0, help="With --watch: upload files once unchanged for this long")
+@click.option("--publish-interval", type=float, default=10.0, help="With --watch: seconds between dataset updates")
+@click.option("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="Seconds between publishing the files uploaded so far (0 to publish only at the end)")
+@click.option("--compress", type=click.Choice(COMPRESS_CHOICES), default="none", help="Encode JSON, CSV and other text files on the fly (stored with Content-Encoding)")
+@click.option("--plan", "plan_only", is_flag=True, help="Show file counts, requests and projected duration without uploading")
+def upload_dataset(
+    dataset_id: str,
+    folder_path: str,
+    workers: int,
+    preview_workers: Optional[int],
+    no_index: bool,
+    compute_stats: bool,
+    no_cache: bool,
+    optimize_parquet: bool,
+    faststart: bool,
+    watch: bool,
+    settle_seconds: float,
+    publish_interval: float,
+    checkpoint_interval: float,
+    compress: str,
+    plan_only: bool,
+):
     """Upload a folder to a dataset."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .api import APIClient, APIError
+    from .cache import file_identity, open_result_cache
+    from .cos import collect_files, format_size
+    from .feature_stats import check_stats_available
+    from .mp4_index import faststart_mp4_files, is_mp4_file
+    from .parquet_optimize import optimize_parquet_files
+    from .parquet_preview import check_pyarrow_available
+    from .plan import record_transfer
+    from .staging import StagingArea
+    
     if not get_token():
         console.print("[red]Please login first: datahub login[/red]")
         sys.exit(1)
@@ -284,6 +967,9 @@ def upload_dataset(dataset_id: str, folder_path: str, workers: int):
         console.print("[red]COS not configured. Run: datahub config cos[/red]")
         sys.exit(1)
     
+    compression = _check_compression(compress)
+    
+    staging = None
     try:
         client = APIClient()
         
@@ -310,65 +996,590 @@ def upload_dataset(dataset_id: str, folder_path: str, workers: int):
         
         files = collect_files(str(folder))
         
+        if compute_stats and not check_stats_available():
+            console.print("[yellow]Warning: pyarrow and numpy are required for --compute-stats; skipping.[/yellow]")
+            compute_stats = False
+        
+        if optimize_parquet and not check_pyarrow_available():
+            console.print("[yellow]Warning: pyarrow is required for --optimize-parquet; skipping.[/yellow]")
+            optimize_parquet = False
+        if optimize_parquet or faststart:
+            # Shared by the initial upload and the watch
+            staging = StagingArea()
+        
+        watch_options = {
+            "max_workers": workers,
+            "preview_workers": preview_workers,
+            "build_index": not no_index,
+            "compute_stats": compute_stats,
+            "no_cache": no_cache,
+            "settle_seconds": settle_seconds,
+            "publish_interval": publish_interval,
+            "compression": compression,
+            "optimize_parquet": optimize_parquet,
+            "faststart": faststart,
+            "staging": staging,
+        }
+        
         if not files:
             console.print("[yellow]No files found in the folder (after filtering).[/yellow]")
-            console.print("[dim]Make sure the folder contains data files like .parquet, .json, .mp4, etc.[/dim]")
+            if watch:
+                _watch_upload(client, dataset_id, folder, {}, **watch_options)
+            else:
+                console.print("[dim]Make sure the folder contains data files like .parquet, .json, .mp4, etc.[/dim]")
             return
         
+        # Identities of the original files (before any rewrite), so the
+        # watch only picks up files that change after this point
+        uploaded = {rel_path: file_identity(abs_path) for abs_path, rel_path in files} if watch else {}
+        original_paths = {rel_path: abs_path for abs_path, rel_path in files}
+        
         total_size = sum(os.path.getsize(f[0]) for f in files)
         console.print(f"[green]Found {len(files)} files to upload ({format_size(total_size)})[/green]")
         console.print(f"[blue]Target dataset: {dataset_id}[/blue]\n")
         
+        if plan_only:
+            if optimize_parquet:
+                console.print("[dim]Sizes are before --optimize-parquet rewrites parquet files.[/dim]")
+            if watch:
+                console.print("[dim]The plan covers the initial upload; --watch is not started.[/dim]")
+            entry = {"id": dataset_id, "files": files, "index": not no_index, "compute_stats": compute_stats}
+            _plan_uploads([entry], workers, compression, no_cache)
+            return
+        
+        if optimize_parquet:
+            # Rewritten files are uploaded (and indexed) in place of the originals
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console,
+            ) as progress:
+                task = progress.add_task("Optimizing parquet...", total=None)
+                files, report = optimize_parquet_files(files, staging, progress, task)
+            
+            if report["optimized"]:
+                change = (report["sizeAfter"] - report["sizeBefore"]) * 100 / max(1, report["sizeBefore"])
+                console.print(
+                    f"[green]Optimized {report['optimized']} parquet files: "
+                    f"{format_size(report['sizeBefore'])} -> {format_size(report['sizeAfter'])} "
+                    f"({change:+.1f}%)[/green]"
+                )
+            if report["reused"]:
+                console.print(f"[dim]Reused {report['reused']} files optimized by earlier uploads[/dim]")
+            if report["skipped"]:
+                console.print(f"[dim]{report['skipped']} parquet files already optimized[/dim]")
+            total_size = sum(os.path.getsize(f[0]) for f in files)
+            console.print()
+        
+        if faststart and any(is_mp4_file(abs_path) for abs_path, _ in files):
+            # Rewritten videos are uploaded (and indexed) in place of the originals
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console,
+            ) as progress:
+                task = progress.add_task("Moving video indexes to the front...", total=None)
+                files, report = faststart_mp4_files(files, staging, progress, task)
+            
+            if report["rewritten"]:
+                console.print(f"[green]Moved the index (moov) of {report['rewritten']} videos to the front[/green]")
+            if report["reused"]:
+                console.print(f"[dim]Reused {report['reused']} videos rewritten by earlier uploads[/dim]")
+            if report["skipped"]:
+                console.print(f"[dim]{report['skipped']} videos already start with their index[/dim]")
+            total_size = sum(os.path.getsize(f[0]) for f in files)
+            console.print()
+        
+        # Per-file results of unchanged files are reused from the local cache
+        cache = None if no_cache else open_result_cache()
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TaskProgressColumn(),
-            TextColumn("{task.fields[size]}"),
             console=console,
         ) as progress:
-            task = progress.add_task(
-                "Uploading...",
-                total=total_size,
-                size=f"0 / {format_size(total_size)}",
-            )
-            
-            def update_progress(completed: int):
-                progress.update(
-                    task,
-                    completed=completed,
-                    size=f"{format_size(completed)} / {format_size(total_size)}",
-                )
-            
-            uploaded_files = upload_folder(
-                str(folder),
+            task = progress.add_task("Uploading...", total=total_size)
+            started = time.monotonic()
+            result = _publish_dataset(
+                client,
                 dataset_id,
+                files,
                 progress,
                 task,
                 max_workers=workers,
+                preview_workers=preview_workers,
+                build_index=not no_index,
+                compute_stats=compute_stats,
+                cache=cache,
+                checkpoint_interval=checkpoint_interval,
+                compression=compression,
             )
+        record_transfer("upload", result["files"], result["size"], time.monotonic() - started, workers)
         
-        # Notify server of upload completion
-        console.print("\n[blue]Updating dataset metadata...[/blue]")
-        client.upload_complete(dataset_id, uploaded_files, total_size)
+        if cache:
+            if cache.hits:
+                console.print(f"[dim]Reused {cache.hits} cached results for unchanged files[/dim]")
+            cache.close()
+        
+        index = result["index"]
+        if index:
+            console.print(
+                f"[green]Indexed {index['totalEpisodes']} episodes, "
+                f"{index['totalFrames']} frames ({index.get('fps') or '?'} fps)[/green]"
+            )
+        if result["stats"]:
+            console.print(f"[green]Computed statistics for {len(result['stats'])} features[/green]")
         
-        console.print(f"\n[green]Successfully uploaded {len(uploaded_files)} files![/green]")
+        console.print(f"\n[green]Successfully uploaded {result['files']} files![/green]")
         console.print(f"View at: [blue]{get_api_url()}/datasets/{dataset_id}[/blue]")
         
+        if watch:
+            console.print()
+            # The watch indexes the rewritten copies of these files too
+            staged_copies = {
+                rel_path: abs_path for abs_path, rel_path in files if abs_path != original_paths[rel_path]
+            }
+            _watch_upload(client, dataset_id, folder, uploaded, staged_copies=staged_copies, **watch_options)
+    
     except APIError as e:
         console.print(f"[red]API Error:[/red] {e.message}")
         sys.exit(1)
     except Exception as e:
         console.print(f"[red]Error:[/red] {e}")
         sys.exit(1)
+    finally:
+        if staging is not None:
+            staging.trim()
+
+
+def _watch_upload(
+    client: "APIClient",
+    dataset_id: str,
+    folder: Path,
+    uploaded: Dict[str, Tuple[int, int, int]],
+    max_workers: int,
+    preview_workers: Optional[int],
+    build_index: bool,
+    compute_stats: bool,
+    no_cache: bool,
+    settle_seconds: float,
+    publish_interval: float,
+    compression: Optional[str],
+    optimize_parquet: bool,
+    faststart: bool,
+    staging: Optional["StagingArea"],
+    staged_copies: Optional[Dict[str, str]] = None,
+) -> None:
+    """Run `upload --watch` after the initial upload (see watch.watch_folder)."""
+    from .cache import open_result_cache
+    from .watch import watch_folder
+    
+    cache = None if no_cache else open_result_cache()
+    try:
+        totals = watch_folder(
+            client,
+            dataset_id,
+            str(folder),
+            console,
+            uploaded=uploaded,
+            max_workers=max_workers,
+            preview_workers=preview_workers,
+            build_index=build_index,
+            compute_stats=compute_stats,
+            cache=cache,
+            settle_seconds=settle_seconds,
+            publish_interval=publish_interval,
+            compression=compression,
+            optimize_parquet=optimize_parquet,
+            faststart=faststart,
+            staging=staging,
+            staged_copies=staged_copies,
+        )
+    finally:
+        if cache:
+            cache.close()
+    
+    console.print(
+        f"[green]Stopped watching: uploaded {totals['files']} files "
+        f"in {totals['publishes']} dataset updates[/green]"
+    )
+
+
+def _load_upload_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """
+    Read the dataset list of an upload-many manifest.
+    
+    The manifest is a YAML file with a "datasets" list. Each entry has an
+    "id" and a local "path" (relative to the manifest file), and optionally
+    "index" (default: true) and "compute_stats" (default: false).
+    
+    Args:
+        manifest_path: Path to the YAML manifest
+        
+    Returns:
+        List of dicts with id, path (resolved), index and compute_stats
+        
+    Raises:
+        ValueError: If the manifest is malformed
+    """
+    import yaml
+    
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    
+    entries = data.get("datasets") if isinstance(data, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("the manifest must contain a non-empty 'datasets' list")
+    
+    base_dir = Path(manifest_path).resolve().parent
+    datasets = []
+    seen = set()
+    for i, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("id") or not entry.get("path"):
+            raise ValueError(f"datasets[{i}]: 'id' and 'path' are required")
+        dataset_id = str(entry["id"])
+        if dataset_id in seen:
+            raise ValueError(f"datasets[{i}]: dataset '{dataset_id}' is listed twice")
+        folder = (base_dir / os.path.expanduser(str(entry["path"]))).resolve()
+        if not folder.is_dir():
+            raise ValueError(f"datasets[{i}]: folder not found: {folder}")
+        seen.add(dataset_id)
+        datasets.append({
+            "id": dataset_id,
+            "path": folder,
+            "index": bool(entry.get("index", True)),
+            "compute_stats": bool(entry.get("compute_stats", False)),
+        })
+    
+    return datasets
+
+
+@main.command("upload-many")
+@click.argument("manifest_path", type=LocalPath(exists=True, dir_okay=False))
+@click.option("--workers", "-w", default=8, help="Number of parallel upload workers shared by all datasets")
+@click.option("--preview-workers", type=int, default=None, help="Number of parquet preview processes (default: CPU count)")
+@click.option("--no-cache", is_flag=True, help="Recompute previews, index and statistics instead of using the local cache")
+@click.option("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_INTERVAL, help="Seconds between publishing the files uploaded so far (0 to publish only at the end)")
+@click.option("--compress", type=click.Choice(COMPRESS_CHOICES), default="none", help="Encode JSON, CSV and other text files on the fly (stored with Content-Encoding)")
+@click.option("--plan", "plan_only", is_flag=True, help="Show file counts, requests and projected duration without uploading")
+def upload_many(
+    manifest_path: str,
+    workers: int,
+    preview_workers: Optional[int],
+    no_cache: bool,
+    checkpoint_interval: float,
+    compress: str,
+    plan_only: bool,
+):
+    """Upload several datasets listed in a YAML manifest."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    from rich.table import Table
+    
+    from .api import APIClient, APIError
+    from .cache import open_result_cache
+    from .cos import collect_files, format_size, preview_executor_for
+    from .feature_stats import check_stats_available
+    from .plan import record_transfer
+    from .scheduler import transfer_scheduler
+    
+    if not get_token():
+        console.print("[red]Please login first: datahub login[/red]")
+        sys.exit(1)
+    
+    cos_config = get_cos_config()
+    if not cos_config["secret_id"] or not cos_config["bucket"]:
+        console.print("[red]COS not configured. Run: datahub config cos[/red]")
+        sys.exit(1)
+    
+    compression = _check_compression(compress)
+    
+    try:
+        entries = _load_upload_manifest(manifest_path)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Invalid manifest:[/red] {e}")
+        sys.exit(1)
+    
+    try:
+        client = APIClient()
+        
+        # Check every dataset exists before uploading anything
+        missing = []
+        for entry in entries:
+            try:
+                client.get_dataset(entry["id"])
+            except APIError as e:
+                if e.status_code != 404:
+                    raise
+                missing.append(entry["id"])
+        if missing:
+            console.print(f"[red]Datasets not found: {', '.join(missing)}. Create them first with: datahub create[/red]")
+            sys.exit(1)
+        
+        for entry in entries:
+            entry["files"] = collect_files(str(entry["path"]))
+            entry["size"] = sum(os.path.getsize(f[0]) for f in entry["files"])
+        
+        empty = [entry["id"] for entry in entries if not entry["files"]]
+        if empty:
+            console.print(f"[yellow]Skipping datasets without files: {', '.join(empty)}[/yellow]")
+        entries = [entry for entry in entries if entry["files"]]
+        if not entries:
+            return
+        
+        if any(entry["compute_stats"] for entry in entries) and not check_stats_available():
+            console.print("[yellow]Warning: pyarrow and numpy are required for compute_stats; skipping.[/yellow]")
+            for entry in entries:
+                entry["compute_stats"] = False
+        
+        total_files = sum(len(entry["files"]) for entry in entries)
+        total_size = sum(entry["size"] for entry in entries)
+        
+        if plan_only:
+            _plan_uploads(entries, workers, compression, no_cache)
+            return
+        
+        console.print(
+            f"[green]Uploading {len(entries)} datasets, {total_files} files "
+            f"({format_size(total_size)}) with {workers} shared workers[/green]\n"
+        )
+        
+        cache = None if no_cache else open_result_cache()
+        results: Dict[str, Dict[str, Any]] = {}
+        failures: Dict[str, str] = {}
+        started = time.monotonic()
+        
+        # All files of all datasets go through one scheduler (and one COS
+        # connection pool); each dataset keeps its own progress bar, index,
+        # statistics and upload_complete call
+        with transfer_scheduler(workers) as scheduler, preview_executor_for(preview_workers) as preview_executor:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[cyan]{task.fields[dataset]}"),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console,
+            ) as progress:
+                tasks = {
+                    entry["id"]: progress.add_task("Waiting...", total=entry["size"], dataset=entry["id"])
+                    for entry in entries
+                }
+                
+                def publish(entry: Dict[str, Any]) -> Dict[str, Any]:
+                    task = tasks[entry["id"]]
+                    progress.update(task, description="Uploading...")
+                    return _publish_dataset(
+                        client,
+                        entry["id"],
+                        entry["files"],
+                        progress,
+                        task,
+                        build_index=entry["index"],
+                        compute_stats=entry["compute_stats"],
+                        cache=cache,
+                        scheduler=scheduler,
+                        preview_executor=preview_executor,
+                        checkpoint_interval=checkpoint_interval,
+                        compression=compression,
+                    )
+                
+                with ThreadPoolExecutor(max_workers=min(len(entries), BATCH_DATASET_CONCURRENCY)) as coordinators:
+                    futures = {
+                        coordinators.submit(contextvars.copy_context().run, publish, entry): entry["id"]
+                        for entry in entries
+                    }
+                    for future in as_completed(futures):
+                        dataset_id = futures[future]
+                        try:
+                            results[dataset_id] = future.result()
+                            progress.update(tasks[dataset_id], description="[green]Done[/green]")
+                        except APIError as e:
+                            failures[dataset_id] = e.message
+                            progress.update(tasks[dataset_id], description="[red]Failed[/red]")
+                        except Exception as e:
+                            failures[dataset_id] = str(e)
+                            progress.update(tasks[dataset_id], description="[red]Failed[/red]")
+        
+        record_transfer(
+            "upload",
+            sum(result["files"] for result in results.values()),
+            sum(result["size"] for result in results.values()),
+            time.monotonic() - started,
+            workers,
+        )
+        
+        if cache:
+            if cache.hits:
+                console.print(f"[dim]Reused {cache.hits} cached results for unchanged files[/dim]")
+            cache.close()
+        
+        table = Table(title="Upload Summary")
+        table.add_column("Dataset", style="cyan")
+        table.add_column("Files", justify="right")
+        table.add_column("Size", style="magenta", justify="right")
+        table.add_column("Status")
+        for entry in entries:
+            dataset_id = entry["id"]
+            if dataset_id in results:
+                result = results[dataset_id]
+                table.add_row(dataset_id, str(result["files"]), format_size(result["size"]), "[green]uploaded[/green]")
+            else:
+                table.add_row(dataset_id, "-", format_size(entry["size"]), f"[red]{failures.get(dataset_id, 'failed')}[/red]")
+        console.print(table)
+        
+        if failures:
+            sys.exit(1)
+    
+    except APIError as e:
+        console.print(f"[red]API Error:[/red] {e.message}")
+        sys.exit(1)
+
+
+def _split_download_targets(targets: Tuple[str, ...], output_path: Optional[str]) -> Tuple[List[str], str]:
+    """
+    Split download arguments into dataset IDs and the output directory.
+    
+    Without --output, two arguments keep their original meaning
+    `datahub download <dataset_id> <output_path>`; downloading several
+    datasets therefore needs --output unless it is the current directory.
+    """
+    dataset_ids = list(targets)
+    if output_path is None:
+        output_path = "."
+        if len(dataset_ids) == 2:
+            output_path = dataset_ids.pop()
+    return dataset_ids, output_path
+
+
+def _download_many(dataset_ids: List[str], output_path: str, workers: int) -> None:
+    """Download several datasets with one shared transfer scheduler."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .api import APIClient, APIError
+    from .cos import download_dataset, download_dataset_http
+    from .plan import record_transfer
+    from .scheduler import transfer_scheduler
+    
+    cos_config = get_cos_config()
+    use_cos = bool(cos_config["secret_id"] and cos_config["bucket"])
+    if not use_cos:
+        console.print("[dim]Using HTTP download (no COS credentials required)[/dim]")
+    
+    client = APIClient()
+    failures: Dict[str, str] = {}
+    totals = {"files": 0, "size": 0}
+    started = time.monotonic()
+    
+    with transfer_scheduler(workers) as scheduler, Progress(
+        SpinnerColumn(),
+        TextColumn("[cyan]{task.fields[dataset]}"),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TaskProgressColumn(),
+        console=console,
+    ) as progress:
+        tasks = {
+            dataset_id: progress.add_task("Waiting...", total=None, dataset=dataset_id)
+            for dataset_id in dataset_ids
+        }
+        
+        def download_one(dataset_id: str) -> Dict[str, int]:
+            task = tasks[dataset_id]
+            ds = client.get_dataset(dataset_id)
+            output_dir = Path(output_path) / dataset_id
+            progress.update(task, description="Downloading...")
+            
+            if use_cos:
+                output_dir.mkdir(parents=True, exist_ok=True)
+                return download_dataset(dataset_id, str(output_dir), progress, task, scheduler=scheduler)
+            else:
+                downloadable = [f for f in ds.get("files", []) if f.get("ossUrl")]
+                if not downloadable:
+                    raise ValueError("No downloadable files found. Try configuring COS credentials: datahub config cos")
+                output_dir.mkdir(parents=True, exist_ok=True)
+                result = download_dataset_http(
+                    downloadable,
+                    str(output_dir),
+                    progress,
+                    task,
+                    scheduler=scheduler,
+                    group=dataset_id,
+                )
+                # File sizes are unknown up front, so the bar only pulses until done
+                progress.update(task, total=1, completed=1)
+                return result
+        
+        with ThreadPoolExecutor(max_workers=min(len(dataset_ids), BATCH_DATASET_CONCURRENCY)) as coordinators:
+            futures = {
+                coordinators.submit(contextvars.copy_context().run, download_one, dataset_id): dataset_id
+                for dataset_id in dataset_ids
+            }
+            for future in as_completed(futures):
+                dataset_id = futures[future]
+                try:
+                    result = future.result()
+                    totals["files"] += result["files"]
+                    totals["size"] += result["size"]
+                    progress.update(tasks[dataset_id], description="[green]Done[/green]")
+                except APIError as e:
+                    failures[dataset_id] = "not found" if e.status_code == 404 else e.message
+                    progress.update(tasks[dataset_id], description="[red]Failed[/red]")
+                except Exception as e:
+                    failures[dataset_id] = str(e)
+                    progress.update(tasks[dataset_id], description="[red]Failed[/red]")
+    
+    record_transfer("download", totals["files"], totals["size"], time.monotonic() - started, workers)
+    
+    for dataset_id, message in failures.items():
+        console.print(f"[red]Failed to download {dataset_id}:[/red] {message}")
+    
+    downloaded = len(dataset_ids) - len(failures)
+    console.print(f"\n[green]Downloaded {downloaded}/{len(dataset_ids)} datasets to: {Path(output_path)}[/green]")
+    if failures:
+        sys.exit(1)
 
 
 @main.command("download")
-@click.argument("dataset_id")
-@click.argument("output_path", type=click.Path(), default=".")
-@click.option("--workers", "-w", default=4, help="Number of parallel download workers")
-def download(dataset_id: str, output_path: str, workers: int):
-    """Download a dataset to local folder."""
+@click.argument("targets", nargs=-1, required=True, metavar="DATASET_ID... [OUTPUT_PATH]")
+@click.option("--output", "-o", "output_path", type=LocalPath(), default=None, help="Output directory (default: current directory)")
+@click.option("--workers", "-w", default=4, help="Number of parallel download workers (shared by all datasets)")
+@click.option("--version", "version", type=int, default=None, help="Download this immutable version (see `datahub version list`)")
+@click.option("--plan", "plan_only", is_flag=True, help="Show file counts, requests and projected duration without downloading")
+def download(targets: Tuple[str, ...], output_path: Optional[str], workers: int, version: Optional[int], plan_only: bool):
+    """Download one or more datasets to a local folder."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .api import APIClient, APIError
+    from .cos import dataset_objects, download_dataset, download_dataset_http, format_size
+    from .plan import record_transfer
+    
+    dataset_ids, output_path = _split_download_targets(targets, output_path)
+    output_path = client_path(output_path)
+    if plan_only:
+        if version is not None:
+            console.print("[red]--plan does not apply to --version downloads.[/red]")
+            sys.exit(1)
+        try:
+            _plan_downloads(dataset_ids, output_path, workers)
+        except APIError as e:
+            message = "not found" if e.status_code == 404 else e.message
+            console.print(f"[red]API Error:[/red] {message}")
+            sys.exit(1)
+        return
+    if len(dataset_ids) > 1:
+        if version is not None:
+            console.print("[red]--version applies to a single dataset.[/red]")
+            sys.exit(1)
+        _download_many(dataset_ids, output_path, workers)
+        return
+    dataset_id = dataset_ids[0]
+    
     # Check COS config - if not configured, use HTTP download mode
     cos_config = get_cos_config()
     use_cos = cos_config["secret_id"] and cos_config["bucket"]
@@ -389,10 +1600,11 @@ def download(dataset_id: str, output_path: str, workers: int):
         output_dir = Path(output_path) / dataset_id
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        if use_cos:
+        if version is not None:
+            _download_version(dataset_id, ds, output_dir, version, workers)
+        elif use_cos:
             # Use COS SDK for download (requires credentials)
-            prefix = f"datasets/{dataset_id}/"
-            objects = list_objects(prefix)
+            objects = dataset_objects(dataset_id)
             
             if not objects:
                 console.print("[yellow]No files found for this dataset.[/yellow]")
@@ -416,13 +1628,15 @@ def download(dataset_id: str, output_path: str, workers: int):
                     size=f"0 / {format_size(total_size)}",
                 )
                 
-                download_dataset(
+                started = time.monotonic()
+                result = download_dataset(
                     dataset_id,
                     str(output_dir),
                     progress,
                     task,
                     max_workers=workers,
                 )
+            record_transfer("download", result["files"], result["size"], time.monotonic() - started, workers)
         else:
             # Use HTTP download (for public readable buckets)
             files = ds.get("files", [])
@@ -454,13 +1668,15 @@ def download(dataset_id: str, output_path: str, workers: int):
                     total=len(downloadable),
                 )
                 
-                download_dataset_http(
+                started = time.monotonic()
+                result = download_dataset_http(
                     downloadable,
                     str(output_dir),
                     progress,
                     task,
                     max_workers=workers,
                 )
+            record_transfer("download", result["files"], result["size"], time.monotonic() - started, workers)
         
         console.print(f"\n[green]Successfully downloaded to: {output_dir}[/green]")
         
@@ -472,11 +1688,136 @@ def download(dataset_id: str, output_path: str, workers: int):
         sys.exit(1)
 
 
+def _download_version(dataset_id: str, ds: Dict[str, Any], output_dir: Path, version: int, workers: int) -> None:
+    """Assemble a dataset version in output_dir (see versions.download_version)."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .cache import open_result_cache
+    from .cos import format_size
+    from .versions import download_version
+    
+    store = _version_store(dataset_id, ds.get("files", []))
+    cache = open_result_cache()
+    try:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task(f"Assembling version {version}...", total=None)
+            result = download_version(
+                dataset_id,
+                version,
+                str(output_dir),
+                progress,
+                task,
+                max_workers=workers,
+                base_url=store.base_url,
+                cache=cache,
+            )
+    finally:
+        if cache:
+            cache.close()
+    
+    console.print(
+        f"[green]Version {result['version']}: assembled {result['assembled']} files, "
+        f"kept {result['kept']} unchanged[/green] [dim](fetched {format_size(result['bytesFetched'])})[/dim]"
+    )
+    if result["failed"]:
+        raise RuntimeError(f"{result['failed']} files could not be downloaded")
+
+
+@main.command("preview-backfill")
+@click.argument("dataset_id")
+@click.option("--workers", "-w", default=8, help="Number of files processed in parallel")
+@click.option("--batch-size", default=50, help="Number of files per metadata update request")
+@click.option("--force", is_flag=True, help="Rebuild previews for files that already have one")
+def preview_backfill(dataset_id: str, workers: int, batch_size: int, force: bool):
+    """Build missing parquet previews for an uploaded dataset."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .api import APIClient, APIError
+    from .backfill import backfill_previews, find_backfill_candidates
+    from .cos import format_size
+    from .parquet_preview import check_pyarrow_available
+    
+    if not get_token():
+        console.print("[red]Please login first: datahub login[/red]")
+        sys.exit(1)
+    
+    if not check_pyarrow_available():
+        console.print("[red]pyarrow is required for parquet previews: pip install pyarrow[/red]")
+        sys.exit(1)
+    
+    cos_config = get_cos_config()
+    use_cos = bool(cos_config["secret_id"] and cos_config["bucket"])
+    
+    try:
+        client = APIClient()
+        try:
+            ds = client.get_dataset(dataset_id)
+        except APIError as e:
+            if e.status_code == 404:
+                console.print(f"[red]Dataset '{dataset_id}' not found.[/red]")
+                sys.exit(1)
+            raise
+        
+        candidates = find_backfill_candidates(ds.get("files", []), force=force)
+        if not use_cos:
+            candidates = [f for f in candidates if f.get("ossUrl")]
+        
+        if not candidates:
+            console.print("[green]All parquet files already have previews.[/green]")
+            return
+        
+        console.print(f"[blue]Backfilling previews for {len(candidates)} parquet files[/blue]")
+        if not use_cos:
+            console.print("[dim]Using HTTP range requests (no COS credentials required)[/dim]")
+        console.print()
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console,
+        ) as progress:
+            task = progress.add_task("Extracting previews...", total=len(candidates))
+            result = backfill_previews(
+                client,
+                dataset_id,
+                candidates,
+                progress,
+                task,
+                use_cos=use_cos,
+                max_workers=workers,
+                batch_size=batch_size,
+            )
+        
+        console.print(
+            f"\n[green]Updated {result['updated']} files[/green] "
+            f"[dim](fetched {format_size(result['bytesFetched'])})[/dim]"
+        )
+        if result["failed"]:
+            console.print(f"[yellow]{result['failed']} files could not be processed[/yellow]")
+    
+    except APIError as e:
+        console.print(f"[red]API Error:[/red] {e.message}")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+
+
 @main.command("delete")
 @click.argument("dataset_id")
 @click.option("--yes", "-y", is_flag=True, help="Skip confirmation")
 def delete(dataset_id: str, yes: bool):
     """Delete a dataset."""
+    from .api import APIClient, APIError
+    
     if not get_token():
         console.print("[red]Please login first: datahub login[/red]")
         sys.exit(1)
@@ -496,5 +1837,211 @@ def delete(dataset_id: str, yes: bool):
         sys.exit(1)
 
 
+
+# ============== Version Commands ==============
+
+def _version_store(dataset_id: str, files: List[Dict[str, Any]]):
+    """Version store of a dataset, read through its public URL without COS credentials."""
+    from .versions import VersionStore, public_base_url
+    
+    cos_config = get_cos_config()
+    if cos_config["secret_id"] and cos_config["bucket"]:
+        return VersionStore(dataset_id)
+    base_url = public_base_url(dataset_id, files)
+    if base_url is None:
+        raise ValueError("COS not configured and the dataset has no public file URLs")
+    return VersionStore(dataset_id, base_url)
+
+
+def _print_versions(dataset_id: str, versions: List[Dict[str, Any]]) -> None:
+    """Print the version index of a dataset with the bytes each version adds."""
+    from rich.table import Table
+    
+    from .cos import format_size
+    
+    table = Table(title=f"Versions of {dataset_id}")
+    table.add_column("Version", style="cyan", justify="right")
+    table.add_column("Created")
+    table.add_column("Files", justify="right")
+    table.add_column("Size", style="magenta", justify="right")
+    table.add_column("Added", style="green", justify="right")
+    table.add_column("Message")
+    for summary in versions:
+        table.add_row(
+            str(summary["version"]),
+            summary.get("createdAt", ""),
+            str(summary.get("fileCount", 0)),
+            format_size(summary.get("totalBytes", 0)),
+            format_size(summary.get("addedBytes", 0)),
+            summary.get("message", ""),
+        )
+    console.print(table)
+
+
+@main.group()
+def version():
+    """Immutable, deduplicated dataset versions."""
+    pass
+
+
+@version.command("create")
+@click.argument("dataset_id")
+@click.argument("folder_path", type=LocalPath(exists=True, file_okay=False, dir_okay=True))
+@click.option("--message", "-m", default="", help="Description of the version")
+@click.option("--workers", "-w", default=8, help="Number of files processed in parallel")
+@click.option("--no-cache", is_flag=True, help="Re-chunk all files instead of using the local cache")
+def version_create(dataset_id: str, folder_path: str, message: str, workers: int, no_cache: bool):
+    """Store a folder as a new version of a dataset (only new chunks are uploaded)."""
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    from .api import APIClient, APIError
+    from .cache import open_result_cache
+    from .cos import collect_files, format_size
+    from .versions import create_version
+    
+    if not get_token():
+        console.print("[red]Please login first: datahub login[/red]")
+        sys.exit(1)
+    
+    cos_config = get_cos_config()
+    if not cos_config["secret_id"] or not cos_config["bucket"]:
+        console.print("[red]COS not configured. Run: datahub config cos[/red]")
+        sys.exit(1)
+    
+    try:
+        try:
+            APIClient().get_dataset(dataset_id)
+        except APIError as e:
+            if e.status_code == 404:
+                console.print(f"[red]Dataset '{dataset_id}' not found.[/red]")
+                sys.exit(1)
+            raise
+        
+        files = collect_files(folder_path)
+        if not files:
+            console.print("[yellow]No files found in the folder (after filtering).[/yellow]")
+            return
+        
+        cache = None if no_cache else open_result_cache()
+        try:
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                console=console,
+            ) as progress:
+                task = progress.add_task("Chunking and uploading...", total=None)
+                summary = create_version(dataset_id, files, progress, task, message=message, max_workers=workers, cache=cache)
+        finally:
+            if cache:
+                cache.close()
+        
+        console.print(
+            f"[green]Created version {summary['version']} of {dataset_id}: {summary['fileCount']} files, "
+            f"{format_size(summary['totalBytes'])}[/green]"
+        )
+        console.print(f"[dim]Added {format_size(summary['addedBytes'])} in {summary['addedChunks']} new chunks[/dim]")
+    
+    except APIError as e:
+        console.print(f"[red]API Error:[/red] {e.message}")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+
+
+@version.command("list")
+@click.argument("dataset_id")
+def version_list(dataset_id: str):
+    """List the versions of a dataset and the bytes each one adds."""
+    from .api import APIClient, APIError
+    
+    try:
+        ds = APIClient().get_dataset(dataset_id)
+        versions = _version_store(dataset_id, ds.get("files", [])).versions()
+    except APIError as e:
+        console.print(f"[red]Error:[/red] {e.message}")
+        sys.exit(1)
+    except Exception as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+    
+    if not versions:
+        console.print(f"[yellow]Dataset '{dataset_id}' has no versions. Create one with: datahub version create[/yellow]")
+        return
+    _print_versions(dataset_id, versions)
+
+
+# ============== Agent Commands ==============
+
+@main.group()
+def agent():
+    """Serve commands from a background agent with warm connections."""
+    pass
+
+
+@agent.command("start")
+@click.option("--workers", "-w", default=DEFAULT_AGENT_WORKERS, help="Transfer workers shared by all commands")
+@click.option("--preview-workers", type=int, default=None, help="Number of parquet preview processes (default: CPU count)")
+@click.option("--foreground", is_flag=True, help="Run in this terminal instead of in the background")
+def agent_start(workers: int, preview_workers: Optional[int], foreground: bool):
+    """Start the agent."""
+    from .agent import AGENT_LOG, AGENT_SOCKET, request_agent, serve, start_agent
+    
+    status = request_agent("status")
+    if status:
+        console.print(f"[yellow]Agent already running (pid {status['pid']}).[/yellow]")
+        return
+    
+    try:
+        if foreground:
+            console.print(f"[blue]Agent listening on {AGENT_SOCKET}. Press Ctrl+C to stop.[/blue]")
+            serve(workers, preview_workers)
+            return
+        pid = start_agent(workers, preview_workers)
+    except RuntimeError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+    
+    console.print(f"[green]Agent started (pid {pid}).[/green]")
+    console.print(f"[dim]Commands now run in the agent; log: {AGENT_LOG}[/dim]")
+
+
+@agent.command("stop")
+def agent_stop():
+    """Stop the agent once its running commands finish."""
+    from .agent import request_agent
+    
+    status = request_agent("stop")
+    if not status:
+        console.print("[yellow]Agent is not running.[/yellow]")
+        return
+    if status["active"]:
+        console.print(f"[blue]Agent stops after {len(status['active'])} running commands.[/blue]")
+    else:
+        console.print("[green]Agent stopped.[/green]")
+
+
+@agent.command("status")
+def agent_status():
+    """Show whether the agent is running and what it is doing."""
+    from .agent import AGENT_SOCKET, request_agent
+    
+    status = request_agent("status")
+    if not status:
+        console.print("[yellow]Agent is not running.[/yellow] Start it with: [blue]datahub agent start[/blue]")
+        return
+    
+    hours, rest = divmod(int(status["uptime"]), 3600)
+    console.print(f"[green]Agent running[/green] (pid {status['pid']}, version {status['version']})")
+    console.print(f"Socket: {AGENT_SOCKET}")
+    console.print(f"Uptime: {hours}h {rest // 60}m")
+    console.print(f"Transfer workers: {status['workers']} ({status['queuedTransfers']} transfers queued)")
+    console.print(f"Commands served: {status['served']}")
+    for command in status["active"]:
+        console.print(f"  [cyan]running:[/cyan] datahub {command}")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+"""Transparent content encoding of uploaded objects for DataHub CLI (upload --compress)."""
+
+import mimetypes
+import zlib
+from typing import BinaryIO, Iterable, Optional, Sequence
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+ENCODINGS = ("gzip", "zstd")
+
+# Smaller files are sent as they are; the saving would not pay for the header
+MIN_COMPRESS_BYTES = 4 * 1024
+
+# Bytes from the start of a file compressed to estimate its ratio
+SAMPLE_BYTES = 64 * 1024
+
+# Files whose sample does not shrink below this ratio are sent as they are
+MAX_SAMPLE_RATIO = 0.9
+
+# Read and write size while encoding and decoding
+CHUNK_SIZE = 1024 * 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Object metadata holding the size of the original file
+ORIGINAL_SIZE_META = "x-cos-meta-original-size"
+
+# Leading bytes of formats that are already compressed (gzip, zstd, zip,
+# bzip2, xz, PNG, JPEG)
+_COMPRESSED_MAGIC = (
+    b"\x1f\x8b",
+    b"\x28\xb5\x2f\xfd",
+    b"PK\x03\x04",
+    b"BZh",
+    b"\xfd7zXZ\x00",
+    b"\x89PNG",
+    b"\xff\xd8\xff",
+)
+
+
+def check_zstd_available() -> bool:
+    """Check if zstandard is available for zstd encoding."""
+    return ZSTD_AVAILABLE
+
+
+def _compressor(encoding: str):
+    """Create a streaming compressor with compress() and flush()."""
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if encoding == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd encoding requires zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _decompressor(encoding: str):
+    """Create a streaming decompressor with decompress() and flush()."""
+    if encoding == "gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Object is zstd-encoded; install zstandard to download it (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def choose_encoding(
+    local_path: str,
+    size: int,
+    encoding: Optional[str],
+    extensions: Sequence[str],
+) -> Optional[str]:
+    """
+    Decide whether a file is uploaded encoded.
+    
+    Only files of the given types that are large enough are considered.
+    Their first bytes are checked for the signature of a compressed format
+    and compressed once at the lowest level; files that do not shrink are
+    sent as they are, so the check costs one small read.
+    
+    Args:
+        local_path: Local file path
+        size: File size in bytes
+        encoding: Requested encoding ("gzip", "zstd" or None for none)
+        extensions: File extensions to compress (see config.get_compress_extensions)
+        
+    Returns:
+        The encoding to upload the file with, or None to upload it as is
+    """
+    if encoding is None or size < MIN_COMPRESS_BYTES:
+        return None
+    if not local_path.lower().endswith(tuple(extensions)):
+        return None
+    
+    with open(local_path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    if sample.startswith(_COMPRESSED_MAGIC):
+        return None
+    if len(zlib.compress(sample, 1)) > len(sample) * MAX_SAMPLE_RATIO:
+        return None
+    return encoding
+
+
+def compress_file(local_path: str, dest: BinaryIO, encoding: str) -> int:
+    """
+    Encode a file chunk by chunk.
+    
+    Args:
+        local_path: File to encode
+        dest: Binary file object the encoded bytes are written to
+        encoding: "gzip" or "zstd"
+        
+    Returns:
+        Number of encoded bytes written
+    """
+    compressor = _compressor(encoding)
+    written = 0
+    with open(local_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                dest.write(data)
+                written += len(data)
+    data = compressor.flush()
+    dest.write(data)
+    return written + len(data)
+
+
+def decompress_stream(chunks: Iterable[bytes], dest: BinaryIO, encoding: str) -> int:
+    """
+    Decode a stream of encoded chunks as they arrive.
+    
+    Args:
+        chunks: Encoded bytes (e.g. a response body read in chunks)
+        dest: Binary file object the decoded bytes are written to
+        encoding: "gzip" or "zstd"
+        
+    Returns:
+        Number of decoded bytes written
+    """
+    decompressor = _decompressor(encoding)
+    written = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        data = decompressor.decompress(chunk)
+        if data:
+            dest.write(data)
+            written += len(data)
+    data = decompressor.flush()
+    if data:
+        dest.write(data)
+        written += len(data)
+    return written
+
+
+def iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterable[bytes]:
+    """Iterate over the chunks of a binary file object until EOF."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def content_encoding(headers) -> Optional[str]:
+    """
+    Get the encoding of an object from its response headers.
+    
+    Returns:
+        "gzip" or "zstd" if the object was uploaded encoded, else None
+    """
+    value = (headers.get("Content-Encoding") or headers.get("content-encoding") or "").strip().lower()
+    return value if value in ENCODINGS else None
+
+
+def guess_content_type(path: str) -> str:
+    """Content-Type of an encoded object, so browsers decode and show it."""
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type is None and path.lower().endswith(".jsonl"):
+        content_type = "application/x-ndjson"
+    return content_type or "application/octet-stream"
+
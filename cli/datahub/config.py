@@ -3,12 +3,33 @@
 import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 # Default config directory
 CONFIG_DIR = Path.home() / ".datahub"
 CONFIG_FILE = CONFIG_DIR / "config.json"
 CREDENTIALS_FILE = CONFIG_DIR / "credentials.json"
+CACHE_FILE = CONFIG_DIR / "cache.db"
+CHUNK_CACHE_DIR = CONFIG_DIR / "chunks"
+STAGING_DIR = CONFIG_DIR / "optimized"
+RATE_LIMIT_FILE = CONFIG_DIR / "ratelimit.state"
+THROUGHPUT_FILE = CONFIG_DIR / "throughput.json"
+
+# Default size bound of the local result cache
+DEFAULT_CACHE_MAX_MB = 512
+
+# Default size bound of the local cache of downloaded version chunks
+DEFAULT_CHUNK_CACHE_MAX_MB = 4096
+
+# Default size bound of the rewritten copies kept by --optimize-parquet and
+# --faststart
+DEFAULT_STAGING_MAX_MB = 20480
+
+# File types encoded by upload --compress unless configured otherwise: text
+# formats that shrink 5-10x. Parquet is not among them: it is read with range
+# requests (streaming, previews), which cannot seek into an encoded object;
+# --optimize-parquet rewrites uncompressed parquet with zstd pages instead.
+DEFAULT_COMPRESS_TYPES = (".json", ".jsonl", ".csv", ".tsv", ".txt", ".md", ".yaml", ".yml")
 
 
 def ensure_config_dir():
@@ -100,3 +121,75 @@ def set_cos_config(secret_id: str, secret_key: str, region: str, bucket: str):
     config["cos_region"] = region
     config["cos_bucket"] = bucket
     save_config(config)
+
+
+def get_cache_max_bytes() -> int:
+    """Get the size bound of the local result cache from environment or config."""
+    config = load_config()
+    max_mb = os.environ.get("DATAHUB_CACHE_MAX_MB", config.get("cache_max_mb", DEFAULT_CACHE_MAX_MB))
+    return int(float(max_mb) * 1024 * 1024)
+
+
+def get_chunk_cache_max_bytes() -> int:
+    """Get the size bound of the local chunk cache from environment or config."""
+    config = load_config()
+    max_mb = os.environ.get("DATAHUB_CHUNK_CACHE_MAX_MB", config.get("chunk_cache_max_mb", DEFAULT_CHUNK_CACHE_MAX_MB))
+    return int(float(max_mb) * 1024 * 1024)
+
+
+def get_staging_max_bytes() -> int:
+    """Get the size bound of the staged rewritten files from environment or config."""
+    config = load_config()
+    max_mb = os.environ.get("DATAHUB_STAGING_MAX_MB", config.get("staging_max_mb", DEFAULT_STAGING_MAX_MB))
+    return int(float(max_mb) * 1024 * 1024)
+
+
+def get_rate_limits() -> Tuple[float, float]:
+    """
+    Get the host-wide transfer limits from environment or config.
+    
+    Returns:
+        Tuple of (bytes per second, requests per second); 0 means unlimited
+    """
+    config = load_config()
+    bandwidth_mb = os.environ.get("DATAHUB_BANDWIDTH_MB", config.get("bandwidth_mb", 0))
+    request_rate = os.environ.get("DATAHUB_REQUEST_RATE", config.get("request_rate", 0))
+    return float(bandwidth_mb) * 1024 * 1024, float(request_rate)
+
+
+def set_rate_limits(bandwidth_mb: float, request_rate: float):
+    """Set the host-wide transfer limits (0 for unlimited)."""
+    config = load_config()
+    config["bandwidth_mb"] = bandwidth_mb
+    config["request_rate"] = request_rate
+    save_config(config)
+
+
+def get_endpoint_specs() -> List[str]:
+    """Get the additional COS endpoints (see endpoints.parse_endpoint) from environment or config."""
+    config = load_config()
+    specs = os.environ.get("DATAHUB_ENDPOINTS", config.get("endpoints", []))
+    if isinstance(specs, str):
+        specs = specs.split(",")
+    return [spec.strip() for spec in specs if spec.strip()]
+
+
+def set_endpoint_specs(specs: List[str]):
+    """Set the additional COS endpoints."""
+    config = load_config()
+    config["endpoints"] = specs
+    save_config(config)
+
+
+def get_compress_extensions() -> Tuple[str, ...]:
+    """Get the file extensions encoded by upload --compress from environment or config."""
+    config = load_config()
+    types = os.environ.get("DATAHUB_COMPRESS_TYPES", config.get("compress_types", DEFAULT_COMPRESS_TYPES))
+    if isinstance(types, str):
+        types = types.split(",")
+    extensions = []
+    for ext in types:
+        ext = ext.strip().lower()
+        if ext:
+            extensions.append(ext if ext.startswith(".") else f".{ext}")
+    return tuple(extensions)
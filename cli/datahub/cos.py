@@ -1,20 +1,77 @@
 """Tencent Cloud COS operations for DataHub CLI."""
 
+import contextlib
+import contextvars
+import functools
+import io
+import multiprocessing
 import os
+import re
+import tempfile
+import threading
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 import requests
-from qcloud_cos import CosConfig, CosS3Client
+from requests.adapters import HTTPAdapter
+from qcloud_cos import CosConfig, CosS3Client, CosServiceError
 from rich.progress import Progress, TaskID
 
-from .config import get_cos_config
-from .parquet_preview import is_parquet_file, extract_parquet_preview, check_pyarrow_available
+from .cache import ResultCache, file_identity
+from .compression import (
+    ORIGINAL_SIZE_META,
+    choose_encoding,
+    compress_file,
+    content_encoding,
+    decompress_stream,
+    guess_content_type,
+    iter_file,
+)
+from .config import get_compress_extensions, get_cos_config
+from .endpoints import Endpoint, get_endpoint_selector
+from .manifest import ManifestSpool
+from .mp4_index import MP4Error, cached_video_info, is_mp4_file
+from .remote import DEFAULT_BLOCK_SIZE, DEFAULT_CACHE_BYTES, DEFAULT_TAIL_SIZE, RangedFile, parse_content_range
+from .parquet_preview import ANALYSIS_CACHE_KIND, is_parquet_file, analyze_parquet_file, check_pyarrow_available
+from .profiling import submit as profiled_submit, timed
+from .ratelimit import BACKGROUND, INTERACTIVE, part_callback, throttle, throttled
+from .scheduler import TransferScheduler, get_shared_scheduler
 
+# Keep-alive connections per host shared by all transfer threads
+CONNECTION_POOL_SIZE = 32
 
-def get_cos_client() -> CosS3Client:
-    """Get a configured COS client."""
+# Files above this size are uploaded and downloaded in parts
+MULTIPART_THRESHOLD = 20 * 1024 * 1024
+
+# Content-addressed store of dataset versions (see versions.py) below a
+# dataset's prefix; these objects are not files of the dataset
+VERSION_STORE_PREFIXES = (".datahub/chunks/", ".datahub/recipes/", ".datahub/versions/")
+
+# Retries of a failed request by the COS SDK (its default)
+SDK_RETRIES = 3
+
+# COS clients by (endpoint, secret_id, secret_key, retries), so every transfer in the
+# process reuses one client and its connection pool
+_cos_clients: Dict[Tuple[str, str, str, int], CosS3Client] = {}
+_cos_clients_lock = threading.Lock()
+
+_http_session: Optional[requests.Session] = None
+_http_session_lock = threading.Lock()
+
+T = TypeVar("T")
+
+# Preview process pool shared by every upload of a long-running process (the agent)
+_shared_preview_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_cos_client(endpoint: Optional[Endpoint] = None) -> CosS3Client:
+    """
+    Get a configured COS client (created once per endpoint and credentials).
+    
+    Args:
+        endpoint: Endpoint to send requests to (default: the configured region)
+    """
     config = get_cos_config()
     
     if not config["secret_id"] or not config["secret_key"]:
@@ -22,14 +79,38 @@ def get_cos_client() -> CosS3Client:
             "COS credentials not configured. Run 'datahub config cos' to set up."
         )
     
-    cos_config = CosConfig(
-        Region=config["region"],
-        SecretId=config["secret_id"],
-        SecretKey=config["secret_key"],
-        Token=None,
-        Scheme="https",
-    )
-    return CosS3Client(cos_config)
+    selector = get_endpoint_selector()
+    if endpoint is None:
+        endpoint = selector.primary
+    # With several endpoints, failing over replaces the SDK's own retries
+    # (which sleep 1 + 2 + 3 seconds)
+    retry = SDK_RETRIES if len(selector.endpoints) == 1 else 0
+    key = (endpoint.base_url, config["secret_id"], config["secret_key"], retry)
+    with _cos_clients_lock:
+        client = _cos_clients.get(key)
+        if client is None:
+            cos_config = CosConfig(
+                SecretId=config["secret_id"],
+                SecretKey=config["secret_key"],
+                Token=None,
+                PoolConnections=4,
+                PoolMaxSize=CONNECTION_POOL_SIZE,
+                **endpoint.cos_config(),
+            )
+            client = _cos_clients[key] = CosS3Client(cos_config, retry=retry)
+    return client
+
+
+def get_http_session() -> requests.Session:
+    """Get the keep-alive session used for public object downloads."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=CONNECTION_POOL_SIZE)
+            _http_session.mount("http://", adapter)
+            _http_session.mount("https://", adapter)
+        return _http_session
 
 
 def get_bucket_name() -> str:
@@ -42,52 +123,202 @@ def get_bucket_name() -> str:
     return config["bucket"]
 
 
+def _on_endpoint(fn: Callable[[CosS3Client, str], T], size: Optional[int] = None, write: bool = False) -> T:
+    """
+    Run a COS call on the fastest configured endpoint, failing over to the
+    others (see endpoints.EndpointSelector).
+    
+    Args:
+        fn: Call taking the client and bucket name to use
+        size: Bytes transferred, if known
+        write: The call uploads or deletes objects, or has to see the
+            configured bucket itself (listings)
+        
+    Returns:
+        Result of fn
+    """
+    get_bucket_name()
+    return get_endpoint_selector().run(lambda endpoint: fn(get_cos_client(endpoint), endpoint.bucket), size, write)
+
+
+def _on_url(url: str, fn: Callable[[str], T], size: Optional[int] = None) -> T:
+    """
+    Fetch a public URL of the configured bucket from the fastest endpoint,
+    failing over to the others; other URLs are fetched as they are.
+    
+    Args:
+        url: Public URL of the object
+        fn: Fetch taking the URL to use
+        size: Bytes transferred, if known
+        
+    Returns:
+        Result of fn
+    """
+    selector = get_endpoint_selector()
+    key = selector.primary.key_of(url)
+    if key is None:
+        return fn(url)
+    return selector.run(lambda endpoint: fn(endpoint.url(key)), size)
+
+
+@timed
 def upload_file(
     local_path: str,
     cos_key: str,
     progress_callback: Optional[Callable[[int], None]] = None,
+    compression: Optional[str] = None,
 ) -> str:
     """
     Upload a single file to COS.
     
+    With compression set, files of the configured types (see
+    compression.choose_encoding) are encoded on the fly and stored with
+    Content-Encoding and their original size as metadata; everything else
+    takes the unchanged path.
+    
     Args:
         local_path: Local file path
         cos_key: COS object key (path in bucket)
         progress_callback: Optional callback for progress updates
+        compression: Encoding for compressible files ("gzip" or "zstd"),
+            None to upload every file as is
         
     Returns:
         The COS URL of the uploaded file
     """
-    client = get_cos_client()
-    bucket = get_bucket_name()
     config = get_cos_config()
     
     file_size = os.path.getsize(local_path)
+    encoding = choose_encoding(local_path, file_size, compression, get_compress_extensions()) if compression else None
     
-    # Use multipart upload for large files (> 20MB)
-    if file_size > 20 * 1024 * 1024:
-        response = client.upload_file(
-            Bucket=bucket,
-            Key=cos_key,
-            LocalFilePath=local_path,
-            EnableMD5=False,
-            progress_callback=progress_callback,
-        )
-    else:
-        with open(local_path, "rb") as f:
-            response = client.put_object(
+    def upload(client: CosS3Client, bucket: str) -> None:
+        if encoding is not None:
+            _upload_encoded(client, bucket, local_path, cos_key, file_size, encoding)
+        # Use multipart upload for large files (> 20MB)
+        elif file_size > MULTIPART_THRESHOLD:
+            client.upload_file(
                 Bucket=bucket,
                 Key=cos_key,
-                Body=f,
+                LocalFilePath=local_path,
                 EnableMD5=False,
+                progress_callback=part_callback(BACKGROUND),
             )
-        if progress_callback:
-            progress_callback(file_size)
+        else:
+            throttle(file_size, 1, BACKGROUND)
+            with open(local_path, "rb") as f:
+                client.put_object(
+                    Bucket=bucket,
+                    Key=cos_key,
+                    Body=f,
+                    EnableMD5=False,
+                )
+    
+    _on_endpoint(upload, file_size, write=True)
+    if progress_callback:
+        progress_callback(file_size)
+    
+    # Return the public URL (of the configured region, whichever endpoint was used)
+    return f"https://{config['bucket']}.cos.{config['region']}.myqcloud.com/{cos_key}"
+
+
+def _upload_encoded(
+    client: CosS3Client,
+    bucket: str,
+    local_path: str,
+    cos_key: str,
+    file_size: int,
+    encoding: str,
+) -> None:
+    """Upload a file encoded with gzip or zstd (small files from memory, large ones from a temporary file)."""
+    headers = {
+        "ContentEncoding": encoding,
+        "ContentType": guess_content_type(local_path),
+        "Metadata": {ORIGINAL_SIZE_META: str(file_size)},
+    }
+    
+    if file_size <= MULTIPART_THRESHOLD:
+        buffer = io.BytesIO()
+        compress_file(local_path, buffer, encoding)
+        throttle(buffer.tell(), 1, BACKGROUND)
+        client.put_object(Bucket=bucket, Key=cos_key, Body=buffer.getvalue(), EnableMD5=False, **headers)
+        return
+    
+    fd, temp_path = tempfile.mkstemp(prefix="datahub-encode-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            compress_file(local_path, f, encoding)
+        client.upload_file(
+            Bucket=bucket,
+            Key=cos_key,
+            LocalFilePath=temp_path,
+            EnableMD5=False,
+            progress_callback=part_callback(BACKGROUND),
+            **headers,
+        )
+    finally:
+        os.unlink(temp_path)
+
+
+@timed
+def upload_bytes(
+    data: bytes,
+    cos_key: str,
+    content_type: str = "application/json",
+) -> str:
+    """
+    Upload an in-memory object to COS.
     
-    # Return the public URL
-    return f"https://{bucket}.cos.{config['region']}.myqcloud.com/{cos_key}"
+    Args:
+        data: Object content
+        cos_key: COS object key (path in bucket)
+        content_type: Content-Type of the object
+        
+    Returns:
+        The COS URL of the uploaded object
+    """
+    config = get_cos_config()
+    
+    def upload(client: CosS3Client, bucket: str) -> None:
+        throttle(len(data), 1, BACKGROUND)
+        client.put_object(
+            Bucket=bucket,
+            Key=cos_key,
+            Body=data,
+            ContentType=content_type,
+            EnableMD5=False,
+        )
+    
+    _on_endpoint(upload, len(data), write=True)
+    return f"https://{config['bucket']}.cos.{config['region']}.myqcloud.com/{cos_key}"
+
+
+@timed
+def download_bytes(cos_key: str) -> Optional[bytes]:
+    """
+    Download a small object into memory.
+    
+    Args:
+        cos_key: COS object key (path in bucket)
+        
+    Returns:
+        The object content, or None if the object does not exist
+    """
+    def download(client: CosS3Client, bucket: str) -> bytes:
+        throttle(0, 1, INTERACTIVE)
+        response = client.get_object(Bucket=bucket, Key=cos_key)
+        data = response["Body"].get_raw_stream().read()
+        throttle(len(data), 0, INTERACTIVE)
+        return data
+    
+    try:
+        return _on_endpoint(download)
+    except CosServiceError as e:
+        if e.get_status_code() == 404:
+            return None
+        raise
 
 
+@timed
 def download_file(
     cos_key: str,
     local_path: str,
@@ -96,40 +327,57 @@ def download_file(
     """
     Download a single file from COS.
     
+    Objects uploaded with Content-Encoding (upload --compress) are decoded
+    while they stream to disk. Progress is reported in stored (encoded)
+    bytes, the basis of object listings and transfer measurements.
+    
     Args:
         cos_key: COS object key (path in bucket)
         local_path: Local file path to save to
         progress_callback: Optional callback for progress updates
     """
-    client = get_cos_client()
-    bucket = get_bucket_name()
-    
     # Ensure parent directory exists
     Path(local_path).parent.mkdir(parents=True, exist_ok=True)
     
     # Get file size first
-    response = client.head_object(Bucket=bucket, Key=cos_key)
+    def head(client: CosS3Client, bucket: str) -> dict:
+        throttle(0, 1, INTERACTIVE)
+        return client.head_object(Bucket=bucket, Key=cos_key)
+    
+    response = _on_endpoint(head, 0)
     file_size = int(response.get("Content-Length", 0))
+    encoding = content_encoding(response)
     
     # Download
-    if file_size > 20 * 1024 * 1024:
-        # Use download_file for large files
-        client.download_file(
-            Bucket=bucket,
-            Key=cos_key,
-            DestFilePath=local_path,
-        )
-    else:
-        response = client.get_object(
-            Bucket=bucket,
-            Key=cos_key,
-        )
-        response["Body"].get_stream_to_file(local_path)
+    def download(client: CosS3Client, bucket: str) -> None:
+        if encoding is not None:
+            throttle(0, 1, INTERACTIVE)
+            response = client.get_object(Bucket=bucket, Key=cos_key)
+            with open(local_path, "wb") as f:
+                decompress_stream(throttled(iter_file(response["Body"].get_raw_stream())), f, encoding)
+        elif file_size > MULTIPART_THRESHOLD:
+            # Use download_file for large files
+            client.download_file(
+                Bucket=bucket,
+                Key=cos_key,
+                DestFilePath=local_path,
+                progress_callback=part_callback(INTERACTIVE),
+            )
+        else:
+            throttle(file_size, 1, INTERACTIVE)
+            response = client.get_object(
+                Bucket=bucket,
+                Key=cos_key,
+            )
+            response["Body"].get_stream_to_file(local_path)
+    
+    _on_endpoint(download, file_size)
     
     if progress_callback:
         progress_callback(file_size)
 
 
+@timed
 def download_file_http(
     url: str,
     local_path: str,
@@ -138,34 +386,53 @@ def download_file_http(
     """
     Download a file via HTTP (for public readable buckets).
     
+    Objects uploaded with Content-Encoding (upload --compress) are decoded
+    while they stream to disk. URLs of the configured bucket are fetched
+    from the fastest configured endpoint.
+    
     Args:
         url: Public URL to download from
         local_path: Local file path to save to
         progress_callback: Optional callback for progress updates
         
     Returns:
-        Downloaded file size in bytes
+        Bytes transferred (the stored, encoded size of encoded objects)
     """
     # Ensure parent directory exists
     Path(local_path).parent.mkdir(parents=True, exist_ok=True)
     
-    # Stream download
-    response = requests.get(url, stream=True, timeout=300)
-    response.raise_for_status()
-    
-    file_size = int(response.headers.get("content-length", 0))
-    downloaded = 0
-    
-    with open(local_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                f.write(chunk)
+    def download(url: str) -> int:
+        # Stream download
+        throttle(0, 1, INTERACTIVE)
+        response = get_http_session().get(url, stream=True, timeout=300)
+        response.raise_for_status()
+        
+        file_size = int(response.headers.get("content-length", 0))
+        downloaded = 0
+        encoding = content_encoding(response.headers)
+        
+        def received(chunks: Iterator[bytes]) -> Iterator[bytes]:
+            nonlocal downloaded
+            for chunk in chunks:
                 downloaded += len(chunk)
+                yield chunk
+        
+        with open(local_path, "wb") as f:
+            if encoding is not None:
+                # Decoded here rather than by requests, which knows gzip only
+                decompress_stream(received(throttled(iter_file(response.raw))), f, encoding)
+            else:
+                for chunk in received(throttled(response.iter_content(chunk_size=8192))):
+                    if chunk:
+                        f.write(chunk)
+        return file_size or downloaded
+    
+    size = _on_url(url, download)
     
     if progress_callback:
-        progress_callback(file_size or downloaded)
+        progress_callback(size)
     
-    return file_size or downloaded
+    return size
 
 
 def download_dataset_http(
@@ -174,7 +441,9 @@ def download_dataset_http(
     progress: Progress,
     task_id: TaskID,
     max_workers: int = 4,
-) -> None:
+    scheduler: Optional[TransferScheduler] = None,
+    group: str = "",
+) -> Dict[str, int]:
     """
     Download dataset files via HTTP (for public readable buckets).
     
@@ -184,6 +453,12 @@ def download_dataset_http(
         progress: Rich progress instance
         task_id: Progress task ID
         max_workers: Number of parallel download workers
+        scheduler: Shared scheduler to run the downloads on instead of a
+            thread pool of max_workers
+        group: Scheduler group of the downloads (e.g. the dataset ID)
+        
+    Returns:
+        Dictionary with the number of downloaded files and their total size
     """
     # Filter files with valid ossUrl
     downloadable = [f for f in files if f.get("ossUrl")]
@@ -192,21 +467,22 @@ def download_dataset_http(
         raise ValueError("No downloadable files found (missing ossUrl)")
     
     downloaded_size = 0
+    downloaded_files = 0
     
     def download_single(file_info: Dict[str, Any]) -> int:
-        nonlocal downloaded_size
+        nonlocal downloaded_size, downloaded_files
         rel_path = file_info["path"]
         url = file_info["ossUrl"]
         local_path = os.path.join(output_path, rel_path)
         
         size = download_file_http(url, local_path)
         downloaded_size += size
+        downloaded_files += 1
         progress.update(task_id, completed=downloaded_size)
         return size
     
-    # Download files with thread pool
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(download_single, f): f for f in downloadable}
+    with _transfer_executor(scheduler, group, max_workers) as submit:
+        futures = {submit(download_single, f): f for f in downloadable}
         
         for future in as_completed(futures):
             try:
@@ -214,8 +490,119 @@ def download_dataset_http(
             except Exception as e:
                 file_info = futures[future]
                 progress.console.print(f"[red]Failed to download {file_info['path']}: {e}[/red]")
+    
+    return {"files": downloaded_files, "size": downloaded_size}
+
+
+def open_cos_object(
+    cos_key: str,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+) -> RangedFile:
+    """
+    Open a COS object for ranged reads.
+    
+    The last tail_size bytes are fetched up front with a suffix range
+    request, which also reports the object size.
+    
+    Args:
+        cos_key: COS object key (path in bucket)
+        tail_size: Bytes to prefetch from the end of the object
+        block_size: Granularity of ranged reads and cached blocks
+        max_cache_bytes: Maximum bytes kept in the block cache
+        
+    Returns:
+        Seekable read-only file over the object
+    """
+    def fetch(start: int, end: int) -> bytes:
+        def get_range(client: CosS3Client, bucket: str) -> bytes:
+            throttle(end - start, 1, INTERACTIVE)
+            response = client.get_object(Bucket=bucket, Key=cos_key, Range=f"bytes={start}-{end - 1}")
+            return response["Body"].get_raw_stream().read()
+        
+        return _on_endpoint(get_range, end - start)
+    
+    def get_tail(client: CosS3Client, bucket: str) -> Tuple[dict, bytes]:
+        throttle(tail_size, 1, INTERACTIVE)
+        response = client.get_object(Bucket=bucket, Key=cos_key, Range=f"bytes=-{tail_size}")
+        return response, response["Body"].get_raw_stream().read()
+    
+    response, tail = _on_endpoint(get_tail, tail_size)
+    size = parse_content_range(response.get("Content-Range", "")) or len(tail)
+    
+    return RangedFile(
+        fetch,
+        size,
+        name=cos_key,
+        block_size=block_size,
+        max_cache_bytes=max_cache_bytes,
+        tail=tail,
+    )
+
+
+def open_http_object(
+    url: str,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+) -> RangedFile:
+    """
+    Open a public object URL for ranged reads.
+    
+    Args:
+        url: Public URL of the object
+        tail_size: Bytes to prefetch from the end of the object
+        block_size: Granularity of ranged reads and cached blocks
+        max_cache_bytes: Maximum bytes kept in the block cache
+        
+    Returns:
+        Seekable read-only file over the object
+    """
+    session = requests.Session()
+    
+    def fetch(start: int, end: int) -> bytes:
+        def get_range(url: str) -> bytes:
+            throttle(end - start, 1, INTERACTIVE)
+            response = session.get(url, headers={"Range": f"bytes={start}-{end - 1}"}, timeout=60)
+            response.raise_for_status()
+            if response.status_code == 200:
+                # Server ignored the range header and sent the whole object
+                return response.content[start:end]
+            return response.content
+        
+        return _on_url(url, get_range, end - start)
+    
+    def get_tail(url: str) -> requests.Response:
+        throttle(tail_size, 1, INTERACTIVE)
+        response = session.get(url, headers={"Range": f"bytes=-{tail_size}"}, timeout=60)
+        response.raise_for_status()
+        return response
+    
+    response = _on_url(url, get_tail, tail_size)
+    tail = response.content
+    if response.status_code == 200:
+        size = len(tail)
+    else:
+        size = parse_content_range(response.headers.get("Content-Range", "")) or len(tail)
+    
+    return RangedFile(
+        fetch,
+        size,
+        name=url,
+        block_size=block_size,
+        max_cache_bytes=max_cache_bytes,
+        tail=tail,
+    )
 
 
+def dataset_objects(dataset_id: str) -> List[dict]:
+    """List the objects of a dataset's files (without its version store)."""
+    prefix = f"datasets/{dataset_id}/"
+    return [obj for obj in list_objects(prefix) if not obj["Key"][len(prefix):].startswith(VERSION_STORE_PREFIXES)]
+
+
+@timed
 def list_objects(prefix: str) -> List[dict]:
     """
     List objects in COS with a given prefix.
@@ -226,19 +613,23 @@ def list_objects(prefix: str) -> List[dict]:
     Returns:
         List of object info dicts with 'Key' and 'Size'
     """
-    client = get_cos_client()
-    bucket = get_bucket_name()
-    
-    objects = []
-    marker = ""
-    
-    while True:
-        response = client.list_objects(
+    def list_page(client: CosS3Client, bucket: str) -> dict:
+        throttle(0, 1, INTERACTIVE)
+        return client.list_objects(
             Bucket=bucket,
             Prefix=prefix,
             Marker=marker,
             MaxKeys=1000,
         )
+    
+    objects = []
+    marker = ""
+    
+    while True:
+        # Mirrors may lag behind without any error, and a marker only applies
+        # to the bucket that returned it, so pages come from the configured
+        # bucket (through any of its endpoints)
+        response = _on_endpoint(list_page, write=True)
         
         contents = response.get("Contents", [])
         if not contents:
@@ -268,17 +659,18 @@ def delete_objects(keys: List[str]) -> None:
     if not keys:
         return
         
-    client = get_cos_client()
-    bucket = get_bucket_name()
-    
     # Delete in batches of 1000
     for i in range(0, len(keys), 1000):
-        batch = keys[i:i + 1000]
-        objects = [{"Key": key} for key in batch]
-        client.delete_objects(
-            Bucket=bucket,
-            Delete={"Object": objects, "Quiet": "true"},
-        )
+        objects = [{"Key": key} for key in keys[i:i + 1000]]
+        
+        def delete_batch(client: CosS3Client, bucket: str) -> None:
+            throttle(0, 1, BACKGROUND)
+            client.delete_objects(
+                Bucket=bucket,
+                Delete={"Object": objects, "Quiet": "true"},
+            )
+        
+        _on_endpoint(delete_batch, write=True)
 
 
 # Directories and files to ignore during upload
@@ -299,6 +691,8 @@ IGNORE_PATTERNS = {
     # IDE
     ".idea",
     ".vscode",
+    # DataHub sidecars (regenerated on upload)
+    ".datahub",
     # OS
     ".DS_Store",
     "Thumbs.db",
@@ -320,6 +714,7 @@ IGNORE_FILES = {
 }
 
 
+@timed
 def should_ignore(path: Path, rel_path: Path) -> bool:
     """
     Check if a file or directory should be ignored.
@@ -349,6 +744,7 @@ def should_ignore(path: Path, rel_path: Path) -> bool:
     return False
 
 
+@timed
 def collect_files(folder_path: str) -> List[Tuple[str, str]]:
     """
     Collect all files in a folder with their relative paths.
@@ -372,28 +768,99 @@ def collect_files(folder_path: str) -> List[Tuple[str, str]]:
     return files
 
 
+# Parquet files up to this size are uploaded right after the metadata
+SMALL_PARQUET_BYTES = 16 * 1024 * 1024
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".webm")
+
+
+def upload_priority(rel_path: str, size: int) -> Tuple[int, int]:
+    """
+    Sort key that uploads what makes a dataset browsable first.
+    
+    Metadata (meta/, READMEs, top-level JSON) goes first, then small parquet
+    files, then everything else, and videos last; smaller files first
+    within each class.
+    
+    Args:
+        rel_path: Path relative to the dataset folder
+        size: File size in bytes
+        
+    Returns:
+        Tuple of (class, size)
+    """
+    parts = Path(rel_path).parts
+    name = parts[-1].lower()
+    if parts[0] == "meta" or name.startswith("readme") or (len(parts) == 1 and name.endswith(".json")):
+        rank = 0
+    elif is_parquet_file(name) and size <= SMALL_PARQUET_BYTES:
+        rank = 1
+    elif name.endswith(VIDEO_EXTENSIONS):
+        rank = 3
+    else:
+        rank = 2
+    return rank, size
+
+
 def upload_folder(
     folder_path: str,
     dataset_id: str,
     progress: Progress,
     task_id: TaskID,
     max_workers: int = 4,
-) -> List[dict]:
+    preview_workers: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    files: Optional[List[Tuple[str, str]]] = None,
+    scheduler: Optional[TransferScheduler] = None,
+    preview_executor: Optional[ProcessPoolExecutor] = None,
+    manifest: Optional[ManifestSpool] = None,
+    compression: Optional[str] = None,
+) -> ManifestSpool:
     """
     Upload an entire folder to COS.
     
+    Files are uploaded in upload_priority order (metadata and small parquet
+    files first, videos last), so partial manifests published while the
+    upload runs make the dataset browsable early.
+    
+    Parquet previews and footer summaries are extracted in a separate
+    process pool that runs alongside the upload threads, so CPU-bound Arrow
+    decoding does not compete with network transfer for the GIL. They are
+    spilled to a disk-backed manifest as they complete and joined with the
+    uploaded file entries when the manifest is read. Files whose previews
+    are in the local result cache are not analyzed again.
+    
+    MP4 files get a videoInfo entry with their duration, format and keyframe
+    offsets (see mp4_index.extract_video_info), read from the moov alone.
+    
     Args:
         folder_path: Local folder path
         dataset_id: Dataset ID for COS prefix
         progress: Rich progress instance
         task_id: Progress task ID
         max_workers: Number of parallel upload workers
+        preview_workers: Number of parquet preview processes (default: CPU count)
+        cache: Optional local result cache for parquet previews and video info
+        files: Files to upload as (absolute_path, relative_path) tuples
+            (default: collect_files(folder_path))
+        scheduler: Shared scheduler to run the uploads on instead of a
+            thread pool of max_workers
+        preview_executor: Shared process pool for parquet previews instead
+            of one of preview_workers processes
+        manifest: Manifest to record uploaded files in (default: a new one).
+            It stays open if the upload fails, so the caller can still
+            publish what was uploaded, and has to close it.
+        compression: Encoding for compressible files ("gzip" or "zstd"),
+            None to upload every file as is
         
     Returns:
-        List of uploaded file info
+        Manifest of uploaded file info; the caller is responsible for closing it
     """
-    files = collect_files(folder_path)
-    total_size = sum(os.path.getsize(f[0]) for f in files)
+    if files is None:
+        files = collect_files(folder_path)
+    sizes = {abs_path: os.path.getsize(abs_path) for abs_path, _ in files}
+    files = sorted(files, key=lambda f: upload_priority(f[1], sizes[f[0]]))
+    total_size = sum(sizes.values())
     progress.update(task_id, total=total_size)
     
     # Check if pyarrow is available for parquet preview
@@ -407,51 +874,123 @@ def upload_folder(
             "[dim]Install with: pip install pyarrow[/dim]\n"
         )
     
-    uploaded_files = []
+    own_manifest = manifest is None
+    if manifest is None:
+        manifest = ManifestSpool()
     uploaded_size = 0
-    parquet_preview_count = 0
+    
+    # Videos whose index (moov) follows the media data
+    slow_start: List[str] = []
     
     def upload_single(file_info: Tuple[str, str]) -> dict:
-        nonlocal uploaded_size, parquet_preview_count
         abs_path, rel_path = file_info
         cos_key = f"datasets/{dataset_id}/{rel_path}"
         
         file_size = os.path.getsize(abs_path)
-        url = upload_file(abs_path, cos_key)
+        url = upload_file(abs_path, cos_key, compression=compression)
         
-        result: Dict[str, Any] = {
+        entry = {
             "name": Path(rel_path).name,
             "path": rel_path,
             "size": file_size,
             "url": url,
         }
-        
-        # Extract parquet preview data if applicable
-        if is_parquet_file(abs_path) and pyarrow_available:
-            preview_data = extract_parquet_preview(abs_path, max_rows=100)
-            if preview_data:
-                result["previewData"] = preview_data
-                parquet_preview_count += 1
-        
-        return result
+        if is_mp4_file(abs_path):
+            # Only the box headers and the moov are read, so this stays on the upload thread
+            try:
+                entry["videoInfo"] = cached_video_info(abs_path, cache)
+                if not entry["videoInfo"]["faststart"]:
+                    slow_start.append(rel_path)
+            except (OSError, MP4Error) as e:
+                progress.console.print(f"[yellow]Warning: Failed to index video {rel_path}: {e}[/yellow]")
+        return entry
     
-    # Upload files with thread pool
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(upload_single, f): f for f in files}
+    # Preview results are spilled to the manifest as soon as each one is ready,
+    # so they are never all held in memory at once
+    preview_futures: Dict[str, Future] = {}
+    preview_done = threading.Condition()
+    
+    # Previews of unchanged files come straight from the local cache
+    to_analyze: List[Tuple[str, str, Any]] = []
+    if pyarrow_available:
+        for abs_path, rel_path in parquet_files:
+            identity = file_identity(abs_path)
+            cached = cache.get(abs_path, ANALYSIS_CACHE_KIND, identity) if cache else None
+            if cached:
+                manifest.add_fields(rel_path, cached)
+            else:
+                to_analyze.append((abs_path, rel_path, identity))
+    previews_pending = len(to_analyze)
+    
+    def on_preview_done(abs_path: str, rel_path: str, identity: Any, future: Future) -> None:
+        nonlocal previews_pending
+        preview_futures.pop(rel_path, None)
+        try:
+            if not future.cancelled():
+                fields = future.result()
+                manifest.add_fields(rel_path, fields)
+                # A missing field means its extraction failed; try again next time
+                if cache and "previewData" in fields and "summary" in fields:
+                    cache.put(abs_path, ANALYSIS_CACHE_KIND, fields, identity)
+        except Exception as e:
+            progress.console.print(
+                f"[yellow]Warning: Failed to extract preview for {rel_path}: {e}[/yellow]"
+            )
+        finally:
+            with preview_done:
+                previews_pending -= 1
+                preview_done.notify_all()
+    
+    # Start parquet preview extraction first so it overlaps with the uploads.
+    # "spawn" avoids forking a process that is running upload threads.
+    own_preview_executor = None
+    if previews_pending:
+        if preview_executor is None:
+            preview_executor = _shared_preview_executor
+        if preview_executor is None:
+            preview_executor = own_preview_executor = create_preview_executor(preview_workers)
+        for abs_path, rel_path, identity in to_analyze:
+            future = profiled_submit(preview_executor, analyze_parquet_file, abs_path, max_rows=100)
+            preview_futures[rel_path] = future
+            # Callbacks run on the executor's thread; keep this caller's
+            # context so warnings reach its console in the agent
+            future.add_done_callback(
+                functools.partial(contextvars.copy_context().run, on_preview_done, abs_path, rel_path, identity)
+            )
+    
+    try:
+        with _transfer_executor(scheduler, dataset_id, max_workers) as submit:
+            futures = {submit(upload_single, f): f for f in files}
+            
+            for future in as_completed(futures):
+                try:
+                    file_info = future.result()
+                    manifest.add_file(file_info)
+                    uploaded_size += file_info["size"]
+                    progress.update(task_id, completed=uploaded_size)
+                except Exception as e:
+                    file_path = futures[future][1]
+                    progress.console.print(f"[red]Failed to upload {file_path}: {e}[/red]")
         
-        for future in as_completed(futures):
-            try:
-                file_info = future.result()
-                uploaded_files.append(file_info)
-                uploaded_size += file_info["size"]
-                progress.update(task_id, completed=uploaded_size)
-            except Exception as e:
-                file_path = futures[future][1]
-                progress.console.print(f"[red]Failed to upload {file_path}: {e}[/red]")
+        # Wait for the remaining previews; they are joined with the uploaded
+        # file entries when the manifest is read
+        with preview_done:
+            if previews_pending:
+                progress.update(task_id, description="Extracting previews...")
+            preview_done.wait_for(lambda: previews_pending == 0)
+    except BaseException:
+        if own_manifest:
+            manifest.close()
+        raise
+    finally:
+        for preview_future in list(preview_futures.values()):
+            preview_future.cancel()
+        if own_preview_executor is not None:
+            own_preview_executor.shutdown(wait=True)
     
     # Report parquet preview extraction results
     if parquet_files:
-        preview_extracted = sum(1 for f in uploaded_files if f.get("previewData"))
+        preview_extracted = manifest.count_field("previewData")
         if preview_extracted > 0:
             progress.console.print(
                 f"[green]Extracted preview data for {preview_extracted}/{len(parquet_files)} parquet files[/green]"
@@ -461,7 +1000,87 @@ def upload_folder(
                 f"[yellow]Warning: Failed to extract preview data for {len(parquet_files)} parquet files[/yellow]"
             )
     
-    return uploaded_files
+    if slow_start:
+        progress.console.print(
+            f"[yellow]{len(slow_start)} videos keep their index (moov) at the end and cannot start playing "
+            f"before it is fetched; upload with --faststart to move it to the front[/yellow]"
+        )
+    
+    return manifest
+
+
+def create_preview_executor(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Create a process pool for parquet preview extraction.
+    
+    Args:
+        max_workers: Number of processes (default: CPU count)
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count() or 1,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def set_shared_preview_executor(executor: Optional[ProcessPoolExecutor]) -> None:
+    """
+    Make uploads that would start their own preview processes use one pool.
+    
+    Args:
+        executor: Process pool for all uploads of this process (None to unset)
+    """
+    global _shared_preview_executor
+    _shared_preview_executor = executor
+
+
+@contextlib.contextmanager
+def preview_executor_for(max_workers: Optional[int] = None) -> Iterator[ProcessPoolExecutor]:
+    """
+    Yield the process-wide preview pool if one is set, else a new pool of
+    max_workers processes that is shut down on exit.
+    """
+    if _shared_preview_executor is not None:
+        yield _shared_preview_executor
+        return
+    executor = create_preview_executor(max_workers)
+    try:
+        yield executor
+    finally:
+        executor.shutdown()
+
+
+@contextlib.contextmanager
+def _transfer_executor(
+    scheduler: Optional[TransferScheduler],
+    group: str,
+    max_workers: int,
+) -> Iterator[Callable[..., Future]]:
+    """
+    Yield a submit function for transfer jobs: the given or process-wide
+    scheduler's (in the given group) if there is one, else a thread pool's
+    of max_workers that is shut down on exit. Jobs that have not started are
+    cancelled if the caller fails.
+    """
+    if scheduler is None:
+        scheduler = get_shared_scheduler()
+    if scheduler is None:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            yield executor.submit
+        return
+    
+    submitted: List[Future] = []
+    
+    def submit(fn: Callable[..., Any], *args: Any) -> Future:
+        future = scheduler.submit(group, fn, *args)
+        submitted.append(future)
+        return future
+    
+    try:
+        yield submit
+    except BaseException:
+        for future in submitted:
+            future.cancel()
+        raise
 
 
 def download_dataset(
@@ -470,19 +1089,36 @@ def download_dataset(
     progress: Progress,
     task_id: TaskID,
     max_workers: int = 4,
-) -> None:
+    scheduler: Optional[TransferScheduler] = None,
+    version: Optional[int] = None,
+) -> Dict[str, int]:
     """
     Download an entire dataset from COS.
     
+    With a version, the files of that immutable version are assembled from
+    its chunks instead (see versions.download_version).
+    
     Args:
         dataset_id: Dataset ID
         output_path: Local output directory
         progress: Rich progress instance
         task_id: Progress task ID
         max_workers: Number of parallel download workers
+        scheduler: Shared scheduler to run the downloads on instead of a
+            thread pool of max_workers
+        version: Version to download (default: the current files)
+        
+    Returns:
+        Dictionary with the number of downloaded files and their total size
     """
+    if version is not None:
+        from .versions import download_version
+        
+        result = download_version(dataset_id, version, output_path, progress, task_id, max_workers=max_workers, scheduler=scheduler)
+        return {"files": result["assembled"], "size": result["bytesFetched"]}
+    
     prefix = f"datasets/{dataset_id}/"
-    objects = list_objects(prefix)
+    objects = dataset_objects(dataset_id)
     
     if not objects:
         raise ValueError(f"No files found for dataset '{dataset_id}'")
@@ -491,9 +1127,10 @@ def download_dataset(
     progress.update(task_id, total=total_size)
     
     downloaded_size = 0
+    downloaded_files = 0
     
     def download_single(obj: dict) -> None:
-        nonlocal downloaded_size
+        nonlocal downloaded_size, downloaded_files
         cos_key = obj["Key"]
         # Remove the prefix to get relative path
         rel_path = cos_key[len(prefix):]
@@ -501,11 +1138,11 @@ def download_dataset(
         
         download_file(cos_key, local_path)
         downloaded_size += obj["Size"]
+        downloaded_files += 1
         progress.update(task_id, completed=downloaded_size)
     
-    # Download files with thread pool
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(download_single, obj): obj for obj in objects}
+    with _transfer_executor(scheduler, dataset_id, max_workers) as submit:
+        futures = {submit(download_single, obj): obj for obj in objects}
         
         for future in as_completed(futures):
             try:
@@ -513,6 +1150,31 @@ def download_dataset(
             except Exception as e:
                 obj = futures[future]
                 progress.console.print(f"[red]Failed to download {obj['Key']}: {e}[/red]")
+    
+    return {"files": downloaded_files, "size": downloaded_size}
+
+
+# Sizes as formatted by format_size, in any case and spacing
+_SIZE_PATTERN = re.compile(r"^\s*([\d.]+)\s*([KMGTP]?B)\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"B": 0, "KB": 1, "MB": 2, "GB": 3, "TB": 4, "PB": 5}
+
+
+def parse_size(text: Any) -> Optional[int]:
+    """
+    Parse a size formatted by format_size (e.g. "1.5 MB").
+    
+    Returns:
+        Size in bytes (approximate), or None if not a size
+    """
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = _SIZE_PATTERN.match(str(text or ""))
+    if not match:
+        return None
+    try:
+        return int(float(match.group(1)) * 1024 ** _SIZE_UNITS[match.group(2).upper()])
+    except ValueError:
+        return None
 
 
 def format_size(size_bytes: int) -> str:
@@ -0,0 +1,294 @@
+"""Dataset-level episode index built from parquet footers for DataHub CLI."""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import ResultCache, file_identity
+from .parquet_preview import PYARROW_AVAILABLE, is_parquet_file
+
+if PYARROW_AVAILABLE:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+# Object key of the index sidecar, relative to the dataset prefix
+INDEX_KEY = ".datahub/index.json"
+
+# Column layout of the rows in index["episodes"]
+EPISODE_COLUMNS = [
+    "episode",
+    "file",
+    "rowStart",
+    "rowEnd",
+    "frames",
+    "timestampStart",
+    "timestampEnd",
+    "byteStart",
+    "byteEnd",
+]
+
+EPISODE_COLUMN = "episode_index"
+TIMESTAMP_COLUMN = "timestamp"
+
+# Local result cache kind of per-file episode runs
+EPISODES_CACHE_KIND = "episode-runs/v1"
+
+
+def build_dataset_index(
+    files: List[Tuple[str, str]],
+    max_workers: int = 8,
+    cache: Optional[ResultCache] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Build an episode index for a LeRobot-style dataset.
+    
+    Parquet footers are read in parallel and episode boundaries are taken
+    from the per-row-group statistics of the episode_index column. Only row
+    groups that contain more than one episode have their episode_index and
+    timestamp columns read to locate the boundaries exactly.
+    
+    Args:
+        files: List of tuples (absolute_path, relative_path), as returned by collect_files
+        max_workers: Number of parallel footer readers
+        cache: Optional local result cache for per-file episode runs
+        
+    Returns:
+        Index dictionary with fps, totalEpisodes, totalFrames, files and
+        episodes, or None if the dataset has no episode information
+    """
+    info = _load_info_json(files)
+    
+    data_files = sorted(
+        (
+            (abs_path, rel_path) for abs_path, rel_path in files
+            if is_parquet_file(abs_path) and not rel_path.replace(os.sep, "/").startswith("meta/")
+        ),
+        key=lambda f: f[1],
+    )
+    
+    episodes: List[List[Any]] = []
+    indexed_files: List[str] = []
+    
+    if data_files and PYARROW_AVAILABLE:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda f: _index_cached(f[0], cache), data_files))
+        
+        for (_, rel_path), file_episodes in zip(data_files, results):
+            if not file_episodes:
+                continue
+            file_idx = len(indexed_files)
+            indexed_files.append(rel_path.replace(os.sep, "/"))
+            for episode in file_episodes:
+                episodes.append([episode[0], file_idx] + episode[1:])
+    
+    if not episodes and not info:
+        return None
+    
+    episodes.sort(key=lambda e: (e[0], e[1], e[2]))
+    
+    total_frames = sum(e[4] for e in episodes) if episodes else info.get("total_frames", 0)
+    total_episodes = len({e[0] for e in episodes}) if episodes else info.get("total_episodes", 0)
+    fps = info.get("fps") or _estimate_fps(episodes)
+    
+    return {
+        "version": 1,
+        "fps": fps,
+        "totalEpisodes": total_episodes,
+        "totalFrames": total_frames,
+        "files": indexed_files,
+        "episodeColumns": EPISODE_COLUMNS,
+        "episodes": episodes,
+    }
+
+
+def dataset_aggregates(index: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the dataset record fields derived from an index."""
+    aggregates = {
+        "totalEpisodes": index["totalEpisodes"],
+        "totalFrames": index["totalFrames"],
+    }
+    if index.get("fps"):
+        aggregates["fps"] = int(round(index["fps"]))
+    return aggregates
+
+
+def encode_index(index: Dict[str, Any]) -> bytes:
+    """Serialize an index as compact JSON."""
+    return json.dumps(index, separators=(",", ":")).encode("utf-8")
+
+
+def _load_info_json(files: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Load meta/info.json if the dataset has one."""
+    for abs_path, rel_path in files:
+        if rel_path.replace(os.sep, "/") == "meta/info.json":
+            try:
+                with open(abs_path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+    return {}
+
+
+def _estimate_fps(episodes: List[List[Any]]) -> Optional[float]:
+    """Estimate fps from episode frame counts and timestamp spans."""
+    frames = 0
+    duration = 0.0
+    for episode in episodes:
+        ts_start, ts_end = episode[5], episode[6]
+        if ts_start is None or ts_end is None or episode[4] < 2:
+            continue
+        frames += episode[4] - 1
+        duration += ts_end - ts_start
+    if frames == 0 or duration <= 0:
+        return None
+    return round(frames / duration, 3)
+
+
+def _index_cached(file_path: str, cache: Optional[ResultCache]) -> List[List[Any]]:
+    """Index a parquet file, reusing cached runs if the file is unchanged."""
+    if cache is None:
+        return _index_parquet_file(file_path)[0]
+    
+    identity = file_identity(file_path)
+    episodes = cache.get(file_path, EPISODES_CACHE_KIND, identity)
+    if episodes is None:
+        episodes, complete = _index_parquet_file(file_path)
+        if complete:
+            cache.put(file_path, EPISODES_CACHE_KIND, episodes, identity)
+    return episodes
+
+
+def _index_parquet_file(file_path: str) -> Tuple[List[List[Any]], bool]:
+    """
+    Index the episodes of a single parquet file.
+    
+    Returns:
+        Tuple of (list of [episode, rowStart, rowEnd, frames, tsStart, tsEnd,
+        byteStart, byteEnd] rows without the file index, whether the whole
+        file could be read)
+    """
+    try:
+        metadata = pq.read_metadata(file_path)
+    except Exception as e:
+        print(f"Warning: Failed to read parquet footer from {file_path}: {e}")
+        return [], False
+    
+    if metadata.num_row_groups == 0:
+        return [], True
+    
+    column_indices = {
+        metadata.row_group(0).column(i).path_in_schema: i
+        for i in range(metadata.num_columns)
+    }
+    episode_col = column_indices.get(EPISODE_COLUMN)
+    if episode_col is None:
+        return [], True
+    timestamp_col = column_indices.get(TIMESTAMP_COLUMN)
+    
+    # Collect [episode, rowStart, rowEnd, tsStart, tsEnd, byteStart, byteEnd] runs
+    runs: List[List[Any]] = []
+    row_start = 0
+    complete = True
+    for rg_index in range(metadata.num_row_groups):
+        row_group = metadata.row_group(rg_index)
+        byte_start, byte_end = _row_group_byte_range(row_group)
+        episode_stats = row_group.column(episode_col).statistics
+        
+        if episode_stats is not None and episode_stats.has_min_max and episode_stats.min == episode_stats.max:
+            ts_start, ts_end = _min_max(row_group, timestamp_col)
+            row_runs = [[episode_stats.min, row_start, row_start + row_group.num_rows, ts_start, ts_end]]
+        else:
+            try:
+                row_runs = _split_row_group(file_path, rg_index, row_start, timestamp_col is not None)
+            except Exception as e:
+                # Like an unreadable footer, a malformed row group is left out of the index
+                print(f"Warning: Failed to read episodes of row group {rg_index} in {file_path}: {e}")
+                row_runs = []
+                complete = False
+        
+        for run in row_runs:
+            _append_run(runs, run + [byte_start, byte_end])
+        row_start += row_group.num_rows
+    
+    return [
+        [episode, start, end, end - start, ts_start, ts_end, byte_start, byte_end]
+        for episode, start, end, ts_start, ts_end, byte_start, byte_end in runs
+    ], complete
+
+
+def _append_run(runs: List[List[Any]], run: List[Any]) -> None:
+    """Append a run, merging it into the previous one when the episode continues."""
+    if runs and runs[-1][0] == run[0] and runs[-1][2] == run[1]:
+        previous = runs[-1]
+        previous[2] = run[2]
+        previous[3] = _pick(min, previous[3], run[3])
+        previous[4] = _pick(max, previous[4], run[4])
+        previous[6] = run[6]
+    else:
+        runs.append(run)
+
+
+def _pick(func, a: Any, b: Any) -> Any:
+    """Apply min/max, ignoring missing values."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return func(a, b)
+
+
+def _min_max(row_group: Any, column_index: Optional[int]) -> Tuple[Any, Any]:
+    """Get min/max statistics for a column chunk, if available."""
+    if column_index is None:
+        return None, None
+    stats = row_group.column(column_index).statistics
+    if stats is None or not stats.has_min_max:
+        return None, None
+    return stats.min, stats.max
+
+
+def _row_group_byte_range(row_group: Any) -> Tuple[int, int]:
+    """Get the [start, end) byte range covering all column chunks of a row group."""
+    start = None
+    end = 0
+    for i in range(row_group.num_columns):
+        chunk = row_group.column(i)
+        offset = chunk.data_page_offset
+        if chunk.has_dictionary_page and chunk.dictionary_page_offset is not None:
+            offset = min(offset, chunk.dictionary_page_offset)
+        start = offset if start is None else min(start, offset)
+        end = max(end, offset + chunk.total_compressed_size)
+    return start or 0, end
+
+
+def _split_row_group(
+    file_path: str,
+    rg_index: int,
+    row_start: int,
+    has_timestamp: bool,
+) -> List[List[Any]]:
+    """
+    Split a row group that holds several episodes into per-episode runs.
+    Only the episode_index (and timestamp) columns of this row group are read.
+    """
+    columns = [EPISODE_COLUMN] + ([TIMESTAMP_COLUMN] if has_timestamp else [])
+    table = pq.ParquetFile(file_path).read_row_group(rg_index, columns=columns)
+    episodes = table.column(EPISODE_COLUMN).combine_chunks()
+    timestamps = table.column(TIMESTAMP_COLUMN).combine_chunks() if has_timestamp else None
+    
+    num_rows = len(episodes)
+    if num_rows == 0:
+        return []
+    
+    changes = pc.indices_nonzero(pc.not_equal(episodes[1:], episodes[:-1])).to_pylist()
+    boundaries = [0] + [i + 1 for i in changes] + [num_rows]
+    
+    runs = []
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        ts_start = ts_end = None
+        if timestamps is not None:
+            span = pc.min_max(timestamps.slice(start, end - start))
+            ts_start, ts_end = span["min"].as_py(), span["max"].as_py()
+        runs.append([episodes[start].as_py(), row_start + start, row_start + end, ts_start, ts_end])
+    return runs
@@ -0,0 +1,363 @@
+"""Latency-aware selection among equivalent COS endpoints for DataHub CLI."""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from qcloud_cos import CosClientError, CosServiceError
+
+from .config import get_cos_config, get_endpoint_specs
+
+T = TypeVar("T")
+
+# Domain suffix of COS global acceleration
+ACCELERATE_ENDPOINT = "cos.accelerate.myqcloud.com"
+
+# Seconds between background probes of all endpoints
+PROBE_INTERVAL = 60.0
+
+# Probes slower than this count as failures
+PROBE_TIMEOUT = 3.0
+
+# Weight of a new sample in the moving averages of latency and throughput
+EWMA_WEIGHT = 0.3
+
+# Transfers up to this size are latency samples, larger ones throughput samples
+LATENCY_SAMPLE_BYTES = 64 * 1024
+
+# Throughput measured longer ago than this is measured again, so an
+# endpoint that was slow once is not avoided forever
+THROUGHPUT_MAX_AGE = 600.0
+
+# Seconds a failed endpoint is skipped, doubled on every further failure
+FAILURE_BACKOFF = 5.0
+MAX_FAILURE_BACKOFF = 300.0
+
+
+class Endpoint:
+    """
+    One way to reach the objects of the bucket: the configured region, the
+    global acceleration domain, a custom domain, or a mirror bucket.
+    
+    Carries the latency and throughput measured for it; these are updated
+    by EndpointSelector under its lock.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        bucket: str,
+        region: str,
+        domain: Optional[str] = None,
+        scheme: str = "https",
+        endpoint: Optional[str] = None,
+        writable: bool = True,
+    ):
+        """
+        Args:
+            name: Name shown to the user (the spec it was parsed from)
+            bucket: Bucket name
+            region: Bucket region
+            domain: Custom domain (host[:port]) serving the bucket
+            scheme: "https" or "http"
+            endpoint: Endpoint domain suffix instead of cos.<region>.myqcloud.com
+            writable: Whether uploads and deletes may go here (false for
+                mirror buckets, which are filled by replication)
+        """
+        self.name = name
+        self.bucket = bucket
+        self.region = region
+        self.domain = domain
+        self.scheme = scheme
+        self.endpoint = endpoint
+        self.writable = writable
+        
+        # Moving averages (None until measured)
+        self.latency: Optional[float] = None
+        self.throughput: Optional[float] = None
+        self.throughput_at = 0.0
+        self.failures = 0
+        self.down_until = 0.0
+    
+    def __repr__(self) -> str:
+        return f"Endpoint({self.name!r})"
+    
+    @property
+    def base_url(self) -> str:
+        """URL of the bucket root on this endpoint."""
+        if self.domain:
+            return f"{self.scheme}://{self.domain}"
+        endpoint = self.endpoint or f"cos.{self.region}.myqcloud.com"
+        return f"{self.scheme}://{self.bucket}.{endpoint}"
+    
+    def url(self, key: str) -> str:
+        """Public URL of an object on this endpoint."""
+        return f"{self.base_url}/{key}"
+    
+    def key_of(self, url: str) -> Optional[str]:
+        """Object key of a URL on this endpoint, or None for other URLs."""
+        prefix = self.base_url + "/"
+        if not self.bucket or not url.startswith(prefix):
+            return None
+        return url[len(prefix):]
+    
+    def cos_config(self) -> Dict[str, Any]:
+        """Keyword arguments of CosConfig that address this endpoint."""
+        kwargs: Dict[str, Any] = {"Region": self.region, "Scheme": self.scheme}
+        if self.domain:
+            kwargs["Domain"] = self.domain
+        elif self.endpoint:
+            kwargs["Endpoint"] = self.endpoint
+        return kwargs
+
+
+def parse_endpoint(spec: str, bucket: str, region: str) -> Endpoint:
+    """
+    Parse an endpoint spec.
+    
+    Specs are "accelerate" (the bucket over global acceleration), a URL
+    such as "https://data.example.com" or "http://127.0.0.1:9000" (a domain
+    serving the bucket), or "<bucket>@<region>" (a read-only mirror bucket).
+    
+    Args:
+        spec: Endpoint spec
+        bucket: Configured bucket
+        region: Configured region
+        
+    Returns:
+        The endpoint
+    """
+    spec = spec.strip()
+    if spec.startswith(("http://", "https://")):
+        parts = urlsplit(spec)
+        if not parts.netloc:
+            raise ValueError(f"Invalid endpoint URL: {spec}")
+        return Endpoint(spec.rstrip("/"), bucket, region, domain=parts.netloc, scheme=parts.scheme)
+    if spec == "accelerate":
+        return Endpoint(spec, bucket, region, endpoint=ACCELERATE_ENDPOINT)
+    mirror_bucket, _, mirror_region = spec.partition("@")
+    if mirror_bucket and mirror_region:
+        return Endpoint(spec, mirror_bucket, mirror_region, writable=False)
+    raise ValueError(f"Invalid endpoint {spec!r}: expected 'accelerate', a URL, or '<bucket>@<region>'")
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + EWMA_WEIGHT * (sample - current)
+
+
+def _classify_error(error: Exception, mirror: bool) -> Tuple[bool, bool]:
+    """
+    Decide how a failed call on an endpoint is handled.
+    
+    Args:
+        error: Exception raised by the call
+        mirror: The endpoint serves a mirror bucket
+        
+    Returns:
+        Tuple of (try the next endpoint, mark this endpoint as down)
+    """
+    if isinstance(error, CosServiceError):
+        status = error.get_status_code()
+    elif isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+    elif isinstance(error, (CosClientError, requests.ConnectionError, requests.Timeout)):
+        # Connection failures and timeouts
+        return True, True
+    else:
+        return False, False
+    
+    if status >= 500 or status == 429:
+        return True, True
+    # An object missing from a mirror may not have been replicated yet
+    if status == 404 and mirror:
+        return True, False
+    return False, False
+
+
+class EndpointSelector:
+    """
+    Sends each transfer to the endpoint expected to finish it first.
+    
+    Endpoints are probed with a HEAD request of their bucket root (any
+    HTTP response counts; private buckets answer 403) on first use and
+    every PROBE_INTERVAL seconds in the background. Every transfer also
+    updates the moving averages of its endpoint: small ones its latency,
+    large ones its throughput. A transfer of n bytes goes to the endpoint
+    with the least latency + n / throughput; large transfers go to an
+    endpoint whose throughput is not known (or THROUGHPUT_MAX_AGE old)
+    by latency alone, so each endpoint gets measured.
+    
+    Connection errors, timeouts and 5xx/429 responses mark an endpoint as
+    down for an exponentially growing time and the transfer is retried on
+    the next endpoint; down endpoints are only used when all others fail.
+    """
+    
+    def __init__(self, endpoints: Sequence[Endpoint], session: Optional[requests.Session] = None):
+        """
+        Args:
+            endpoints: Endpoints, the primary (configured region) first
+            session: Session for probes (default: a new one)
+        """
+        self.endpoints = list(endpoints)
+        self._session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._last_probe = float("-inf")
+        self._probing = False
+    
+    @property
+    def primary(self) -> Endpoint:
+        return self.endpoints[0]
+    
+    def _estimate(self, endpoint: Endpoint, size: int, now: float) -> float:
+        """Expected seconds to transfer size bytes (lock held)."""
+        latency = endpoint.latency if endpoint.latency is not None else PROBE_TIMEOUT
+        if not size or not endpoint.throughput or now - endpoint.throughput_at > THROUGHPUT_MAX_AGE:
+            return latency
+        return latency + size / endpoint.throughput
+    
+    def ranked(self, size: int = 0, write: bool = False) -> List[Endpoint]:
+        """
+        Endpoints in the order a transfer should try them.
+        
+        Args:
+            size: Bytes to transfer (0 to rank by latency)
+            write: Only endpoints that accept uploads
+            
+        Returns:
+            Available endpoints fastest first, then those marked as down
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.writable or not write]
+            up = [endpoint for endpoint in candidates if endpoint.down_until <= now]
+            down = [endpoint for endpoint in candidates if endpoint.down_until > now]
+            up.sort(key=lambda endpoint: self._estimate(endpoint, size, now))
+            down.sort(key=lambda endpoint: endpoint.down_until)
+        return up + down
+    
+    def record_success(self, endpoint: Endpoint, seconds: float, size: Optional[int]) -> None:
+        """
+        Record a completed transfer.
+        
+        Args:
+            endpoint: Endpoint the transfer used
+            seconds: Duration of the transfer
+            size: Bytes transferred (None if unknown; then only the
+                endpoint's failures are reset)
+        """
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+            if size is None:
+                return
+            if size <= LATENCY_SAMPLE_BYTES:
+                endpoint.latency = _ewma(endpoint.latency, seconds)
+            else:
+                transfer_seconds = max(seconds - (endpoint.latency or 0.0), seconds / 2)
+                if time.monotonic() - endpoint.throughput_at > THROUGHPUT_MAX_AGE:
+                    endpoint.throughput = None
+                endpoint.throughput = _ewma(endpoint.throughput, size / transfer_seconds)
+                endpoint.throughput_at = time.monotonic()
+    
+    def record_failure(self, endpoint: Endpoint) -> None:
+        """Mark an endpoint as down for a while."""
+        with self._lock:
+            endpoint.failures += 1
+            backoff = min(MAX_FAILURE_BACKOFF, FAILURE_BACKOFF * 2 ** (endpoint.failures - 1))
+            endpoint.down_until = time.monotonic() + backoff
+    
+    def _probe_one(self, endpoint: Endpoint) -> None:
+        started = time.monotonic()
+        try:
+            self._session.head(endpoint.base_url + "/", timeout=PROBE_TIMEOUT, allow_redirects=False)
+        except requests.RequestException:
+            self.record_failure(endpoint)
+            return
+        self.record_success(endpoint, time.monotonic() - started, 0)
+    
+    def probe(self) -> None:
+        """Measure the latency of all endpoints at once."""
+        try:
+            threads = [threading.Thread(target=self._probe_one, args=(endpoint,), daemon=True) for endpoint in self.endpoints]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            with self._lock:
+                self._probing = False
+    
+    def _maybe_probe(self) -> None:
+        """Probe on first use (waiting for it) and in the background when stale."""
+        now = time.monotonic()
+        with self._lock:
+            if self._probing or now - self._last_probe < PROBE_INTERVAL:
+                return
+            first = self._last_probe == float("-inf")
+            self._probing = True
+            self._last_probe = now
+        if first:
+            self.probe()
+        else:
+            threading.Thread(target=self.probe, name="datahub-endpoint-probe", daemon=True).start()
+    
+    def run(self, fn: Callable[[Endpoint], T], size: Optional[int] = None, write: bool = False) -> T:
+        """
+        Run a transfer on the best endpoint, failing over to the others.
+        
+        Args:
+            fn: Transfer taking the endpoint to use
+            size: Bytes transferred, if known, for ranking and measurement
+            write: The transfer uploads or deletes objects
+            
+        Returns:
+            Result of fn
+        """
+        if len(self.endpoints) == 1:
+            return fn(self.primary)
+        
+        self._maybe_probe()
+        last_error: Optional[Exception] = None
+        for endpoint in self.ranked(size or 0, write):
+            started = time.monotonic()
+            try:
+                result = fn(endpoint)
+            except Exception as e:
+                fail_over, down = _classify_error(e, endpoint.bucket != self.primary.bucket)
+                if not fail_over:
+                    raise
+                if down:
+                    self.record_failure(endpoint)
+                last_error = e
+                continue
+            self.record_success(endpoint, time.monotonic() - started, size)
+            return result
+        
+        if last_error is None:
+            raise ValueError("No writable COS endpoint configured")
+        raise last_error
+
+
+# Selectors by (bucket, region, endpoint specs), kept for the process so
+# measurements carry over between transfers (and commands in the agent)
+_selectors: Dict[Tuple[str, str, Tuple[str, ...]], EndpointSelector] = {}
+_selectors_lock = threading.Lock()
+
+
+def configured_endpoints(bucket: str, region: str, specs: Sequence[str]) -> List[Endpoint]:
+    """The configured region endpoint followed by the additional endpoints."""
+    return [Endpoint(region, bucket, region)] + [parse_endpoint(spec, bucket, region) for spec in specs]
+
+
+def get_endpoint_selector() -> EndpointSelector:
+    """Get the selector over the configured endpoints."""
+    config = get_cos_config()
+    specs = tuple(get_endpoint_specs())
+    key = (config["bucket"], config["region"], specs)
+    with _selectors_lock:
+        selector = _selectors.get(key)
+        if selector is None:
+            selector = _selectors[key] = EndpointSelector(configured_endpoints(config["bucket"], config["region"], specs))
+    return selector
@@ -0,0 +1,302 @@
+"""Streaming per-feature normalization statistics for DataHub CLI."""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache import ResultCache, file_identity
+from .parquet_preview import PYARROW_AVAILABLE, is_parquet_file
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+# Object key of the stats sidecar, relative to the dataset prefix
+STATS_KEY = ".datahub/stats.json"
+
+# Rows decoded per record batch; bounds memory regardless of file size
+DEFAULT_BATCH_SIZE = 65536
+
+# Local result cache kind of per-file accumulators
+STATS_CACHE_KIND = "feature-stats/v1"
+
+
+class RunningStats:
+    """
+    Per-dimension running moments (count, mean, M2, min, max).
+    
+    Batches are reduced with vectorized NumPy operations and combined with
+    Chan et al.'s parallel update, so partial results from different files
+    can be merged in any order without losing precision.
+    """
+    
+    def __init__(self, dim: int):
+        self.count = 0
+        self.mean = np.zeros(dim, dtype=np.float64)
+        self.m2 = np.zeros(dim, dtype=np.float64)
+        self.min = np.full(dim, np.inf, dtype=np.float64)
+        self.max = np.full(dim, -np.inf, dtype=np.float64)
+    
+    def update(self, values: "np.ndarray") -> None:
+        """Add a (rows, dim) batch of values."""
+        if len(values) == 0:
+            return
+        values = values.astype(np.float64, copy=False)
+        batch = RunningStats(values.shape[1])
+        batch.count = len(values)
+        batch.mean = values.mean(axis=0)
+        batch.m2 = ((values - batch.mean) ** 2).sum(axis=0)
+        batch.min = values.min(axis=0)
+        batch.max = values.max(axis=0)
+        self.merge(batch)
+    
+    def merge(self, other: "RunningStats") -> None:
+        """Merge another accumulator into this one."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.m2 = other.m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            return
+        
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / total)
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count = total
+    
+    def to_state(self) -> Dict[str, Any]:
+        """Get the raw moments, so partial results can be stored and merged later."""
+        return {
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+        }
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "RunningStats":
+        """Restore an accumulator saved with to_state."""
+        stats = cls(len(state["mean"]))
+        stats.count = state["count"]
+        stats.mean = np.array(state["mean"], dtype=np.float64)
+        stats.m2 = np.array(state["m2"], dtype=np.float64)
+        stats.min = np.array(state["min"], dtype=np.float64)
+        stats.max = np.array(state["max"], dtype=np.float64)
+        return stats
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a LeRobot-style stats entry."""
+        std = np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.m2)
+        return {
+            "mean": self.mean.tolist(),
+            "std": std.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "count": [self.count],
+        }
+
+
+def check_stats_available() -> bool:
+    """Check if PyArrow and NumPy are available for computing statistics."""
+    return PYARROW_AVAILABLE and NUMPY_AVAILABLE
+
+
+def compute_feature_stats(
+    files: List[Tuple[str, str]],
+    features: Optional[List[str]] = None,
+    max_workers: int = 4,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: Optional[ResultCache] = None,
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Compute per-feature mean/std/min/max over all data parquet files.
+    
+    Every file is streamed in record batches, so memory stays constant no
+    matter how large the dataset is. Numeric scalar columns and fixed-length
+    numeric list columns (e.g. action, observation.state) are included.
+    
+    Args:
+        files: List of tuples (absolute_path, relative_path), as returned by collect_files
+        features: Column names to include (default: all numeric columns)
+        max_workers: Number of files processed in parallel
+        batch_size: Rows decoded per record batch
+        cache: Optional local result cache for per-file accumulators
+        
+    Returns:
+        Dictionary mapping feature name to its statistics, or None if no
+        numeric features were found
+    """
+    if not check_stats_available():
+        return None
+    
+    data_files = [
+        abs_path for abs_path, rel_path in files
+        if is_parquet_file(abs_path) and not rel_path.replace(os.sep, "/").startswith("meta/")
+    ]
+    if not data_files:
+        return None
+    
+    totals: Dict[str, RunningStats] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for file_stats in executor.map(
+            lambda path: _file_stats_cached(path, features, batch_size, cache), data_files
+        ):
+            for name, stats in file_stats.items():
+                if name not in totals:
+                    totals[name] = stats
+                elif len(totals[name].mean) == len(stats.mean):
+                    totals[name].merge(stats)
+    
+    if not any(stats.count for stats in totals.values()):
+        return None
+    
+    return {name: totals[name].to_dict() for name in sorted(totals) if totals[name].count}
+
+
+def encode_stats(stats: Dict[str, Dict[str, Any]]) -> bytes:
+    """Serialize statistics as JSON."""
+    return json.dumps(stats, indent=2).encode("utf-8")
+
+
+def _is_numeric_type(data_type: "pa.DataType") -> bool:
+    """Check if an Arrow type is an integer or floating point type."""
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+def _feature_columns(schema: "pa.Schema", features: Optional[List[str]]) -> List[str]:
+    """Select the numeric scalar and numeric list columns of a schema."""
+    columns = []
+    for field in schema:
+        if features is not None and field.name not in features:
+            continue
+        data_type = field.type
+        if (
+            pa.types.is_list(data_type)
+            or pa.types.is_large_list(data_type)
+            or pa.types.is_fixed_size_list(data_type)
+        ):
+            data_type = data_type.value_type
+        if _is_numeric_type(data_type):
+            columns.append(field.name)
+    return columns
+
+
+def _file_stats_cached(
+    file_path: str,
+    features: Optional[List[str]],
+    batch_size: int,
+    cache: Optional[ResultCache],
+) -> Dict[str, RunningStats]:
+    """Accumulate statistics for one file, reusing cached moments if it is unchanged."""
+    if cache is None:
+        return _file_stats(file_path, features, batch_size) or {}
+    
+    kind = f"{STATS_CACHE_KIND}/{','.join(sorted(features)) if features else '*'}"
+    try:
+        identity = file_identity(file_path)
+    except OSError as e:
+        print(f"Warning: Failed to read {file_path} for statistics: {e}")
+        return {}
+    state = cache.get(file_path, kind, identity)
+    if state is not None:
+        return {name: RunningStats.from_state(s) for name, s in state.items()}
+    
+    stats = _file_stats(file_path, features, batch_size)
+    if stats is None:
+        return {}
+    cache.put(file_path, kind, {name: s.to_state() for name, s in stats.items()}, identity)
+    return stats
+
+
+def _file_stats(
+    file_path: str,
+    features: Optional[List[str]],
+    batch_size: int,
+) -> Optional[Dict[str, RunningStats]]:
+    """
+    Accumulate statistics for one parquet file, one record batch at a time.
+    Returns None if the file cannot be read; it is then left out of the
+    statistics, like files without an index in dataset_index.
+    """
+    try:
+        parquet_file = pq.ParquetFile(file_path)
+    except Exception as e:
+        print(f"Warning: Failed to open {file_path} for statistics: {e}")
+        return None
+    
+    columns = _feature_columns(parquet_file.schema_arrow, features)
+    if not columns:
+        return {}
+    
+    try:
+        return _accumulate(parquet_file, columns, batch_size)
+    except Exception as e:
+        print(f"Warning: Failed to read {file_path} for statistics: {e}")
+        return None
+
+
+def _accumulate(parquet_file: "pq.ParquetFile", columns: List[str], batch_size: int) -> Dict[str, RunningStats]:
+    """Accumulate statistics for the given columns of an open parquet file."""
+    stats: Dict[str, RunningStats] = {}
+    skipped = set()
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        for name in columns:
+            if name in skipped:
+                continue
+            values = _to_matrix(batch.column(name))
+            if values is not None and len(values) == 0:
+                continue
+            if values is None or (name in stats and values.shape[1] != len(stats[name].mean)):
+                # Variable-length lists have no per-dimension statistics
+                skipped.add(name)
+                stats.pop(name, None)
+                continue
+            if name not in stats:
+                stats[name] = RunningStats(values.shape[1])
+            stats[name].update(values)
+    
+    return stats
+
+
+def _to_matrix(array: "pa.Array") -> Optional["np.ndarray"]:
+    """
+    Convert a numeric column batch to a (rows, dim) float matrix without
+    going through Python objects. Returns None for ragged list columns.
+    """
+    array = pc.drop_null(array)
+    data_type = array.type
+    
+    if _is_numeric_type(data_type):
+        return array.to_numpy(zero_copy_only=False).reshape(-1, 1)
+    
+    if len(array) == 0:
+        return np.empty((0, 0))
+    
+    if pa.types.is_fixed_size_list(data_type):
+        dim = data_type.list_size
+    else:
+        lengths = pc.list_value_length(array)
+        bounds = pc.min_max(lengths)
+        dim = bounds["min"].as_py()
+        if dim != bounds["max"].as_py() or not dim:
+            return None
+    
+    flat = pc.list_flatten(array)
+    if flat.null_count:
+        return None
+    return flat.to_numpy(zero_copy_only=False).reshape(-1, dim)
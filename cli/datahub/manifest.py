@@ -0,0 +1,254 @@
+"""Disk-backed upload manifest for DataHub CLI."""
+
+import contextvars
+import json
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Version of a manifest entry: offsets of its file record and extra fields
+EntryVersion = Tuple[int, Optional[int]]
+
+
+class ManifestSpool:
+    """
+    Upload manifest that spills file entries to a temporary file.
+    
+    Upload results and parquet preview fields are appended to disk as they
+    arrive, and only their offsets are kept in memory. Entries are joined
+    when the manifest is read back for upload_complete.
+    """
+    
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(mode="w+b", prefix="datahub-manifest-")
+        self._lock = threading.Lock()
+        self._entries: Dict[str, int] = {}
+        self._fields: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self._published: Dict[str, EntryVersion] = {}
+        self.total_size = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_entries()
+    
+    def __enter__(self) -> "ManifestSpool":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def _append(self, record: Dict[str, Any]) -> int:
+        """Append a JSON line and return its offset."""
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            self._file.seek(0, 2)
+            offset = self._file.tell()
+            self._file.write(line)
+        return offset
+    
+    def _read(self, offset: int) -> Dict[str, Any]:
+        """Read the JSON line at an offset."""
+        with self._lock:
+            self._file.seek(offset)
+            return json.loads(self._file.readline())
+    
+    def add_file(self, entry: Dict[str, Any]) -> None:
+        """
+        Record an uploaded file.
+        
+        Args:
+            entry: File entry with at least 'path' and 'size'
+        """
+        offset = self._append(entry)
+        with self._lock:
+            if entry["path"] not in self._entries:
+                self.total_size += entry.get("size", 0)
+            self._entries[entry["path"]] = offset
+    
+    def add_fields(self, path: str, fields: Dict[str, Any]) -> None:
+        """
+        Record extra manifest fields (previewData, summary, ...) for a file.
+        
+        Args:
+            path: Relative file path the fields belong to
+            fields: Fields merged into the file entry when it is read
+        """
+        if not fields:
+            return
+        offset = self._append(fields)
+        with self._lock:
+            self._fields[path] = (offset, tuple(fields))
+    
+    def count_field(self, name: str) -> int:
+        """Count uploaded files that have a given extra field."""
+        with self._lock:
+            return sum(
+                1 for path, (_, names) in self._fields.items()
+                if name in names and path in self._entries
+            )
+    
+    def iter_entries(self, paths: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the uploaded file entries with their extra fields merged in.
+        
+        Args:
+            paths: Only these paths (default: all uploaded files)
+        """
+        with self._lock:
+            offsets = [
+                (path, self._entries[path])
+                for path in (self._entries if paths is None else paths)
+                if path in self._entries
+            ]
+        for path, offset in offsets:
+            entry = self._read(offset)
+            fields = self._fields.get(path)
+            if fields is not None:
+                entry.update(self._read(fields[0]))
+            yield entry
+    
+    def unpublished(self) -> Dict[str, EntryVersion]:
+        """
+        Get the uploaded files that are new, or got extra fields, since the
+        last mark_published.
+        
+        Returns:
+            Versions by path, to pass to mark_published once sent
+        """
+        with self._lock:
+            versions = {}
+            for path, offset in self._entries.items():
+                fields = self._fields.get(path)
+                version = (offset, fields[0] if fields else None)
+                if self._published.get(path) != version:
+                    versions[path] = version
+            return versions
+    
+    def mark_published(self, versions: Dict[str, EntryVersion]) -> None:
+        """Record entry versions as sent to the server."""
+        with self._lock:
+            self._published.update(versions)
+    
+    def close(self) -> None:
+        """Delete the spool file."""
+        self._file.close()
+
+
+class ManifestCheckpointer:
+    """
+    Publishes a manifest's new entries periodically while an upload runs.
+    
+    Every interval seconds, entries that are new or got their preview since
+    the last checkpoint are handed to publish (e.g. a merging
+    upload_complete) on a background thread, so the files appear on the
+    hub while the upload continues and stay there if it dies halfway.
+    Failed checkpoints are retried at the next interval.
+    """
+    
+    def __init__(
+        self,
+        manifest: ManifestSpool,
+        publish: Callable[[Iterable[Dict[str, Any]]], Any],
+        interval: float = 5.0,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        """
+        Args:
+            manifest: Manifest being filled by the upload
+            publish: Called with the entries of a checkpoint
+            interval: Seconds between checkpoints
+            on_error: Called with the exception of a failed checkpoint
+        """
+        self.manifest = manifest
+        self.publish = publish
+        self.interval = interval
+        self.on_error = on_error
+        self.checkpoints = 0
+        self._stop = threading.Event()
+        # Run in the creator's context, so on_error output goes where its own does
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run,),
+            name="datahub-checkpoint",
+            daemon=True,
+        )
+    
+    def __enter__(self) -> "ManifestCheckpointer":
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, *exc_info) -> None:
+        # A failed or interrupted upload publishes what it has so far
+        self.stop(flush=exc_type is not None)
+    
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+    
+    def flush(self) -> bool:
+        """
+        Publish the entries that changed since the last checkpoint.
+        
+        Returns:
+            False if publishing failed
+        """
+        versions = self.manifest.unpublished()
+        if not versions:
+            return True
+        try:
+            self.publish(self.manifest.iter_entries(versions))
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+            return False
+        self.manifest.mark_published(versions)
+        self.checkpoints += 1
+        return True
+    
+    def stop(self, flush: bool = False) -> None:
+        """
+        Stop publishing checkpoints.
+        
+        Args:
+            flush: Publish the remaining changed entries first
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if flush:
+            self.flush()
+
+
+def iter_chunks(
+    entries: Any,
+    max_bytes: int = 4 * 1024 * 1024,
+    max_entries: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Group manifest entries into chunks of bounded encoded size.
+    
+    Args:
+        entries: Iterable of file entries
+        max_bytes: Approximate maximum JSON size of a chunk
+        max_entries: Optional maximum number of entries per chunk
+        
+    Yields:
+        Lists of file entries
+    """
+    chunk: List[Dict[str, Any]] = []
+    chunk_bytes = 0
+    for entry in entries:
+        entry_bytes = len(json.dumps(entry, separators=(",", ":")))
+        if chunk and (
+            chunk_bytes + entry_bytes > max_bytes
+            or (max_entries is not None and len(chunk) >= max_entries)
+        ):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(entry)
+        chunk_bytes += entry_bytes
+    if chunk:
+        yield chunk
@@ -0,0 +1,564 @@
+"""MP4 container index extraction and fast-start rewriting for DataHub CLI."""
+
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import accumulate
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from rich.progress import Progress, TaskID
+
+from .cache import ResultCache, file_identity
+from .profiling import timed
+from .staging import StagingArea
+
+MP4_EXTENSIONS = (".mp4", ".m4v", ".mov")
+
+# Cache kind of extracted video info; bump the version when its layout changes
+VIDEO_INFO_CACHE_KIND = "mp4-index/v1"
+
+# Staging area kind of files rewritten with the moov first; bump the version
+# whenever the rewrite changes
+FASTSTART_STAGING_KIND = "mp4-faststart/v1"
+
+# Larger movie boxes are not read (an hour of 30 fps video has a few MB)
+MAX_MOOV_BYTES = 256 * 1024 * 1024
+
+# Keyframes stored per file; longer tables are thinned out evenly
+MAX_KEYFRAMES = 4096
+
+# Boxes on the way from moov to the chunk offset tables
+_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+# Bytes of a visual sample entry before its child boxes (avcC, ...)
+_VISUAL_SAMPLE_ENTRY_BYTES = 78
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class MP4Error(ValueError):
+    """The file is not an MP4 file this module can read."""
+
+
+def is_mp4_file(file_path: str) -> bool:
+    """Check if a file is an MP4 (or QuickTime) video."""
+    return file_path.lower().endswith(MP4_EXTENSIONS)
+
+
+def _top_level_boxes(f: BinaryIO, file_size: int) -> List[Tuple[bytes, int, int, int]]:
+    """
+    List the top-level boxes of a file from their headers only (media data
+    is skipped with seeks).
+    
+    Returns:
+        List of (type, offset, header_size, size) tuples
+    """
+    boxes = []
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if size == 1:
+            if len(header) < 16:
+                raise MP4Error(f"truncated {box_type!r} box header at {offset}")
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size or offset + size > file_size:
+            raise MP4Error(f"invalid {box_type!r} box at {offset}")
+        boxes.append((box_type, offset, header_size, size))
+        offset += size
+    return boxes
+
+
+def _boxes(data: memoryview, start: int, end: int) -> List[Tuple[bytes, int, int, int]]:
+    """
+    List the boxes in data[start:end].
+    
+    Returns:
+        List of (type, box_start, payload_start, box_end) tuples
+    """
+    boxes = []
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        payload = offset + 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, payload)[0]
+            payload += 8
+        elif size == 0:
+            size = end - offset
+        if size < payload - offset or offset + size > end:
+            raise MP4Error(f"invalid {box_type!r} box in the movie box")
+        boxes.append((box_type, offset, payload, offset + size))
+        offset += size
+    return boxes
+
+
+def _child(data: memoryview, start: int, end: int, *path: bytes) -> Optional[Tuple[int, int]]:
+    """Find the payload range of the first box along a path of box types."""
+    for box_type in path:
+        for child_type, _, payload, box_end in _boxes(data, start, end):
+            if child_type == box_type:
+                start, end = payload, box_end
+                break
+        else:
+            return None
+    return start, end
+
+
+def _table(data: memoryview, offset: int, count: int, typecode: str = "I") -> array:
+    """Read count big-endian integers."""
+    values = array(typecode)
+    values.frombytes(data[offset:offset + count * values.itemsize])
+    if len(values) != count:
+        raise MP4Error("truncated sample table")
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def _full_box_table(data: memoryview, box: Optional[Tuple[int, int]], width: int, typecode: str = "I") -> Optional[array]:
+    """Read a sample table of entry_count entries of width integers each."""
+    if box is None:
+        return None
+    count = struct.unpack_from(">I", data, box[0] + 4)[0]
+    return _table(data, box[0] + 8, count * width, typecode)
+
+
+def _timescale_duration(data: memoryview, box: Tuple[int, int]) -> Tuple[int, int]:
+    """Read the timescale and duration of an mvhd or mdhd box."""
+    if data[box[0]] == 1:
+        return struct.unpack_from(">IQ", data, box[0] + 20)
+    return struct.unpack_from(">II", data, box[0] + 12)
+
+
+def _codec(data: memoryview, stsd: Tuple[int, int]) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    Read the codec of a track's first sample entry, as an RFC 6381 codec
+    string where the parameters are simple to derive (avc1.64001f).
+    
+    Returns:
+        (codec, width, height); sizes are None for non-visual entries
+    """
+    entries = _boxes(data, stsd[0] + 8, stsd[1])
+    if not entries:
+        raise MP4Error("track without sample description")
+    entry_type, _, payload, end = entries[0]
+    codec = entry_type.decode("latin-1").strip()
+    if end - payload < _VISUAL_SAMPLE_ENTRY_BYTES:
+        return codec, None, None
+    
+    width, height = struct.unpack_from(">HH", data, payload + 24)
+    if entry_type in (b"avc1", b"avc3"):
+        avcc = _child(data, payload + _VISUAL_SAMPLE_ENTRY_BYTES, end, b"avcC")
+        if avcc is not None and avcc[1] - avcc[0] >= 4:
+            profile, constraints, level = data[avcc[0] + 1:avcc[0] + 4]
+            codec = f"{codec}.{profile:02x}{constraints:02x}{level:02x}"
+    return codec, width, height
+
+
+def _run_values(runs: array, samples: List[int], cumulative: bool) -> List[int]:
+    """
+    Look up sorted 1-based sample numbers in a run-length table of
+    (sample_count, value) pairs (stts or ctts).
+    
+    Args:
+        runs: Flat table of (sample_count, value) pairs
+        samples: Sample numbers in ascending order
+        cumulative: Sum the values of the preceding samples (decode times
+            from stts) instead of returning each sample's own value (ctts)
+    """
+    values = []
+    run = 0
+    first = 1
+    total = 0
+    for sample in samples:
+        while run < len(runs) and sample >= first + runs[run]:
+            total += runs[run] * runs[run + 1]
+            first += runs[run]
+            run += 2
+        if run >= len(runs):
+            values.append(total if cumulative else 0)
+        elif cumulative:
+            values.append(total + (sample - first) * runs[run + 1])
+        else:
+            values.append(runs[run + 1])
+    return values
+
+
+def _sample_offsets(
+    stsc: array,
+    chunk_offsets: array,
+    sample_size: int,
+    sizes: Optional[array],
+    samples: List[int],
+) -> List[int]:
+    """Find the file offsets of sorted 1-based sample numbers."""
+    prefix = list(accumulate(sizes, initial=0)) if sizes is not None else None
+    
+    def bytes_between(first: int, sample: int) -> int:
+        if prefix is None:
+            return (sample - first) * sample_size
+        return prefix[sample - 1] - prefix[first - 1]
+    
+    offsets = []
+    entry = 0
+    entries = len(stsc) // 3
+    run_first_sample = 1
+    index = 0
+    while index < len(samples) and entry < entries:
+        first_chunk, per_chunk = stsc[entry * 3], stsc[entry * 3 + 1]
+        last_chunk = stsc[(entry + 1) * 3] - 1 if entry + 1 < entries else len(chunk_offsets)
+        run_end = run_first_sample + (last_chunk - first_chunk + 1) * per_chunk
+        while index < len(samples) and samples[index] < run_end:
+            chunk = first_chunk + (samples[index] - run_first_sample) // per_chunk
+            chunk_first_sample = run_first_sample + (chunk - first_chunk) * per_chunk
+            offsets.append(chunk_offsets[chunk - 1] + bytes_between(chunk_first_sample, samples[index]))
+            index += 1
+        run_first_sample = run_end
+        entry += 1
+    if index < len(samples):
+        raise MP4Error("sample table refers to missing chunks")
+    return offsets
+
+
+def _video_track(data: memoryview, moov: Tuple[int, int]) -> Optional[Dict[str, Any]]:
+    """Read the sample tables of the first video track."""
+    for box_type, _, payload, end in _boxes(data, *moov):
+        if box_type != b"trak":
+            continue
+        hdlr = _child(data, payload, end, b"mdia", b"hdlr")
+        if hdlr is None or bytes(data[hdlr[0] + 8:hdlr[0] + 12]) != b"vide":
+            continue
+            
+        mdhd = _child(data, payload, end, b"mdia", b"mdhd")
+        stbl = _child(data, payload, end, b"mdia", b"minf", b"stbl")
+        if mdhd is None or stbl is None:
+            raise MP4Error("video track without media header or sample table")
+        tables = {box_type: (start, box_end) for box_type, _, start, box_end in _boxes(data, *stbl)}
+        
+        if b"stsd" not in tables or b"stts" not in tables or b"stsc" not in tables:
+            raise MP4Error("incomplete video sample table")
+        if b"stsz" not in tables:
+            raise MP4Error("unsupported sample size table (stz2)")
+        if b"stco" in tables:
+            chunk_offsets = _full_box_table(data, tables[b"stco"], 1)
+        elif b"co64" in tables:
+            chunk_offsets = _full_box_table(data, tables[b"co64"], 1, "Q")
+        else:
+            raise MP4Error("video track without chunk offsets")
+        
+        stsz = tables[b"stsz"][0]
+        sample_size, sample_count = struct.unpack_from(">II", data, stsz + 4)
+        ctts = None
+        if b"ctts" in tables:
+            # Version 1 has signed composition offsets
+            ctts = _full_box_table(data, tables[b"ctts"], 2, "i" if data[tables[b"ctts"][0]] == 1 else "I")
+        
+        return {
+            "timescale": _timescale_duration(data, mdhd)[0],
+            "codec": _codec(data, tables[b"stsd"]),
+            "tkhd": _child(data, payload, end, b"tkhd"),
+            "stts": _full_box_table(data, tables[b"stts"], 2),
+            "ctts": ctts,
+            "stss": _full_box_table(data, tables.get(b"stss"), 1),
+            "stsc": _full_box_table(data, tables[b"stsc"], 3),
+            "chunkOffsets": chunk_offsets,
+            "sampleSize": sample_size,
+            "sampleCount": sample_count,
+            "sizes": _table(data, stsz + 12, sample_count) if sample_size == 0 else None,
+        }
+    return None
+
+
+@timed
+def extract_video_info(file_path: str, max_keyframes: int = MAX_KEYFRAMES) -> Dict[str, Any]:
+    """
+    Extract the container index of an MP4 file without decoding any video.
+    
+    Only the box headers and the movie box (moov) are read; media data is
+    skipped with seeks. Keyframe times are media times (decode time plus
+    composition offset, without edit lists); offsets point at the first
+    byte of each keyframe sample in the file.
+    
+    Args:
+        file_path: Path to the MP4 file
+        max_keyframes: Maximum number of keyframes to return
+        
+    Returns:
+        Dictionary with duration (seconds), fps, frames, width, height,
+        codec, faststart (whether moov precedes the media data), the moov
+        byte range, and keyframes as [sample, seconds, offset] triples
+        (sample numbers are 0-based)
+        
+    Raises:
+        MP4Error: If the file is not a readable MP4 file
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        top = _top_level_boxes(f, file_size)
+        moov = next((box for box in top if box[0] == b"moov"), None)
+        if moov is None:
+            raise MP4Error("no movie box (moov)")
+        _, moov_offset, header_size, moov_size = moov
+        if moov_size > MAX_MOOV_BYTES:
+            raise MP4Error(f"movie box of {moov_size} bytes is too large")
+        f.seek(moov_offset)
+        data = memoryview(f.read(moov_size))
+    
+    mdat_offsets = [offset for box_type, offset, _, _ in top if box_type == b"mdat"]
+    info: Dict[str, Any] = {
+        "faststart": not mdat_offsets or moov_offset < min(mdat_offsets),
+        "moovOffset": moov_offset,
+        "moovSize": moov_size,
+    }
+    try:
+        info.update(_movie_info(data, (header_size, moov_size), max_keyframes))
+    except (struct.error, IndexError, ZeroDivisionError) as e:
+        raise MP4Error(f"corrupt movie box: {e}") from None
+    return info
+
+
+def _movie_info(data: memoryview, moov_payload: Tuple[int, int], max_keyframes: int) -> Dict[str, Any]:
+    """Read duration, video format and keyframes from a movie box."""
+    info: Dict[str, Any] = {}
+    mvhd = _child(data, *moov_payload, b"mvhd")
+    if mvhd is not None:
+        timescale, duration = _timescale_duration(data, mvhd)
+        info["duration"] = round(duration / timescale, 3) if timescale else None
+    
+    track = _video_track(data, moov_payload)
+    if track is None:
+        return info
+    
+    codec, width, height = track["codec"]
+    if width is None and track["tkhd"] is not None:
+        # 16.16 fixed-point presentation size at the end of tkhd
+        tkhd_end = track["tkhd"][1]
+        width, height = (value >> 16 for value in struct.unpack_from(">II", data, tkhd_end - 8))
+    
+    frames = track["sampleCount"]
+    stts = track["stts"]
+    ticks = sum(stts[i] * stts[i + 1] for i in range(0, len(stts), 2))
+    timescale = track["timescale"]
+    
+    stss = track["stss"]
+    keyframes = list(stss) if stss is not None else list(range(1, frames + 1))
+    keyframe_count = len(keyframes)
+    if keyframe_count > max_keyframes:
+        step = keyframe_count / max_keyframes
+        keyframes = [keyframes[int(i * step)] for i in range(max_keyframes)]
+    
+    times = _run_values(stts, keyframes, cumulative=True)
+    if track["ctts"] is not None:
+        times = [time + shift for time, shift in zip(times, _run_values(track["ctts"], keyframes, cumulative=False))]
+    offsets = _sample_offsets(track["stsc"], track["chunkOffsets"], track["sampleSize"], track["sizes"], keyframes)
+    
+    info.update({
+        "codec": codec,
+        "width": width,
+        "height": height,
+        "frames": frames,
+        "fps": round(frames * timescale / ticks, 3) if ticks and timescale else None,
+        "keyframeCount": keyframe_count,
+        "keyframes": [
+            [sample - 1, round(time / timescale, 6) if timescale else 0, offset]
+            for sample, time, offset in zip(keyframes, times, offsets)
+        ],
+    })
+    if info.get("duration") is None and timescale:
+        info["duration"] = round(ticks / timescale, 3)
+    return info
+
+
+def cached_video_info(file_path: str, cache: Optional[ResultCache] = None) -> Dict[str, Any]:
+    """
+    Get the video info of a file from the local result cache, extracting
+    and caching it if the file changed.
+    
+    Raises:
+        MP4Error: If the file is not a readable MP4 file
+    """
+    identity = file_identity(file_path)
+    if cache is not None:
+        cached = cache.get(file_path, VIDEO_INFO_CACHE_KIND, identity)
+        if cached:
+            return cached
+    info = extract_video_info(file_path)
+    if cache is not None:
+        cache.put(file_path, VIDEO_INFO_CACHE_KIND, info, identity)
+    return info
+
+
+def _box_header(box_type: bytes, payload_size: int) -> bytes:
+    if payload_size + 8 <= 0xFFFFFFFF:
+        return struct.pack(">I4s", payload_size + 8, box_type)
+    return struct.pack(">I4sQ", 1, box_type, payload_size + 16)
+
+
+def _relocate_moov(data: memoryview, start: int, end: int, relocate) -> bytes:
+    """
+    Rebuild the boxes in data[start:end] with every chunk offset passed
+    through relocate; 32-bit tables that would overflow become co64.
+    """
+    out = []
+    for box_type, box_start, payload, box_end in _boxes(data, start, end):
+        if box_type in _CONTAINER_BOXES:
+            children = _relocate_moov(data, payload, box_end, relocate)
+            out.append(_box_header(box_type, len(children)) + children)
+        elif box_type in (b"stco", b"co64"):
+            offsets = _full_box_table(data, (payload, box_end), 1, "I" if box_type == b"stco" else "Q")
+            moved = array("Q", (relocate(offset) for offset in offsets))
+            if box_type == b"stco" and (not moved or max(moved) <= 0xFFFFFFFF):
+                table = array("I", moved)
+            else:
+                box_type, table = b"co64", moved
+            if sys.byteorder == "little":
+                table.byteswap()
+            body = bytes(data[payload:payload + 4]) + struct.pack(">I", len(moved)) + table.tobytes()
+            out.append(_box_header(box_type, len(body)) + body)
+        else:
+            out.append(bytes(data[box_start:box_end]))
+    return b"".join(out)
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, offset: int, size: int) -> None:
+    src.seek(offset)
+    while size > 0:
+        chunk = src.read(min(_COPY_CHUNK, size))
+        if not chunk:
+            raise MP4Error("file ended early")
+        dst.write(chunk)
+        size -= len(chunk)
+
+
+def faststart_mp4_file(src_path: str, dst_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Rewrite an MP4 file with its movie box (moov) before the media data,
+    so a player can start after one small range request.
+    
+    The media data is copied as it is, in order; only the chunk offsets in
+    the movie box are moved by the size of the relocated movie box.
+    
+    Args:
+        src_path: MP4 file with moov after the media data
+        dst_path: Path of the rewritten file
+        
+    Returns:
+        Dictionary with the moov size and the file sizes before/after, or
+        None if the file already starts with its moov (or is fragmented)
+        
+    Raises:
+        MP4Error: If the file is not a readable MP4 file
+    """
+    file_size = os.path.getsize(src_path)
+    with open(src_path, "rb") as src:
+        top = _top_level_boxes(src, file_size)
+        types = [box[0] for box in top]
+        if b"moov" not in types or b"mdat" not in types or b"moof" in types:
+            return None
+        moov_index = types.index(b"moov")
+        first_mdat = types.index(b"mdat")
+        if moov_index < first_mdat:
+            return None
+        
+        _, moov_offset, header_size, moov_size = top[moov_index]
+        if moov_size > MAX_MOOV_BYTES:
+            raise MP4Error(f"movie box of {moov_size} bytes is too large")
+        src.seek(moov_offset)
+        data = memoryview(src.read(moov_size))
+        if _child(data, header_size, moov_size, b"cmov") is not None:
+            raise MP4Error("compressed movie box")
+        insert_at = top[first_mdat][1]
+        
+        # Data from the first mdat on moves back by the new moov, and data
+        # after the old moov forward again by its size
+        new_size = moov_size
+        while True:
+            def relocate(offset: int, shift: int = new_size) -> int:
+                if offset < insert_at:
+                    return offset
+                return offset + shift - (moov_size if offset >= moov_offset + moov_size else 0)
+            
+            try:
+                children = _relocate_moov(data, header_size, moov_size, relocate)
+            except (struct.error, IndexError, ZeroDivisionError) as e:
+                raise MP4Error(f"corrupt movie box: {e}") from None
+            new_moov = _box_header(b"moov", len(children)) + children
+            if len(new_moov) == new_size:
+                break
+            # Tables widened to co64 grow the box, which moves the data again
+            new_size = len(new_moov)
+        
+        os.makedirs(os.path.dirname(os.path.abspath(dst_path)), exist_ok=True)
+        with open(dst_path, "wb") as dst:
+            for index, (box_type, offset, _, size) in enumerate(top):
+                if index == first_mdat:
+                    dst.write(new_moov)
+                if index != moov_index:
+                    _copy_range(src, dst, offset, size)
+    
+    return {"moovSize": len(new_moov), "sizeBefore": file_size, "sizeAfter": os.path.getsize(dst_path)}
+
+
+def faststart_mp4_files(
+    files: List[Tuple[str, str]],
+    staging: StagingArea,
+    progress: Progress,
+    task_id: TaskID,
+    max_workers: int = 4,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """
+    Rewrite the MP4 files of a dataset that keep their moov at the end.
+    
+    Files that already start with their moov are left as they are, as are
+    files that fail to rewrite. Rewritten files are kept in the staging
+    area and reused while their source is unchanged.
+    
+    Args:
+        files: List of tuples (absolute_path, relative_path), as returned by collect_files
+        staging: Staging area for rewritten files
+        progress: Rich progress instance
+        task_id: Progress task ID
+        max_workers: Number of files rewritten in parallel
+        
+    Returns:
+        Tuple of (files with rewritten files substituted, report) where the
+        report has rewritten/reused/skipped/failed counts (reused files are
+        also counted as rewritten)
+    """
+    mp4_files = [f for f in files if is_mp4_file(f[0])]
+    progress.update(task_id, total=len(mp4_files))
+    
+    report = {"rewritten": 0, "reused": 0, "skipped": 0, "failed": 0}
+    replacements: Dict[str, str] = {}
+    
+    def rewrite_single(file_info: Tuple[str, str]) -> Optional[Tuple[str, Dict[str, Any], bool]]:
+        return staging.stage(file_info[0], FASTSTART_STAGING_KIND, faststart_mp4_file)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(rewrite_single, f): f for f in mp4_files}
+        
+        for future in as_completed(futures):
+            abs_path, rel_path = futures[future]
+            try:
+                staged = future.result()
+                if staged is None:
+                    report["skipped"] += 1
+                else:
+                    replacements[abs_path] = staged[0]
+                    report["rewritten"] += 1
+                    report["reused"] += int(staged[2])
+            except (OSError, MP4Error) as e:
+                report["failed"] += 1
+                progress.console.print(f"[yellow]Warning: Failed to move the index of {rel_path} to the front, uploading as is: {e}[/yellow]")
+            progress.advance(task_id)
+    
+    rewritten_files = [(replacements.get(abs_path, abs_path), rel_path) for abs_path, rel_path in files]
+    return rewritten_files, report
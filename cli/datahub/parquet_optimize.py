@@ -0,0 +1,222 @@
+"""Parquet re-layout for range-read efficiency for DataHub CLI."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.progress import Progress, TaskID
+
+from .parquet_preview import PYARROW_AVAILABLE, is_parquet_file
+from .staging import StagingArea
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# Target uncompressed size of a rewritten row group. Small enough that a
+# reader selecting a few episodes or columns fetches a bounded range.
+DEFAULT_ROW_GROUP_BYTES = 32 * 1024 * 1024
+
+# Existing row groups are only considered too large past this factor of the
+# target, so files close to the target are not rewritten for nothing
+ROW_GROUP_TOLERANCE = 2
+
+DEFAULT_COMPRESSION = "zstd"
+
+# Staging area kind of rewritten files; bump the version whenever the
+# rewrite changes
+STAGING_KIND = "parquet-optimize/v1"
+
+# Rows decoded per batch while streaming a file through the writer
+_READ_BATCH_ROWS = 8192
+
+
+def check_parquet_layout(
+    file_path: str,
+    max_row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+    compression: str = DEFAULT_COMPRESSION,
+) -> List[str]:
+    """
+    Check whether a parquet file is laid out for cheap selective reads.
+    
+    Only the footer is read.
+    
+    Args:
+        file_path: Path to the parquet file
+        max_row_group_bytes: Target uncompressed row group size
+        compression: Expected compression codec
+        
+    Returns:
+        List of layout problems; empty if the file is already good
+    """
+    metadata = pq.read_metadata(file_path)
+    problems = []
+    
+    oversized = sum(
+        1 for i in range(metadata.num_row_groups)
+        if metadata.row_group(i).total_byte_size > max_row_group_bytes * ROW_GROUP_TOLERANCE
+    )
+    if oversized:
+        problems.append(f"{oversized} oversized row groups")
+    
+    # Writers never store statistics for all-null columns, and skip them for
+    # byte arrays with large values (images), so those are not held against a file
+    needs_stats = [
+        metadata.schema.column(j).physical_type != "BYTE_ARRAY"
+        and str(metadata.schema.column(j).logical_type) != "Null"
+        for j in range(metadata.num_columns)
+    ]
+    
+    missing_stats = set()
+    missing_page_index = set()
+    codecs = set()
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            codecs.add(column.compression.lower())
+            if needs_stats[j] and not column.is_stats_set:
+                missing_stats.add(column.path_in_schema)
+            if not column.has_offset_index:
+                missing_page_index.add(column.path_in_schema)
+    
+    if missing_stats:
+        problems.append(f"no statistics for {len(missing_stats)} columns")
+    if missing_page_index:
+        problems.append("no page index")
+    if codecs - {compression.lower()}:
+        problems.append(f"{'/'.join(sorted(codecs))} compression")
+    
+    return problems
+
+
+def optimize_parquet_file(
+    src_path: str,
+    dst_path: str,
+    max_row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+    compression: str = DEFAULT_COMPRESSION,
+) -> Dict[str, Any]:
+    """
+    Rewrite a parquet file with bounded row groups, statistics, page
+    indexes and the given compression.
+    
+    The file is streamed in record batches and at most one output row group
+    is held in memory. Schema metadata (e.g. the LeRobot/HuggingFace
+    features) is preserved.
+    
+    Args:
+        src_path: Source parquet file
+        dst_path: Output path
+        max_row_group_bytes: Target uncompressed row group size
+        compression: Compression codec
+        
+    Returns:
+        Dictionary with sizes and row group counts before and after
+    """
+    parquet_file = pq.ParquetFile(src_path)
+    metadata = parquet_file.metadata
+    
+    uncompressed = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    bytes_per_row = max(1, uncompressed // max(1, metadata.num_rows))
+    row_group_rows = max(1, max_row_group_bytes // bytes_per_row)
+    
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    with pq.ParquetWriter(
+        dst_path,
+        parquet_file.schema_arrow,
+        compression=compression,
+        write_statistics=True,
+        write_page_index=True,
+    ) as writer:
+        pending: List["pa.RecordBatch"] = []
+        pending_rows = 0
+        for batch in parquet_file.iter_batches(batch_size=min(_READ_BATCH_ROWS, row_group_rows)):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= row_group_rows:
+                table = pa.Table.from_batches(pending, schema=parquet_file.schema_arrow)
+                writer.write_table(table.slice(0, row_group_rows), row_group_size=row_group_rows)
+                rest = table.slice(row_group_rows)
+                pending = rest.to_batches()
+                pending_rows = rest.num_rows
+        if pending_rows:
+            table = pa.Table.from_batches(pending, schema=parquet_file.schema_arrow)
+            writer.write_table(table, row_group_size=row_group_rows)
+    
+    return {
+        "sizeBefore": os.path.getsize(src_path),
+        "sizeAfter": os.path.getsize(dst_path),
+        "rowGroupsBefore": metadata.num_row_groups,
+        "rowGroupsAfter": pq.read_metadata(dst_path).num_row_groups,
+    }
+
+
+def optimize_parquet_files(
+    files: List[Tuple[str, str]],
+    staging: StagingArea,
+    progress: Progress,
+    task_id: TaskID,
+    max_workers: int = 4,
+    max_row_group_bytes: int = DEFAULT_ROW_GROUP_BYTES,
+    compression: str = DEFAULT_COMPRESSION,
+) -> Tuple[List[Tuple[str, str]], Dict[str, Any]]:
+    """
+    Rewrite the parquet files of a dataset whose layout needs it.
+    
+    Files that already have bounded row groups, statistics, page indexes and
+    the target compression are left as they are, as are files that fail to
+    rewrite. Rewritten files are kept in the staging area and reused while
+    their source is unchanged.
+    
+    Args:
+        files: List of tuples (absolute_path, relative_path), as returned by collect_files
+        staging: Staging area for rewritten files
+        progress: Rich progress instance
+        task_id: Progress task ID
+        max_workers: Number of files rewritten in parallel
+        max_row_group_bytes: Target uncompressed row group size
+        compression: Compression codec
+        
+    Returns:
+        Tuple of (files with rewritten files substituted, report) where the
+        report has optimized/reused/skipped/failed counts (reused files
+        are also counted as optimized) and total sizes before/after
+    """
+    parquet_files = [f for f in files if is_parquet_file(f[0])]
+    progress.update(task_id, total=len(parquet_files))
+    
+    report = {"optimized": 0, "reused": 0, "skipped": 0, "failed": 0, "sizeBefore": 0, "sizeAfter": 0}
+    replacements: Dict[str, str] = {}
+    kind = f"{STAGING_KIND}/{max_row_group_bytes}/{compression}"
+    
+    def rewrite(src_path: str, dst_path: str) -> Optional[Dict[str, Any]]:
+        if not check_parquet_layout(src_path, max_row_group_bytes, compression):
+            return None
+        return optimize_parquet_file(src_path, dst_path, max_row_group_bytes, compression)
+    
+    def optimize_single(file_info: Tuple[str, str]) -> Optional[Tuple[str, Dict[str, Any], bool]]:
+        return staging.stage(file_info[0], kind, rewrite)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(optimize_single, f): f for f in parquet_files}
+        
+        for future in as_completed(futures):
+            abs_path, rel_path = futures[future]
+            try:
+                staged = future.result()
+                if staged is None:
+                    report["skipped"] += 1
+                else:
+                    dst_path, result, reused = staged
+                    replacements[abs_path] = dst_path
+                    report["optimized"] += 1
+                    report["reused"] += int(reused)
+                    report["sizeBefore"] += result["sizeBefore"]
+                    report["sizeAfter"] += result["sizeAfter"]
+            except Exception as e:
+                report["failed"] += 1
+                progress.console.print(f"[yellow]Warning: Failed to optimize {rel_path}, uploading as is: {e}[/yellow]")
+            progress.advance(task_id)
+    
+    optimized_files = [(replacements.get(abs_path, abs_path), rel_path) for abs_path, rel_path in files]
+    return optimized_files, report
@@ -1,14 +1,41 @@
 """Parquet file preview extraction for DataHub CLI."""
 
+import importlib.util
 import json
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, List, Optional, Union
 
-try:
+from .profiling import timed
+
+if TYPE_CHECKING:
+    import pyarrow as pa
     import pyarrow.parquet as pq
-    PYARROW_AVAILABLE = True
-except ImportError:
-    PYARROW_AVAILABLE = False
+
+# pyarrow (and numpy with it) is only imported by the functions that read
+# parquet files, so importing this module does not load them
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Leading bytes used to label embedded image blobs in binary summaries
+_BINARY_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpeg"),
+]
+
+# Binary values up to this size are shown as text when they are valid UTF-8
+_MAX_TEXT_BINARY_BYTES = 1024
+
+# Longer min/max statistics (strings, binary) are truncated in summaries
+_MAX_STATISTIC_CHARS = 64
+
+# Read buffer for file-object sources; streams column chunks page by page
+# instead of loading whole chunks, which keeps remote (ranged) reads small
+_STREAM_BUFFER_SIZE = 64 * 1024
+
+ParquetSource = Union[str, BinaryIO]
+
+# Local result cache kind of analyze_parquet_file output (100 preview rows);
+# bump the version whenever the preview or summary layout changes
+ANALYSIS_CACHE_KIND = "parquet-analysis/v2/100"
 
 
 def is_parquet_file(file_path: str) -> bool:
@@ -16,28 +43,38 @@ def is_parquet_file(file_path: str) -> bool:
     return file_path.lower().endswith(".parquet")
 
 
+@timed
 def extract_parquet_preview(
-    file_path: str,
+    file_path: ParquetSource,
     max_rows: int = 100,
     max_columns: int = 50,
+    max_list_items: int = 100,
 ) -> Optional[Dict[str, Any]]:
     """
     Extract preview data from a parquet file.
     
+    The preview is column-oriented ("encoding": "columnar") so column names
+    are not repeated for every row; the server expands it for display.
+    
     Args:
-        file_path: Path to the parquet file
+        file_path: Path to the parquet file, or a seekable binary file object
         max_rows: Maximum number of rows to extract (default: 100)
         max_columns: Maximum number of columns to include (default: 50)
+        max_list_items: Maximum number of elements kept per list value (default: 100)
         
     Returns:
-        Dictionary with columns, rows, and totalRows, or None if extraction fails
+        Dictionary with columns, columnData (one value list per column), and
+        totalRows, or None if extraction fails
     """
     if not PYARROW_AVAILABLE:
         return None
     
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
     try:
         # Read parquet file metadata first
-        parquet_file = pq.ParquetFile(file_path)
+        parquet_file = _open_parquet(file_path)
         total_rows = parquet_file.metadata.num_rows
         
         # Get schema columns
@@ -47,52 +84,387 @@ def extract_parquet_preview(
         # Limit columns if too many
         columns_to_read = all_columns[:max_columns]
         
-        # Read only the rows we need
-        table = parquet_file.read_row_groups(
-            [0] if parquet_file.num_row_groups > 0 else [],
-            columns=columns_to_read,
-        )
-        
-        # If first row group has more than max_rows, slice it
-        if table.num_rows > max_rows:
-            table = table.slice(0, max_rows)
-        
-        # If first row group is smaller than max_rows and there are more row groups,
-        # read additional row groups
-        if table.num_rows < max_rows and parquet_file.num_row_groups > 1:
-            rows_needed = max_rows - table.num_rows
-            for i in range(1, parquet_file.num_row_groups):
+        # Stream just enough batches to cover max_rows; this spans row group
+        # boundaries without decoding any row group in full
+        batches = []
+        rows_needed = max_rows
+        if rows_needed > 0 and parquet_file.num_row_groups > 0:
+            for batch in parquet_file.iter_batches(
+                batch_size=max_rows,
+                columns=columns_to_read,
+            ):
+                if batch.num_rows > rows_needed:
+                    batch = batch.slice(0, rows_needed)
+                batches.append(batch)
+                rows_needed -= batch.num_rows
                 if rows_needed <= 0:
                     break
-                additional = parquet_file.read_row_group(i, columns=columns_to_read)
-                if additional.num_rows > rows_needed:
-                    additional = additional.slice(0, rows_needed)
-                table = pq.concat_tables([table, additional])
-                rows_needed -= additional.num_rows
         
-        # Convert to Python objects
-        rows: List[Dict[str, Any]] = []
-        for i in range(table.num_rows):
-            row = {}
-            for col_name in columns_to_read:
-                column = table.column(col_name)
-                value = column[i].as_py()
+        if batches:
+            table = pa.Table.from_batches(batches).combine_chunks()
+        else:
+            table = parquet_file.schema_arrow.empty_table().select(columns_to_read)
+        
+        # Truncate lists and summarize binary/temporal values in Arrow so that
+        # only the already-truncated data is converted to Python objects
+        column_data: List[List[Any]] = []
+        for col_name in columns_to_read:
+            column = table.column(col_name).combine_chunks()
+            values = _summarize_array(column, max_list_items).to_pylist()
+            
+            if _is_list_type(column.type):
+                lengths = pc.list_value_length(column).to_pylist()
+                values = [
+                    value + [f"... ({length - max_list_items} more)"]
+                    if length is not None and length > max_list_items else value
+                    for value, length in zip(values, lengths)
+                ]
+            
+            if not _is_json_native(column.type):
                 # Handle special types for JSON serialization
-                row[col_name] = _serialize_value(value)
-            rows.append(row)
+                values = [_serialize_value(value) for value in values]
+            
+            column_data.append(values)
         
         return {
+            "encoding": "columnar",
             "columns": columns_to_read,
-            "rows": rows,
+            "columnData": column_data,
             "totalRows": total_rows,
         }
         
     except Exception as e:
         # Log error but don't fail the upload
-        print(f"Warning: Failed to extract parquet preview from {file_path}: {e}")
+        print(f"Warning: Failed to extract parquet preview from {_source_name(file_path)}: {e}")
+        return None
+
+
+@timed
+def extract_parquet_summary(file_path: ParquetSource) -> Optional[Dict[str, Any]]:
+    """
+    Build a compact summary of a parquet file from its footer.
+    
+    Only the file metadata is read; no data pages are decoded. Column
+    statistics are merged across row groups.
+    
+    Args:
+        file_path: Path to the parquet file, or a seekable binary file object
+        
+    Returns:
+        Dictionary with schema, row group count, sizes, and per-column
+        statistics, or None if the footer cannot be read
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    
+    try:
+        metadata = _open_parquet(file_path).metadata
+        schema = metadata.schema.to_arrow_schema()
+        
+        columns: Dict[str, Dict[str, Any]] = {}
+        compressed_size = 0
+        uncompressed_size = 0
+        
+        for rg_index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg_index)
+            for col_index in range(row_group.num_columns):
+                chunk = row_group.column(col_index)
+                compressed_size += chunk.total_compressed_size
+                uncompressed_size += chunk.total_uncompressed_size
+                
+                column = columns.setdefault(chunk.path_in_schema, {
+                    "name": chunk.path_in_schema,
+                    "physicalType": chunk.physical_type,
+                    "compression": chunk.compression,
+                    "compressedSize": 0,
+                    "uncompressedSize": 0,
+                    "nullCount": 0,
+                    "min": None,
+                    "max": None,
+                })
+                column["compressedSize"] += chunk.total_compressed_size
+                column["uncompressedSize"] += chunk.total_uncompressed_size
+                _merge_statistics(column, chunk.statistics)
+        
+        return {
+            "numRows": metadata.num_rows,
+            "numRowGroups": metadata.num_row_groups,
+            "compressedSize": compressed_size,
+            "uncompressedSize": uncompressed_size,
+            "createdBy": metadata.created_by,
+            "schema": [
+                {"name": field.name, "type": str(field.type), "nullable": field.nullable}
+                for field in schema
+            ],
+            "columns": [
+                {
+                    **{key: value for key, value in column.items() if not key.startswith("_")},
+                    "min": _serialize_statistic(column["min"]),
+                    "max": _serialize_statistic(column["max"]),
+                }
+                for column in columns.values()
+            ],
+        }
+        
+    except Exception as e:
+        print(f"Warning: Failed to read parquet summary from {_source_name(file_path)}: {e}")
         return None
 
 
+def analyze_parquet_file(file_path: ParquetSource, max_rows: int = 100) -> Dict[str, Any]:
+    """
+    Extract the upload manifest fields for a parquet file.
+    
+    Args:
+        file_path: Path to the parquet file, or a seekable binary file object
+        max_rows: Maximum number of preview rows to extract (default: 100)
+        
+    Returns:
+        Dictionary with "previewData" and/or "summary" for the fields that
+        could be extracted
+    """
+    fields: Dict[str, Any] = {}
+    
+    preview_data = extract_parquet_preview(file_path, max_rows=max_rows)
+    if preview_data:
+        fields["previewData"] = preview_data
+    
+    summary = extract_parquet_summary(file_path)
+    if summary:
+        fields["summary"] = summary
+    
+    return fields
+
+
+def _open_parquet(source: ParquetSource) -> "pq.ParquetFile":
+    """Open a parquet file; file objects are read page by page without pre-buffering."""
+    import pyarrow.parquet as pq
+    
+    if isinstance(source, str):
+        return pq.ParquetFile(source)
+    source.seek(0)
+    return pq.ParquetFile(source, buffer_size=_STREAM_BUFFER_SIZE, pre_buffer=False)
+
+
+def _source_name(source: ParquetSource) -> str:
+    """Get a display name for a parquet source."""
+    return source if isinstance(source, str) else getattr(source, "name", repr(source))
+
+
+def _merge_statistics(column: Dict[str, Any], statistics: Any) -> None:
+    """
+    Merge one row group's column chunk statistics into a column summary.
+    A missing statistic in any row group makes the merged value unknown (None).
+    """
+    if statistics is None:
+        column["nullCount"] = None
+        column["min"] = column["max"] = None
+        column["_noMinMax"] = True
+        return
+    
+    if column["nullCount"] is not None:
+        column["nullCount"] = (
+            column["nullCount"] + statistics.null_count if statistics.has_null_count else None
+        )
+    
+    if column.get("_noMinMax"):
+        return
+    if not statistics.has_min_max:
+        column["min"] = column["max"] = None
+        column["_noMinMax"] = True
+        return
+    
+    try:
+        if column["min"] is None or statistics.min < column["min"]:
+            column["min"] = statistics.min
+        if column["max"] is None or statistics.max > column["max"]:
+            column["max"] = statistics.max
+    except TypeError:
+        column["min"] = column["max"] = None
+        column["_noMinMax"] = True
+
+
+def _serialize_statistic(value: Any) -> Any:
+    """Serialize a min/max statistic, truncating long strings and binary values."""
+    if isinstance(value, bytes):
+        value = value[:_MAX_STATISTIC_CHARS]
+    value = _serialize_value(value)
+    if isinstance(value, str) and len(value) > _MAX_STATISTIC_CHARS:
+        return value[:_MAX_STATISTIC_CHARS] + "..."
+    return value
+
+
+def _is_list_type(data_type: "pa.DataType") -> bool:
+    """Check if an Arrow type is a (large/fixed size) list."""
+    import pyarrow as pa
+    
+    return (
+        pa.types.is_list(data_type)
+        or pa.types.is_large_list(data_type)
+        or pa.types.is_fixed_size_list(data_type)
+    )
+
+
+def _is_binary_type(data_type: "pa.DataType") -> bool:
+    """Check if an Arrow type holds raw bytes."""
+    import pyarrow as pa
+    
+    return (
+        pa.types.is_binary(data_type)
+        or pa.types.is_large_binary(data_type)
+        or pa.types.is_fixed_size_binary(data_type)
+    )
+
+
+def _is_json_native(data_type: "pa.DataType") -> bool:
+    """
+    Check if values of an Arrow type convert to JSON-compatible Python objects.
+    Binary and temporal types count as native because they are summarized
+    or cast to strings before conversion.
+    """
+    import pyarrow as pa
+    
+    if pa.types.is_dictionary(data_type):
+        return _is_json_native(data_type.value_type)
+    if _is_list_type(data_type):
+        return _is_json_native(data_type.value_type)
+    if pa.types.is_struct(data_type):
+        return all(_is_json_native(field.type) for field in data_type)
+    return (
+        pa.types.is_null(data_type)
+        or pa.types.is_boolean(data_type)
+        or pa.types.is_integer(data_type)
+        or pa.types.is_float32(data_type)
+        or pa.types.is_float64(data_type)
+        or pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_decimal(data_type)
+        or pa.types.is_timestamp(data_type)
+        or pa.types.is_date(data_type)
+        or pa.types.is_time(data_type)
+        or _is_binary_type(data_type)
+    )
+
+
+def _summarize_array(array: "pa.Array", max_list_items: int) -> "pa.Array":
+    """
+    Truncate and summarize an Arrow array with compute kernels.
+    
+    Lists are sliced to max_list_items elements, binary values are replaced
+    with length/type summaries, and temporal values are formatted as ISO strings.
+    Struct and list children are handled recursively.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    data_type = array.type
+    
+    if pa.types.is_dictionary(data_type):
+        return _summarize_array(array.dictionary_decode(), max_list_items)
+    
+    if _is_list_type(data_type):
+        if pa.types.is_fixed_size_list(data_type):
+            array = array.cast(pa.list_(data_type.value_field))
+        sliced = pc.list_slice(array, 0, max_list_items)
+        if not _needs_summary(data_type.value_type):
+            return sliced
+        values = _summarize_array(sliced.values, max_list_items)
+        list_class = pa.LargeListArray if pa.types.is_large_list(sliced.type) else pa.ListArray
+        return list_class.from_arrays(sliced.offsets, values, mask=sliced.is_null())
+    
+    if pa.types.is_struct(data_type):
+        if not _needs_summary(data_type):
+            return array
+        children = [_summarize_array(child, max_list_items) for child in array.flatten()]
+        return pa.StructArray.from_arrays(
+            children,
+            names=[field.name for field in data_type],
+            mask=array.is_null(),
+        )
+    
+    if _is_binary_type(data_type):
+        return _summarize_binary(array)
+    
+    if pa.types.is_timestamp(data_type):
+        time_format = "%Y-%m-%dT%H:%M:%S%z" if data_type.tz else "%Y-%m-%dT%H:%M:%S"
+        return pc.strftime(array, format=time_format)
+    
+    if pa.types.is_date(data_type) or pa.types.is_time(data_type) or pa.types.is_decimal(data_type):
+        return array.cast(pa.string())
+    
+    return array
+
+
+def _needs_summary(data_type: "pa.DataType") -> bool:
+    """Check if an Arrow type contains values that _summarize_array rewrites."""
+    import pyarrow as pa
+    
+    if pa.types.is_dictionary(data_type):
+        return True
+    if _is_list_type(data_type):
+        return True
+    if pa.types.is_struct(data_type):
+        return any(_needs_summary(field.type) for field in data_type)
+    return (
+        _is_binary_type(data_type)
+        or pa.types.is_timestamp(data_type)
+        or pa.types.is_date(data_type)
+        or pa.types.is_time(data_type)
+        or pa.types.is_decimal(data_type)
+    )
+
+
+def _summarize_binary(array: "pa.Array") -> "pa.Array":
+    """
+    Replace binary values with "<kind: N bytes>" summaries.
+    Short values that are valid UTF-8 are kept as text.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    
+    if pa.types.is_fixed_size_binary(array.type):
+        array = array.cast(pa.binary())
+    
+    lengths = pc.binary_length(array)
+    max_length = pc.max(lengths).as_py()
+    if max_length is not None and max_length <= _MAX_TEXT_BINARY_BYTES:
+        try:
+            return array.cast(pa.string())
+        except pa.ArrowInvalid:
+            pass
+    
+    kind = pa.scalar("binary")
+    for signature, name in reversed(_BINARY_SIGNATURES):
+        kind = pc.if_else(pc.starts_with(array, pattern=signature), name, kind)
+    
+    summaries = pc.binary_join_element_wise(
+        "<", kind, ": ", lengths.cast(pa.string()), " bytes>", ""
+    )
+    
+    # Mixed columns (e.g. labels next to images) are decided per value. Arrow
+    # has no UTF-8 validation kernel, so only the short values are converted
+    # to Python and checked there.
+    is_short = pc.fill_null(pc.less_equal(lengths, _MAX_TEXT_BINARY_BYTES), False)
+    short_values = iter(array.filter(is_short).to_pylist())
+    as_text = []
+    texts = []
+    for short in is_short.to_pylist():
+        text = None
+        if short:
+            try:
+                text = next(short_values).decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        as_text.append(text is not None)
+        if text is not None:
+            texts.append(text)
+    
+    if not texts:
+        return summaries
+    return pc.replace_with_mask(summaries, pa.array(as_text), pa.array(texts, pa.string()))
+
+
+@timed
 def _serialize_value(value: Any) -> Any:
     """
     Serialize a value for JSON compatibility.
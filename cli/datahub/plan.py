@@ -0,0 +1,368 @@
+"""Dry-run transfer plans with request counts and duration estimates (--plan)."""
+
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .cache import ResultCache, file_identity
+from .compression import choose_encoding
+from .config import THROUGHPUT_FILE, ensure_config_dir, get_compress_extensions, get_rate_limits
+from .cos import MULTIPART_THRESHOLD
+from .parquet_preview import ANALYSIS_CACHE_KIND, is_parquet_file
+
+# Size classes as (exclusive upper bound, label); the last one is open-ended
+SIZE_CLASSES = (
+    (1024 * 1024, "< 1 MB"),
+    (MULTIPART_THRESHOLD, "1 MB - 20 MB"),
+    (1024 * 1024 * 1024, "20 MB - 1 GB"),
+    (None, ">= 1 GB"),
+)
+
+# Part sizes of the COS SDK's upload_file and download_file, and its part limit
+UPLOAD_PART_BYTES = 1024 * 1024
+DOWNLOAD_PART_BYTES = 20 * 1024 * 1024
+MAX_PARTS = 10000
+
+# Objects per list_objects page
+LIST_PAGE_SIZE = 1000
+
+# Measured runs kept per direction in ~/.datahub/throughput.json
+MAX_RECORDED_RUNS = 20
+
+# Runs older than this are not used for estimates
+RUN_MAX_AGE = 30 * 24 * 3600
+
+# Relative error of sizes formatted with two decimals (e.g. "1.5 MB")
+SIZE_FORMAT_ERROR = 0.005
+
+
+def size_class(size: int) -> str:
+    """Get the label of the size class of a file."""
+    for bound, label in SIZE_CLASSES:
+        if bound is None or size < bound:
+            return label
+    return SIZE_CLASSES[-1][1]
+
+
+def upload_requests(size: int) -> Tuple[int, int]:
+    """
+    Count the COS requests of uploading a file, as cos.upload_file sends them.
+    
+    Returns:
+        (read_requests, write_requests); multipart uploads look up a
+        resumable upload, then initiate, send the parts and complete
+    """
+    if size <= MULTIPART_THRESHOLD:
+        return 0, 1
+    return 1, 2 + min(MAX_PARTS, math.ceil(size / UPLOAD_PART_BYTES))
+
+
+def download_requests(size: int) -> int:
+    """
+    Count the COS read requests of downloading a file, as cos.download_file
+    sends them (a HEAD, then one GET, or the SDK's own HEAD and ranged GETs
+    of parts doubled in size until there are at most MAX_PARTS).
+    """
+    if size <= MULTIPART_THRESHOLD:
+        return 2
+    part = DOWNLOAD_PART_BYTES
+    while part * MAX_PARTS < size:
+        part *= 2
+    return 2 + math.ceil(size / part)
+
+
+def _empty_plan(direction: str) -> Dict[str, Any]:
+    return {
+        "direction": direction,
+        "files": 0,
+        "bytes": 0,
+        "classes": {label: {"files": 0, "bytes": 0} for _, label in SIZE_CLASSES},
+        "multipart": {"files": 0, "bytes": 0},
+        "unchanged": {"files": 0, "bytes": 0},
+        "new": 0,
+        "changed": 0,
+        "requests": {"read": 0, "write": 0, "api": 0},
+    }
+
+
+def _add_file(plan: Dict[str, Any], size: int, multipart: bool = True) -> None:
+    plan["files"] += 1
+    plan["bytes"] += size
+    size_group = plan["classes"][size_class(size)]
+    size_group["files"] += 1
+    size_group["bytes"] += size
+    if multipart and size > MULTIPART_THRESHOLD:
+        plan["multipart"]["files"] += 1
+        plan["multipart"]["bytes"] += size
+
+
+def plan_upload(
+    files: List[Tuple[str, str]],
+    remote: Dict[str, int],
+    build_index: bool = True,
+    compute_stats: bool = False,
+    cache: Optional[ResultCache] = None,
+    compression: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Plan the upload of a dataset's files without sending anything.
+    
+    Files are compared by path and size with the objects already stored
+    (contents are not compared, and files stored encoded differ in size).
+    The upload sends every file again; only parquet previews, the episode
+    index and statistics of unchanged files come from the local cache.
+    
+    Args:
+        files: Files to upload as (absolute_path, relative_path) tuples
+        remote: Sizes of the stored objects by relative path
+        build_index: Whether the episode index is built and stored
+        compute_stats: Whether feature statistics are computed and stored
+        cache: Local result cache to count reusable parquet previews in
+        compression: Encoding for compressible files ("gzip" or "zstd")
+        
+    Returns:
+        Plan dictionary (see merge_plans for combining several)
+    """
+    plan = _empty_plan("upload")
+    plan.update({
+        "removed": 0,
+        "encoded": {"files": 0, "bytes": 0},
+        "parquet": 0,
+        "previewsCached": 0,
+    })
+    extensions = get_compress_extensions()
+    requests = plan["requests"]
+    
+    for abs_path, rel_path in files:
+        size = os.path.getsize(abs_path)
+        _add_file(plan, size)
+        
+        stored = remote.get(rel_path)
+        if stored is None:
+            plan["new"] += 1
+        elif stored == size:
+            plan["unchanged"]["files"] += 1
+            plan["unchanged"]["bytes"] += size
+        else:
+            plan["changed"] += 1
+        
+        if compression and choose_encoding(abs_path, size, compression, extensions):
+            plan["encoded"]["files"] += 1
+            plan["encoded"]["bytes"] += size
+        
+        reads, writes = upload_requests(size)
+        requests["read"] += reads
+        requests["write"] += writes
+        
+        if is_parquet_file(abs_path):
+            plan["parquet"] += 1
+            if cache is not None and cache.get(abs_path, ANALYSIS_CACHE_KIND, file_identity(abs_path)):
+                plan["previewsCached"] += 1
+    
+    uploading = {rel_path for _, rel_path in files}
+    plan["removed"] = sum(1 for rel_path in remote if rel_path not in uploading)
+    
+    # Index and statistics sidecars and the final upload_complete
+    has_parquet = plan["parquet"] > 0
+    requests["write"] += int(build_index and has_parquet) + int(compute_stats and has_parquet)
+    requests["api"] += 1
+    return plan
+
+
+def plan_download(objects: Iterable[Tuple[str, Optional[int]]], output_dir: str, listed: bool = True) -> Dict[str, Any]:
+    """
+    Plan the download of a dataset's files without fetching them.
+    
+    Args:
+        objects: (relative_path, size) of each file; sizes may be None
+            when only the file list's formatted sizes are known
+        output_dir: Local directory the files would be written to
+        listed: Files come from listing the bucket (COS download) rather
+            than from the dataset's file list (HTTP download), whose
+            rounded sizes only match local files approximately
+            
+    Returns:
+        Plan dictionary with the files already present locally at the
+        same size as "unchanged" (they are downloaded again)
+    """
+    plan = _empty_plan("download")
+    plan["unknownSizes"] = 0
+    requests = plan["requests"]
+    
+    for rel_path, size in objects:
+        if size is None:
+            plan["unknownSizes"] += 1
+            size = 0
+        # HTTP downloads stream each file in one request
+        _add_file(plan, size, multipart=listed)
+        
+        try:
+            local_size: Optional[int] = os.path.getsize(os.path.join(output_dir, rel_path))
+        except OSError:
+            local_size = None
+        if local_size is None:
+            plan["new"] += 1
+        elif local_size == size or (not listed and abs(local_size - size) <= size * SIZE_FORMAT_ERROR):
+            plan["unchanged"]["files"] += 1
+            plan["unchanged"]["bytes"] += size
+        else:
+            plan["changed"] += 1
+        
+        requests["read"] += download_requests(size) if listed else 1
+    
+    if listed:
+        requests["read"] += max(1, math.ceil(plan["files"] / LIST_PAGE_SIZE))
+    requests["api"] += 1
+    return plan
+
+
+def merge_plans(plans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up the plans of several datasets (numbers and nested counters)."""
+    def add(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+        for key, value in part.items():
+            if isinstance(value, dict):
+                add(total.setdefault(key, {}), value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+            else:
+                total.setdefault(key, value)
+    
+    merged: Dict[str, Any] = {}
+    for plan in plans:
+        add(merged, plan)
+    return merged
+
+
+def _load_runs() -> Dict[str, List[Dict[str, Any]]]:
+    try:
+        with open(THROUGHPUT_FILE, "r") as f:
+            runs = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return runs if isinstance(runs, dict) else {}
+
+
+def record_transfer(direction: str, files: int, nbytes: int, seconds: float, workers: int) -> None:
+    """
+    Store the measured throughput of a finished transfer for later estimates.
+    
+    The last MAX_RECORDED_RUNS runs per direction are kept; failures to
+    write the file are ignored, so recording never fails a transfer.
+    
+    Args:
+        direction: "upload" or "download"
+        files: Number of files transferred
+        nbytes: Bytes transferred
+        seconds: Wall-clock duration of the transfer
+        workers: Number of parallel workers used
+    """
+    if files <= 0 or seconds <= 0:
+        return
+    try:
+        ensure_config_dir()
+        runs = _load_runs()
+        history = runs.get(direction, [])
+        history.append({
+            "at": time.time(),
+            "files": files,
+            "bytes": nbytes,
+            "seconds": round(seconds, 3),
+            "workers": max(1, workers),
+        })
+        runs[direction] = history[-MAX_RECORDED_RUNS:]
+        
+        # Replaced atomically, so concurrent runs never read a partial file
+        fd, temp_path = tempfile.mkstemp(dir=str(THROUGHPUT_FILE.parent), prefix=".throughput-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(runs, f, indent=2)
+            os.replace(temp_path, THROUGHPUT_FILE)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        pass
+
+
+def _fit(runs: List[Dict[str, Any]]) -> Optional[Tuple[float, float]]:
+    """
+    Fit seconds = files / workers * per_file + bytes / bandwidth to the runs
+    by least squares.
+    
+    Returns:
+        (per_file_seconds, bytes_per_second), or None without usable runs
+    """
+    rows = [
+        (run["files"] / run["workers"], run["bytes"], run["seconds"])
+        for run in runs
+        if run.get("seconds", 0) > 0 and run.get("bytes", 0) > 0
+    ]
+    if not rows:
+        return None
+    
+    sff = sum(f * f for f, _, _ in rows)
+    sfb = sum(f * b for f, b, _ in rows)
+    sbb = sum(b * b for _, b, _ in rows)
+    sft = sum(f * t for f, _, t in rows)
+    sbt = sum(b * t for _, b, t in rows)
+    
+    det = sff * sbb - sfb * sfb
+    if det > 1e-6 * sff * sbb:
+        per_file = (sbb * sft - sfb * sbt) / det
+        per_byte = (sff * sbt - sfb * sft) / det
+        if per_file >= 0 and per_byte > 0:
+            return per_file, 1 / per_byte
+    
+    # Runs too alike (or just one) to separate the two: all time is bandwidth
+    return 0.0, sbb / sbt
+
+
+def estimate_seconds(direction: str, plan: Dict[str, Any], workers: int) -> Optional[Dict[str, Any]]:
+    """
+    Project the duration of a planned transfer from recent measured runs,
+    bounded below by the configured host-wide limits.
+    
+    Args:
+        direction: "upload" or "download"
+        plan: Plan from plan_upload, plan_download or merge_plans
+        workers: Number of parallel workers
+        
+    Returns:
+        Dictionary with the estimate in seconds, the fitted bandwidth and
+        per-file overhead and the number of runs used, or None without
+        measured runs
+    """
+    now = time.time()
+    runs = [run for run in _load_runs().get(direction, []) if now - run.get("at", 0) <= RUN_MAX_AGE]
+    fit = _fit(runs)
+    if fit is None:
+        return None
+    per_file, bandwidth = fit
+    
+    seconds = plan["files"] / max(1, workers) * per_file + plan["bytes"] / bandwidth
+    bytes_per_sec, requests_per_sec = get_rate_limits()
+    if bytes_per_sec > 0:
+        seconds = max(seconds, plan["bytes"] / bytes_per_sec)
+    if requests_per_sec > 0:
+        requests = plan["requests"]
+        seconds = max(seconds, (requests["read"] + requests["write"]) / requests_per_sec)
+    
+    return {"seconds": seconds, "bandwidth": bandwidth, "perFile": per_file, "runs": len(runs)}
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in human-readable form (e.g. "3h 20m")."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds}s"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
@@ -0,0 +1,252 @@
+"""Hot-path timers and profiling of single commands for DataHub CLI (--profile)."""
+
+import collections
+import contextlib
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, InvalidStateError
+from typing import Any, Callable, Counter, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Seconds between stack samples of all threads
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Timer stats by name as [calls, total seconds, max seconds]; None while
+# profiling is off, which is all timers check before calling through
+_stats: Optional[Dict[str, List[float]]] = None
+_stats_lock = threading.Lock()
+
+# Names of the timers running on each thread, so recursive calls are not
+# counted twice
+_local = threading.local()
+
+
+def enabled() -> bool:
+    """Check whether timers are recording."""
+    return _stats is not None
+
+
+def _merge(stats: Dict[str, List[float]]) -> None:
+    """Add timer stats (e.g. of a worker process) to the running totals."""
+    with _stats_lock:
+        if _stats is None:
+            return
+        for name, (calls, total, longest) in stats.items():
+            entry = _stats.get(name)
+            if entry is None:
+                entry = _stats[name] = [0, 0.0, 0.0]
+            entry[0] += calls
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+
+
+@contextlib.contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Time a block under the given name while profiling."""
+    if _stats is None:
+        yield
+        return
+    
+    active = getattr(_local, "active", None)
+    if active is None:
+        active = _local.active = set()
+    if name in active:
+        yield
+        return
+    
+    active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        active.discard(name)
+        elapsed = time.perf_counter() - start
+        _merge({name: [1, elapsed, elapsed]})
+
+
+def timed(fn: Optional[F] = None, *, name: Optional[str] = None) -> Any:
+    """
+    Decorator that times every call of a function while profiling.
+    
+    When profiling is off the wrapper only checks a global and calls
+    through, so it can stay on hot paths. Recursive calls are timed once,
+    by the outermost call.
+    
+    Args:
+        fn: Function to time
+        name: Timer name (default: "<module>.<function>")
+    """
+    def decorate(fn: F) -> F:
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _stats is None:
+                return fn(*args, **kwargs)
+            with timer(label):
+                return fn(*args, **kwargs)
+        
+        return wrapper  # type: ignore[return-value]
+    
+    return decorate(fn) if fn is not None else decorate
+
+
+def _run_timed(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, Dict[str, List[float]]]:
+    """Run fn with timers on (in a worker process) and return its result with the timer stats."""
+    global _stats
+    _stats = {}
+    try:
+        result = fn(*args, **kwargs)
+        return result, _stats
+    finally:
+        _stats = None
+
+
+def submit(executor: Executor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """
+    executor.submit for process pools that also collects the timers of the
+    worker process while profiling.
+    
+    Returns:
+        Future of fn's result; cancelling it cancels the job
+    """
+    if _stats is None:
+        return executor.submit(fn, *args, **kwargs)
+    
+    inner = executor.submit(_run_timed, fn, *args, **kwargs)
+    outer: Future = Future()
+    
+    def on_outer_done(future: Future) -> None:
+        if future.cancelled():
+            inner.cancel()
+    
+    def on_inner_done(future: Future) -> None:
+        try:
+            if future.cancelled():
+                outer.cancel()
+            elif future.exception() is not None:
+                outer.set_exception(future.exception())
+            else:
+                result, stats = future.result()
+                _merge(stats)
+                outer.set_result(result)
+        except InvalidStateError:
+            # The outer future was cancelled while the job was running
+            pass
+            
+    outer.add_done_callback(on_outer_done)
+    inner.add_done_callback(on_inner_done)
+    return outer
+
+
+class StackSampler:
+    """
+    Samples the stacks of all threads at a fixed interval.
+    
+    The samples are kept as folded stacks ("thread;outer;...;inner count"),
+    the input format of flamegraph.pl, speedscope and inferno. Waiting
+    threads are sampled too, so the result shows where wall-clock time goes,
+    including time blocked on the network.
+    """
+    
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.samples: Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="datahub-sampler", daemon=True)
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Threads of one pool share a root, e.g. "datahub-transfer"
+                thread_name = re.sub(r"([-_]\d+)+$", "", names.get(ident, "thread"))
+                stack.append(thread_name)
+                self.samples[";".join(reversed(stack))] += 1
+    
+    def write_folded(self, path: str) -> None:
+        """Write the samples in folded-stack format."""
+        with open(path, "w") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    """
+    Profiles one command: turns the hot-path timers on, runs cProfile on the
+    calling thread and samples the stacks of all threads.
+    
+    finish() writes <prefix>.pstats (for pstats, snakeviz, ...) and
+    <prefix>.folded (for flamegraph.pl, speedscope, ...) and returns the
+    timer summary.
+    """
+    
+    def __init__(self, prefix: str, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            prefix: Output path without extension
+            interval: Seconds between stack samples
+        """
+        import cProfile
+        
+        self.prefix = prefix
+        self.sampler = StackSampler(interval)
+        self.profiler = cProfile.Profile()
+        self.started = 0.0
+        self.elapsed = 0.0
+    
+    def start(self) -> None:
+        global _stats
+        with _stats_lock:
+            _stats = {}
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profiler.enable()
+    
+    def finish(self) -> List[Tuple[str, int, float, float]]:
+        """
+        Stop profiling and write the profiles.
+        
+        Returns:
+            Timers as (name, calls, total seconds, max seconds), slowest
+            total first
+        """
+        global _stats
+        self.profiler.disable()
+        self.sampler.stop()
+        self.elapsed = time.perf_counter() - self.started
+        with _stats_lock:
+            stats, _stats = _stats or {}, None
+        
+        self.profiler.dump_stats(f"{self.prefix}.pstats")
+        self.sampler.write_folded(f"{self.prefix}.folded")
+        
+        return sorted(
+            ((name, int(calls), total, longest) for name, (calls, total, longest) in stats.items()),
+            key=lambda row: row[2],
+            reverse=True,
+        )
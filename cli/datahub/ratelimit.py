@@ -0,0 +1,242 @@
+"""Host-wide bandwidth and request-rate limits shared by all DataHub CLI processes."""
+
+import contextlib
+import os
+import struct
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from .config import RATE_LIMIT_FILE, ensure_config_dir, get_rate_limits
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits apply per process
+    fcntl = None
+
+# Priority classes; a class waits while a more important one is waiting
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_CLASSES = 2
+
+# Seconds a waiting transfer of a class holds back less important ones
+PRIORITY_HOLD = 0.25
+
+# Longest sleep between attempts, so waiting transfers notice refills and
+# the priority of other waiters quickly
+MAX_WAIT_SLICE = 0.1
+
+# Seconds of traffic the buckets hold when idle (the burst size)
+BURST_SECONDS = 1.0
+
+# Bytes taken from the shared bucket at once; smaller reads are served
+# from the rest, so chunked streams do not lock the state file per chunk
+BYTES_QUANTUM = 256 * 1024
+
+# Shared state: byte tokens, request tokens, last refill time, and the time
+# a waiter of each priority class was last seen
+_STATE = struct.Struct(f"<3d{PRIORITY_CLASSES}d")
+
+
+class HostRateLimiter:
+    """
+    Token buckets for bytes and requests, shared by every process of the
+    user on this host through a small state file under ~/.datahub/.
+    
+    The state is read and updated under an exclusive file lock, so several
+    `datahub` processes together stay within the limits. Buckets may go
+    into debt: a large transfer is let through once tokens are available
+    and later transfers wait until the debt is refilled, so any transfer
+    size works with any rate. Under contention, waiters of a lower priority
+    class (background uploads) step back while a higher class (interactive
+    downloads) is waiting.
+    """
+    
+    def __init__(self, bytes_per_sec: float = 0, requests_per_sec: float = 0, path: Optional[str] = None):
+        """
+        Args:
+            bytes_per_sec: Bandwidth limit (0 for none)
+            requests_per_sec: Request rate limit (0 for none)
+            path: State file (default: ~/.datahub/ratelimit.state)
+        """
+        self.bytes_per_sec = bytes_per_sec
+        self.requests_per_sec = requests_per_sec
+        self._lock = threading.Lock()
+        self._credit = 0
+        self._fd: Optional[int] = None
+        self._memory: Optional[list] = None
+        
+        if fcntl is not None:
+            if path is None:
+                ensure_config_dir()
+                path = str(RATE_LIMIT_FILE)
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    
+    def set_limits(self, bytes_per_sec: float, requests_per_sec: float) -> None:
+        """Change the limits; calls already waiting in acquire keep the old ones."""
+        self.bytes_per_sec = bytes_per_sec
+        self.requests_per_sec = requests_per_sec
+    
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _full_state(self, now: float) -> list:
+        return [self.bytes_per_sec * BURST_SECONDS, self.requests_per_sec * BURST_SECONDS, now] + [0.0] * PRIORITY_CLASSES
+    
+    @contextlib.contextmanager
+    def _state(self) -> Iterator[list]:
+        """Lock and yield the shared state; changes are written back on exit."""
+        with self._lock:
+            if self._fd is None:
+                if self._memory is None:
+                    self._memory = self._full_state(time.time())
+                yield self._memory
+                return
+            
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(self._fd, _STATE.size, 0)
+                state = list(_STATE.unpack(data)) if len(data) == _STATE.size else self._full_state(time.time())
+                yield state
+                os.pwrite(self._fd, _STATE.pack(*state), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+    
+    @staticmethod
+    def _refill(state: list, now: float, bytes_per_sec: float, requests_per_sec: float) -> None:
+        elapsed = max(0.0, now - state[2])
+        state[0] = min(bytes_per_sec * BURST_SECONDS, state[0] + elapsed * bytes_per_sec)
+        state[1] = min(requests_per_sec * BURST_SECONDS, state[1] + elapsed * requests_per_sec)
+        state[2] = now
+    
+    def acquire(self, nbytes: int = 0, requests: int = 0, priority: int = INTERACTIVE) -> None:
+        """
+        Wait until a transfer of nbytes bytes in the given number of
+        requests is within the limits, and charge it.
+        
+        Args:
+            nbytes: Bytes sent or received
+            requests: Number of requests
+            priority: INTERACTIVE or BACKGROUND
+        """
+        # The limits may change while this call waits (see set_limits)
+        bytes_per_sec, requests_per_sec = self.bytes_per_sec, self.requests_per_sec
+        if not bytes_per_sec:
+            nbytes = 0
+        if not requests_per_sec:
+            requests = 0
+        
+        with self._lock:
+            used = min(nbytes, self._credit)
+            self._credit -= used
+            nbytes -= used
+        if not nbytes and not requests:
+            return
+        
+        # Take whole quanta and keep the rest for the next small reads
+        take = -(-nbytes // BYTES_QUANTUM) * BYTES_QUANTUM if nbytes else 0
+        
+        while True:
+            with self._state() as state:
+                now = time.time()
+                self._refill(state, now, bytes_per_sec, requests_per_sec)
+                outranked = any(state[3 + p] > now - PRIORITY_HOLD for p in range(priority))
+                if not outranked and (not take or state[0] > 0) and (not requests or state[1] > 0):
+                    state[0] -= take
+                    state[1] -= requests
+                    break
+                state[3 + priority] = now
+                wait = MAX_WAIT_SLICE
+                if not outranked:
+                    # Time until both buckets are out of debt
+                    deficits = [0.0]
+                    if take:
+                        deficits.append(-state[0] / bytes_per_sec)
+                    if requests:
+                        deficits.append(-state[1] / requests_per_sec)
+                    wait = min(wait, max(deficits))
+            time.sleep(max(wait, 0.001))
+        
+        with self._lock:
+            self._credit += take - nbytes
+
+
+# Seconds between checks of the configured limits, so a long-running
+# process (the agent) follows `datahub config limits`
+LIMITS_REFRESH_SECONDS = 5.0
+
+# Limiter of this process, created from the configured limits on first use.
+# Limit changes are applied to it in place, so it keeps one state file open
+# for the life of the process.
+_limiter: Optional[HostRateLimiter] = None
+# _limiter while a limit is configured, None otherwise
+_active_limiter: Optional[HostRateLimiter] = None
+_limits_checked = float("-inf")
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[HostRateLimiter]:
+    """Get the limiter of this process, or None when no limit is configured."""
+    global _limiter, _active_limiter, _limits_checked
+    if time.monotonic() - _limits_checked < LIMITS_REFRESH_SECONDS:
+        return _active_limiter
+    with _limiter_lock:
+        now = time.monotonic()
+        if now - _limits_checked >= LIMITS_REFRESH_SECONDS:
+            bytes_per_sec, requests_per_sec = get_rate_limits()
+            if bytes_per_sec > 0 or requests_per_sec > 0:
+                if _limiter is None:
+                    _limiter = HostRateLimiter(bytes_per_sec, requests_per_sec)
+                else:
+                    _limiter.set_limits(bytes_per_sec, requests_per_sec)
+                _active_limiter = _limiter
+            else:
+                _active_limiter = None
+            _limits_checked = now
+    return _active_limiter
+
+
+def throttle(nbytes: int = 0, requests: int = 1, priority: int = INTERACTIVE) -> None:
+    """
+    Wait until a transfer is within the host-wide limits (no-op without limits).
+    
+    Args:
+        nbytes: Bytes sent or received
+        requests: Number of requests
+        priority: INTERACTIVE (downloads, reads) or BACKGROUND (uploads)
+    """
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        limiter.acquire(nbytes, requests, priority)
+
+
+def throttled(chunks: Iterable[bytes], priority: int = INTERACTIVE) -> Iterator[bytes]:
+    """Pass chunks of a stream through, charging each one to the limits."""
+    if get_rate_limiter() is None:
+        yield from chunks
+        return
+    for chunk in chunks:
+        throttle(len(chunk), 0, priority)
+        yield chunk
+
+
+def part_callback(priority: int) -> Optional[Callable[[int, int], Any]]:
+    """
+    Progress callback for multipart transfers of the COS SDK that charges
+    each finished part (the SDK calls it under a lock, so waiting in it
+    holds back the other part threads too).
+    
+    Returns:
+        Callback taking (finished_bytes, total_bytes), or None without limits
+    """
+    if get_rate_limiter() is None:
+        return None
+    reported = [0]
+    
+    def callback(finished: int, total: int) -> None:
+        throttle(finished - reported[0], 1, priority)
+        reported[0] = finished
+    
+    return callback
@@ -0,0 +1,204 @@
+"""Seekable file objects over ranged reads of remote objects for DataHub CLI."""
+
+import copy
+import io
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# Default granularity of ranged reads and cached blocks
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# Bytes fetched from the end of an object when it is opened; covers the
+# footer of almost every parquet file in a single request
+DEFAULT_TAIL_SIZE = 64 * 1024
+
+# Default bound of the per-file block cache
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class RangedFile(io.RawIOBase):
+    """
+    Read-only, seekable file backed by HTTP/COS range requests.
+    
+    Reads are aligned to blocks, contiguous missing blocks are fetched with
+    a single request, and fetched blocks are kept in a bounded LRU cache.
+    This lets pyarrow open a remote parquet file and read only its footer
+    and the pages it needs.
+    """
+    
+    def __init__(
+        self,
+        fetch: Callable[[int, int], bytes],
+        size: int,
+        name: str = "",
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+        tail: bytes = b"",
+    ):
+        """
+        Args:
+            fetch: Callable returning the bytes in [start, end) of the object
+            size: Total object size in bytes
+            name: Object name, for error messages
+            block_size: Size of cached blocks
+            max_cache_bytes: Maximum bytes kept in the block cache (0 disables it)
+            tail: Already-fetched bytes from the end of the object
+        """
+        super().__init__()
+        self._fetch = fetch
+        self.size = size
+        self.name = name
+        self._block_size = block_size
+        self._max_cached_blocks = max_cache_bytes // block_size
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._tail_start = size - len(tail)
+        self._tail = tail
+        self._position = 0
+        self._lock = threading.Lock()
+        # Shared with views of this file
+        self._counters = {"bytes": len(tail), "requests": 1 if tail else 0}
+    
+    @property
+    def bytes_fetched(self) -> int:
+        """Bytes fetched from the remote object so far, including by views."""
+        return self._counters["bytes"]
+    
+    @property
+    def requests(self) -> int:
+        """Range requests made so far, including by views."""
+        return self._counters["requests"]
+    
+    def view(self) -> "RangedFile":
+        """
+        Get another file over the same object with its own position.
+        
+        Views share the block cache, so several threads can read different
+        parts of the object concurrently, each through its own view.
+        """
+        other = copy.copy(self)
+        other._position = 0
+        return other
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return position
+    
+    def readinto(self, buffer) -> int:
+        data = self.read_range(self._position, len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+    
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size - self._position
+        data = self.read_range(self._position, size)
+        self._position += len(data)
+        return data
+    
+    def readall(self) -> bytes:
+        return self.read(-1)
+    
+    def read_range(self, start: int, length: int) -> bytes:
+        """Read length bytes at start without moving the file position."""
+        end = min(start + length, self.size)
+        if start >= end:
+            return b""
+        
+        # Served entirely from the prefetched tail
+        if start >= self._tail_start:
+            return self._tail[start - self._tail_start:end - self._tail_start]
+        
+        first_block = start // self._block_size
+        last_block = (end - 1) // self._block_size
+        blocks = self._load_blocks(first_block, last_block)
+        
+        data = b"".join(blocks[index] for index in range(first_block, last_block + 1))
+        offset = start - first_block * self._block_size
+        return data[offset:offset + (end - start)]
+    
+    def prefetch(self, start: int, end: int) -> None:
+        """Load the blocks covering [start, end) into the cache."""
+        end = min(end, self.size)
+        if start >= end or start >= self._tail_start:
+            return
+        self._load_blocks(start // self._block_size, (end - 1) // self._block_size)
+    
+    def _load_blocks(self, first_block: int, last_block: int) -> Dict[int, bytes]:
+        """
+        Get the blocks in [first_block, last_block], fetching missing runs
+        with one request each. The blocks are returned directly, so reads
+        larger than the cache do not depend on what it retains.
+        """
+        blocks: Dict[int, bytes] = {}
+        with self._lock:
+            for index in range(first_block, last_block + 1):
+                if index in self._blocks:
+                    self._blocks.move_to_end(index)
+                    blocks[index] = self._blocks[index]
+        missing = [i for i in range(first_block, last_block + 1) if i not in blocks]
+        
+        run_start: Optional[int] = None
+        previous: Optional[int] = None
+        for index in missing + [None]:
+            if index is not None and previous is not None and index == previous + 1:
+                previous = index
+                continue
+            if run_start is not None:
+                fetched = self._fetch_blocks(run_start, previous)
+                blocks.update(fetched)
+                with self._lock:
+                    for block_index, block in fetched.items():
+                        self._blocks[block_index] = block
+                        self._blocks.move_to_end(block_index)
+                    while len(self._blocks) > self._max_cached_blocks:
+                        self._blocks.popitem(last=False)
+            run_start = previous = index
+        
+        return blocks
+    
+    def _fetch_blocks(self, first_block: int, last_block: int) -> Dict[int, bytes]:
+        """Fetch a contiguous run of blocks with one range request."""
+        start = first_block * self._block_size
+        end = min((last_block + 1) * self._block_size, self.size)
+        data = self._fetch(start, end)
+        if len(data) != end - start:
+            raise IOError(
+                f"Short read from {self.name or 'remote object'}: "
+                f"expected {end - start} bytes at {start}, got {len(data)}"
+            )
+        with self._lock:
+            self._counters["bytes"] += len(data)
+            self._counters["requests"] += 1
+        return {
+            index: data[(index - first_block) * self._block_size:(index - first_block + 1) * self._block_size]
+            for index in range(first_block, last_block + 1)
+        }
+
+
+def parse_content_range(value: str) -> Optional[int]:
+    """Get the total size from a 'bytes start-end/total' Content-Range header."""
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
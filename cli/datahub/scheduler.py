@@ -0,0 +1,162 @@
+"""Shared transfer scheduler for multi-dataset uploads and downloads."""
+
+import contextlib
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Queued job: (future, function, args, kwargs)
+_Job = Tuple[Future, Callable[..., Any], tuple, dict]
+
+
+class TransferScheduler:
+    """
+    Worker pool shared by the file transfers of several datasets.
+    
+    Jobs are queued per group (one group per dataset) and idle workers take
+    the next job from the groups in round-robin order. A large dataset
+    therefore cannot starve the others, and the pool stays busy as long as
+    any dataset still has files, so a batch moves about as fast as a single
+    dataset of the same total size.
+    
+    submit() returns a concurrent.futures.Future, so callers can wait on
+    jobs with as_completed() exactly as with a ThreadPoolExecutor.
+    """
+    
+    def __init__(self, max_workers: int = 8):
+        """
+        Args:
+            max_workers: Number of worker threads across all groups
+        """
+        self.max_workers = max_workers
+        self._queues: Dict[str, Deque[_Job]] = {}
+        # Groups with queued jobs, in the order they get their next turn
+        self._ready: Deque[str] = deque()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads: List[threading.Thread] = []
+    
+    def __enter__(self) -> "TransferScheduler":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+    
+    def submit(self, group: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Queue a job.
+        
+        Args:
+            group: Group the job belongs to (e.g. the dataset ID)
+            fn: Function to run on a worker thread
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+            
+        Returns:
+            Future of the job's result
+        """
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot submit to a scheduler that has been shut down")
+            queue = self._queues.setdefault(group, deque())
+            if not queue:
+                self._ready.append(group)
+            queue.append((future, fn, args, kwargs))
+            self._start_workers()
+            self._cond.notify()
+        return future
+    
+    def _start_workers(self) -> None:
+        """Start the worker threads on first use (lock held)."""
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"datahub-transfer-{len(self._threads)}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def _next_job(self) -> Optional[_Job]:
+        """Take the next job in round-robin order, or None on shutdown."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._ready or self._shutdown)
+            if not self._ready:
+                return None
+            group = self._ready.popleft()
+            queue = self._queues[group]
+            job = queue.popleft()
+            if queue:
+                self._ready.append(group)
+            else:
+                del self._queues[group]
+            return job
+    
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+    
+    def pending(self, group: Optional[str] = None) -> int:
+        """Number of queued (not yet started) jobs, of one group or in total."""
+        with self._cond:
+            if group is not None:
+                return len(self._queues.get(group, ()))
+            return sum(len(queue) for queue in self._queues.values())
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the workers once the queued jobs are done.
+        
+        Args:
+            wait: Block until all queued and running jobs have finished
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+# Scheduler shared by every command of a long-running process (the agent)
+_shared_scheduler: Optional[TransferScheduler] = None
+
+
+def set_shared_scheduler(scheduler: Optional[TransferScheduler]) -> None:
+    """
+    Make transfers that would create their own workers use one scheduler.
+    
+    Args:
+        scheduler: Scheduler for all transfers of this process (None to unset)
+    """
+    global _shared_scheduler
+    _shared_scheduler = scheduler
+
+
+def get_shared_scheduler() -> Optional[TransferScheduler]:
+    """Get the process-wide scheduler, if one is set."""
+    return _shared_scheduler
+
+
+@contextlib.contextmanager
+def transfer_scheduler(max_workers: int) -> Iterator[TransferScheduler]:
+    """
+    Yield the process-wide scheduler if one is set, else a new scheduler of
+    max_workers that is shut down on exit.
+    """
+    if _shared_scheduler is not None:
+        yield _shared_scheduler
+        return
+    with TransferScheduler(max_workers=max_workers) as scheduler:
+        yield scheduler
@@ -0,0 +1,170 @@
+"""Persistent staging of rewritten files for DataHub CLI (upload --optimize-parquet, --faststart)."""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .cache import file_identity
+from .config import STAGING_DIR, get_staging_max_bytes
+
+# Per-entry record of the source file a copy was made from
+_SOURCE_FILE = "source.json"
+
+# Entries without a record younger than this may be a rewrite in progress
+# in another process, so trim leaves them alone
+_PENDING_SECONDS = 3600
+
+
+class StagingArea:
+    """
+    Rewritten copies of local files (~/.datahub/optimized), one directory
+    per source file and kind of rewrite.
+    
+    A copy is reused as long as its source keeps the identity (size, mtime,
+    inode) it had when the copy was made. Re-uploading an unchanged folder
+    therefore neither rewrites its files again nor misses the local result
+    cache, whose entries are keyed by the copy's path and identity. The
+    area is trimmed to a size bound by evicting the least recently used
+    copies, and copies of changed or deleted sources.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: Staging directory (default: ~/.datahub/optimized)
+            max_bytes: Size bound (default: from config)
+        """
+        self.path = Path(path) if path is not None else STAGING_DIR
+        self.max_bytes = get_staging_max_bytes() if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        # Entries used by this process, never evicted by its own trim
+        self._used: set = set()
+    
+    def _entry(self, source: str, kind: str) -> Path:
+        digest = hashlib.sha256(f"{kind}\0{os.path.abspath(source)}".encode("utf-8")).hexdigest()
+        return self.path / digest[:32]
+    
+    def stage(
+        self,
+        source: str,
+        kind: str,
+        rewrite: Callable[[str, str], Optional[Dict[str, Any]]],
+    ) -> Optional[Tuple[str, Dict[str, Any], bool]]:
+        """
+        Get the rewritten copy of a file, rewriting it if there is no current one.
+        
+        Args:
+            source: Local file path
+            kind: Kind of rewrite, including its settings
+            rewrite: Called with (source, destination) to write a new copy;
+                returns a JSON-serializable report, or None if the file does
+                not need a rewrite
+                
+        Returns:
+            Tuple of (path of the copy, report, whether the copy was reused),
+            or None if the file does not need a rewrite
+        """
+        entry = self._entry(source, kind)
+        copy_path = entry / Path(source).name
+        with self._lock:
+            self._used.add(entry)
+        
+        identity = file_identity(source)
+        try:
+            record = json.loads((entry / _SOURCE_FILE).read_text())
+            if tuple(record["identity"]) == tuple(identity) and copy_path.is_file():
+                # The record's mtime orders entries for eviction
+                os.utime(entry / _SOURCE_FILE)
+                return str(copy_path), record["report"], True
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+            
+        shutil.rmtree(entry, ignore_errors=True)
+        entry.mkdir(parents=True, exist_ok=True)
+        report = rewrite(source, str(copy_path))
+        if report is None:
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        
+        # Written last, so an interrupted rewrite is never reused; the
+        # identity is the one from before the rewrite, so edits made while
+        # it ran invalidate the copy
+        record = {"source": os.path.abspath(source), "identity": list(identity), "report": report}
+        temp_file = entry / f"{_SOURCE_FILE}.tmp"
+        temp_file.write_text(json.dumps(record))
+        os.replace(temp_file, entry / _SOURCE_FILE)
+        return str(copy_path), report, False
+    
+    def _entries(self) -> List[Tuple[float, int, Path, Optional[Dict[str, Any]]]]:
+        """List (last use, size, directory, record) of all entries."""
+        entries = []
+        if not self.path.is_dir():
+            return entries
+        for entry in self.path.iterdir():
+            if not entry.is_dir():
+                continue
+            size = 0
+            for item in entry.iterdir():
+                with contextlib.suppress(OSError):
+                    size += item.stat().st_size
+            try:
+                record_file = entry / _SOURCE_FILE
+                last_use = record_file.stat().st_mtime
+                record = json.loads(record_file.read_text())
+            except (OSError, ValueError):
+                last_use, record = 0.0, None
+            entries.append((last_use, size, entry, record))
+        return entries
+    
+    def trim(self) -> None:
+        """Remove stale copies, then the least recently used ones beyond the size bound."""
+        with self._lock:
+            used = set(self._used)
+        
+        kept = []
+        for last_use, size, entry, record in self._entries():
+            if entry in used:
+                kept.append((last_use, size, entry))
+                continue
+            try:
+                if record is None:
+                    if time.time() - entry.stat().st_mtime < _PENDING_SECONDS:
+                        continue
+                    stale = True
+                else:
+                    stale = tuple(record["identity"]) != tuple(file_identity(record["source"]))
+            except (OSError, KeyError, TypeError):
+                stale = True
+            if stale:
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                kept.append((last_use, size, entry))
+        
+        total = sum(size for _, size, _ in kept)
+        for _, size, entry in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            if entry in used:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+    
+    def info(self) -> Dict[str, Any]:
+        """Get the number of staged copies and their size."""
+        entries = self._entries()
+        return {
+            "path": str(self.path),
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _, _ in entries),
+            "maxBytes": self.max_bytes,
+        }
+    
+    def clear(self) -> None:
+        """Delete all staged copies."""
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,220 @@
+"""Sharded, prefetching record batch streaming of remote datasets for DataHub CLI."""
+
+import random
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .api import APIClient
+from .config import get_cos_config
+from .cos import open_cos_object, open_http_object
+from .parquet_preview import PYARROW_AVAILABLE, is_parquet_file
+from .remote import RangedFile
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+# Upper bound on the decoded size of row groups held in memory at once
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# Maximum number of row groups read ahead of the consumer
+DEFAULT_PREFETCH = 4
+
+# Streaming reads fetch whole column chunks once, so larger blocks are used
+# and nothing is cached beyond the footers
+_STREAM_BLOCK_SIZE = 1024 * 1024
+_STREAM_CACHE_BYTES = 0
+
+# (file index, row group index, estimated decoded bytes)
+RowGroupRef = Tuple[int, int, int]
+
+
+def stream(
+    dataset_id: str,
+    columns: Optional[List[str]] = None,
+    rank: int = 0,
+    world_size: int = 1,
+    shuffle_seed: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    prefetch: int = DEFAULT_PREFETCH,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    client: Optional[APIClient] = None,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Stream the parquet data of a dataset straight from the bucket.
+    
+    The row groups of all data files (everything outside meta/) are listed
+    from their footers and split deterministically across ranks: every rank
+    builds the same list, optionally shuffles it with shuffle_seed, and takes
+    every world_size-th row group starting at rank. Upcoming row groups are
+    read in the background with ranged requests for only the selected
+    columns, while the decoded row groups held in memory stay within
+    memory_budget.
+    
+    Example:
+        for batch in datahub.stream("my-dataset", columns=["action"],
+                                    rank=rank, world_size=world_size,
+                                    shuffle_seed=epoch):
+            ...
+            
+    Args:
+        dataset_id: Dataset ID
+        columns: Columns to read (default: all)
+        rank: Index of this worker, in [0, world_size)
+        world_size: Total number of workers
+        shuffle_seed: Seed for shuffling the row group order (default: file order);
+            use the same seed on every rank, e.g. the epoch number
+        batch_size: Maximum rows per yielded batch (default: row group batches as stored)
+        prefetch: Maximum number of row groups read ahead
+        memory_budget: Maximum estimated decoded bytes of row groups in flight;
+            a single row group larger than the budget is still read
+        client: API client (default: a new APIClient)
+        
+    Yields:
+        pyarrow.RecordBatch objects
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow is required for streaming: pip install pyarrow")
+    if world_size < 1 or not 0 <= rank < world_size:
+        raise ValueError(f"rank must be in [0, {world_size}), got {rank}")
+    
+    dataset = (client or APIClient()).get_dataset(dataset_id)
+    paths = sorted(
+        f["path"] for f in dataset.get("files", [])
+        if is_parquet_file(f.get("path", "")) and not f["path"].startswith("meta/")
+    )
+    urls = {f["path"]: f.get("ossUrl") for f in dataset.get("files", [])}
+    opener = _remote_opener(dataset_id, urls)
+    
+    with ThreadPoolExecutor(max_workers=max(1, prefetch)) as executor:
+        remote_files = list(executor.map(opener, paths))
+        parquet_files = [
+            pq.ParquetFile(remote_file, pre_buffer=False) for remote_file in remote_files
+        ]
+        row_groups = shard_row_groups(
+            plan_row_groups(parquet_files, columns), rank, world_size, shuffle_seed
+        )
+        
+        def read(ref: RowGroupRef) -> "pa.Table":
+            file_index, rg_index, _ = ref
+            # Each read gets its own view, so concurrent reads of one file
+            # do not share a file position
+            parquet_file = pq.ParquetFile(
+                remote_files[file_index].view(),
+                metadata=parquet_files[file_index].metadata,
+                pre_buffer=False,
+            )
+            return parquet_file.read_row_group(rg_index, columns=columns)
+        
+        yield from _prefetched(row_groups, read, executor, prefetch, memory_budget, batch_size)
+
+
+def plan_row_groups(parquet_files: List[Any], columns: Optional[List[str]] = None) -> List[RowGroupRef]:
+    """
+    List the row groups of a set of parquet files with their estimated size.
+    
+    Args:
+        parquet_files: Opened pq.ParquetFile objects (only footers are used)
+        columns: Columns that will be read (default: all)
+        
+    Returns:
+        List of (file index, row group index, estimated decoded bytes)
+    """
+    refs = []
+    for file_index, parquet_file in enumerate(parquet_files):
+        metadata = parquet_file.metadata
+        selected = [
+            i for i in range(metadata.num_columns)
+            if columns is None or _in_columns(metadata.schema.column(i).path, columns)
+        ]
+        for rg_index in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg_index)
+            size = sum(row_group.column(i).total_uncompressed_size for i in selected)
+            refs.append((file_index, rg_index, size))
+    return refs
+
+
+def shard_row_groups(
+    refs: List[RowGroupRef],
+    rank: int,
+    world_size: int,
+    shuffle_seed: Optional[int] = None,
+) -> List[RowGroupRef]:
+    """
+    Select the row groups of one rank.
+    
+    Every rank must pass the same refs and seed; the shards are disjoint and
+    together cover all row groups.
+    """
+    refs = list(refs)
+    if shuffle_seed is not None:
+        random.Random(shuffle_seed).shuffle(refs)
+    return refs[rank::world_size]
+
+
+def _in_columns(leaf_path: str, columns: List[str]) -> bool:
+    """Check if a leaf column path (e.g. "observation.state.list.element") belongs to a selected column."""
+    return any(leaf_path == name or leaf_path.startswith(name + ".") for name in columns)
+
+
+def _remote_opener(dataset_id: str, urls: Dict[str, Optional[str]]) -> Callable[[str], RangedFile]:
+    """Open dataset files through COS when configured, otherwise by public URL."""
+    cos_config = get_cos_config()
+    use_cos = bool(cos_config["secret_id"] and cos_config["bucket"])
+    
+    def open_remote(path: str) -> RangedFile:
+        if use_cos:
+            return open_cos_object(
+                f"datasets/{dataset_id}/{path}",
+                block_size=_STREAM_BLOCK_SIZE,
+                max_cache_bytes=_STREAM_CACHE_BYTES,
+            )
+        if not urls.get(path):
+            raise ValueError(f"No public URL for {path}; configure COS credentials: datahub config cos")
+        return open_http_object(
+            urls[path],
+            block_size=_STREAM_BLOCK_SIZE,
+            max_cache_bytes=_STREAM_CACHE_BYTES,
+        )
+    
+    return open_remote
+
+
+def _prefetched(
+    refs: List[RowGroupRef],
+    read: Callable[[RowGroupRef], "pa.Table"],
+    executor: ThreadPoolExecutor,
+    prefetch: int,
+    memory_budget: int,
+    batch_size: Optional[int],
+) -> Iterator["pa.RecordBatch"]:
+    """Yield the batches of row groups in order while reading ahead within the budget."""
+    pending: Deque[Tuple[RowGroupRef, Future]] = deque()
+    in_flight = 0
+    next_ref = 0
+    
+    def fill() -> None:
+        nonlocal in_flight, next_ref
+        while next_ref < len(refs) and len(pending) < max(1, prefetch):
+            size = refs[next_ref][2]
+            # Always allow one row group, even if it exceeds the budget alone
+            if pending and in_flight + size > memory_budget:
+                break
+            in_flight += size
+            pending.append((refs[next_ref], executor.submit(read, refs[next_ref])))
+            next_ref += 1
+    
+    try:
+        fill()
+        while pending:
+            ref, future = pending.popleft()
+            table = future.result()
+            for batch in table.to_batches(max_chunksize=batch_size):
+                yield batch
+            del table
+            in_flight -= ref[2]
+            fill()
+    finally:
+        for _, future in pending:
+            future.cancel()
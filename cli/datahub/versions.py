@@ -0,0 +1,535 @@
+"""Chunk-level deduplicated dataset versions for DataHub CLI."""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from rich.progress import Progress, TaskID
+
+from .cache import ResultCache, file_identity
+from .config import CHUNK_CACHE_DIR, get_chunk_cache_max_bytes
+from .cos import VERSION_STORE_PREFIXES, download_bytes, get_http_session, list_objects, upload_bytes
+from .ratelimit import throttle
+from .scheduler import TransferScheduler, transfer_scheduler
+
+# Chunk size bounds; boundaries in between depend only on the content
+# around them, so an insertion or append changes only the chunks it touches
+MIN_CHUNK_BYTES = 256 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+
+# A position ends a chunk when the hash of the 8 bytes before it is below
+# 2**(64 - BOUNDARY_BITS), i.e. once every ~1 MiB past the minimum size.
+# Changing any of these constants changes every chunk boundary.
+BOUNDARY_BITS = 20
+WINDOW_BYTES = 8
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_BOUNDARY_LIMIT = np.uint64(1 << (64 - BOUNDARY_BITS))
+_WINDOW_DTYPE = np.dtype("<u8")
+
+# Bytes read (and hashed with one set of array operations) at a time
+READ_BLOCK_BYTES = 4 * 1024 * 1024
+
+CHUNKS_CACHE_KIND = "chunks-v1"
+
+# Keys below a dataset's prefix
+CHUNKS_PREFIX, RECIPES_PREFIX, VERSIONS_PREFIX = VERSION_STORE_PREFIXES
+VERSION_INDEX_KEY = VERSIONS_PREFIX + "index.json"
+
+# Chunk of a file: (SHA-256 hex digest, size)
+Chunk = Tuple[str, int]
+
+
+def _boundaries(data: bytes) -> np.ndarray:
+    """Offsets in data at which a chunk may end."""
+    count = len(data) - WINDOW_BYTES + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.intp)
+    # Every 8-byte window as a little-endian integer (an overlapping view,
+    # so hashing costs a multiply and a compare per byte)
+    windows = np.ndarray(shape=(count,), dtype=_WINDOW_DTYPE, buffer=data, strides=(1,))
+    return np.flatnonzero(windows * _HASH_MULTIPLIER < _BOUNDARY_LIMIT) + WINDOW_BYTES
+
+
+def iter_chunks(f: BinaryIO, block_size: int = READ_BLOCK_BYTES) -> Iterator[bytes]:
+    """
+    Split a binary stream into content-defined chunks.
+    
+    Each chunk ends at the first boundary at least MIN_CHUNK_BYTES after its
+    start, or after MAX_CHUNK_BYTES when there is none.
+    
+    Args:
+        f: Binary file object
+        block_size: Bytes read at a time
+        
+    Yields:
+        The chunks in order
+    """
+    pending = bytearray()
+    # Last bytes of the previous block, so windows can span blocks
+    carry = b""
+    
+    while True:
+        block = f.read(block_size)
+        if not block:
+            break
+            
+        window_data = carry + block
+        ends = _boundaries(window_data) + (len(pending) - len(carry))
+        carry = window_data[-(WINDOW_BYTES - 1):]
+        pending += block
+        
+        start = 0
+        while True:
+            i = int(np.searchsorted(ends, start + MIN_CHUNK_BYTES))
+            if i == len(ends):
+                break
+            end = int(ends[i])
+            if end - start > MAX_CHUNK_BYTES:
+                end = start + MAX_CHUNK_BYTES
+            yield bytes(pending[start:end])
+            start = end
+        # Any later boundary would be too far from start as well
+        while len(pending) - start > MAX_CHUNK_BYTES:
+            yield bytes(pending[start:start + MAX_CHUNK_BYTES])
+            start += MAX_CHUNK_BYTES
+        del pending[:start]
+    
+    if pending:
+        yield bytes(pending)
+
+
+def file_chunks(file_path: str, cache: Optional[ResultCache] = None) -> List[Chunk]:
+    """
+    Get the chunk list of a local file.
+    
+    Args:
+        file_path: Local file path
+        cache: Optional local result cache (chunk lists of unchanged files)
+        
+    Returns:
+        List of (digest, size) tuples
+    """
+    identity = file_identity(file_path)
+    cached = cache.get(file_path, CHUNKS_CACHE_KIND, identity) if cache else None
+    if cached is not None:
+        return [(digest, size) for digest, size in cached]
+    
+    with open(file_path, "rb") as f:
+        chunks = [(hashlib.sha256(data).hexdigest(), len(data)) for data in iter_chunks(f)]
+    if cache:
+        cache.put(file_path, CHUNKS_CACHE_KIND, chunks, identity)
+    return chunks
+
+
+def recipe_id(chunks: List[Chunk]) -> str:
+    """Content ID of a file: the SHA-256 of its chunk digests in order."""
+    digest = hashlib.sha256()
+    for chunk_digest, _ in chunks:
+        digest.update(bytes.fromhex(chunk_digest))
+    return digest.hexdigest()
+
+
+def _chunk_key(digest: str) -> str:
+    return f"{CHUNKS_PREFIX}{digest[:2]}/{digest}"
+
+
+def _recipe_key(recipe: str) -> str:
+    return f"{RECIPES_PREFIX}{recipe}.json"
+
+
+def _version_key(version: int) -> str:
+    return f"{VERSIONS_PREFIX}{version}.json"
+
+
+def public_base_url(dataset_id: str, files: List[Dict[str, Any]]) -> Optional[str]:
+    """Bucket URL taken from the public URL of a dataset file, for reads without COS credentials."""
+    marker = f"/datasets/{dataset_id}/"
+    for file_info in files:
+        url = file_info.get("ossUrl") or ""
+        if marker in url:
+            return url[:url.index(marker)]
+    return None
+
+
+class VersionStore:
+    """
+    Version objects of one dataset, below datasets/<id>/.datahub/:
+    
+    - chunks/<aa>/<digest>: file content, stored once per dataset
+    - recipes/<id>.json: size and chunk list of a file content, shared by
+      every version that has a file with that content
+    - versions/<n>.json: path, size and recipe of every file of version n
+    - versions/index.json: one summary per version
+    
+    A version manifest is one short line per file, and unchanged files of
+    a new version point to recipes that are already stored.
+    
+    Reads go through the COS SDK, or through the bucket's public URL when
+    base_url is given; writes need the COS SDK.
+    """
+    
+    def __init__(self, dataset_id: str, base_url: Optional[str] = None):
+        """
+        Args:
+            dataset_id: Dataset ID
+            base_url: Public bucket URL to read from instead of the COS SDK
+        """
+        self.dataset_id = dataset_id
+        self.prefix = f"datasets/{dataset_id}/"
+        self.base_url = base_url.rstrip("/") if base_url else None
+    
+    def read(self, key: str) -> Optional[bytes]:
+        """Read an object below the dataset prefix, or None if it does not exist."""
+        if self.base_url is None:
+            return download_bytes(self.prefix + key)
+        throttle()
+        response = get_http_session().get(f"{self.base_url}/{self.prefix}{key}", timeout=60)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        throttle(len(response.content), 0)
+        return response.content
+    
+    def read_json(self, key: str) -> Optional[Any]:
+        data = self.read(key)
+        return json.loads(data) if data is not None else None
+    
+    def write(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        upload_bytes(data, self.prefix + key, content_type)
+    
+    def write_json(self, key: str, value: Any) -> int:
+        """Write a JSON object and return its size in bytes."""
+        data = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        self.write(key, data, "application/json")
+        return len(data)
+    
+    def stored_chunks(self) -> Set[str]:
+        """Digests of all stored chunks."""
+        return {obj["Key"].rsplit("/", 1)[-1] for obj in list_objects(self.prefix + CHUNKS_PREFIX)}
+    
+    def versions(self) -> List[Dict[str, Any]]:
+        """Summaries of all versions, oldest first."""
+        return self.read_json(VERSION_INDEX_KEY) or []
+    
+    def load_version(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Read a version manifest.
+        
+        Args:
+            version: Version number (default: the latest version)
+            
+        Raises:
+            ValueError: If the dataset has no such version
+        """
+        if version is None:
+            versions = self.versions()
+            if not versions:
+                raise ValueError(f"Dataset '{self.dataset_id}' has no versions")
+            version = versions[-1]["version"]
+        manifest = self.read_json(_version_key(version))
+        if manifest is None:
+            raise ValueError(f"Version {version} of dataset '{self.dataset_id}' not found")
+        return manifest
+
+
+class ChunkCache:
+    """
+    Content-addressed local cache of downloaded chunks (~/.datahub/chunks),
+    trimmed to a size bound by evicting the least recently used chunks.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: Cache directory (default: ~/.datahub/chunks)
+            max_bytes: Size bound (default: from config; 0 disables the cache)
+        """
+        self.path = Path(path) if path is not None else CHUNK_CACHE_DIR
+        self.max_bytes = get_chunk_cache_max_bytes() if max_bytes is None else max_bytes
+    
+    def _file(self, digest: str) -> Path:
+        return self.path / digest[:2] / digest
+    
+    def get(self, digest: str) -> Optional[bytes]:
+        """Get a cached chunk, or None if it is not cached (or damaged)."""
+        chunk_file = self._file(digest)
+        try:
+            data = chunk_file.read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(chunk_file)
+        return data
+    
+    def put(self, digest: str, data: bytes) -> None:
+        if self.max_bytes <= 0:
+            return
+        chunk_file = self._file(digest)
+        chunk_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = chunk_file.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_file.write_bytes(data)
+        os.replace(temp_file, chunk_file)
+    
+    def trim(self) -> None:
+        """Evict the least recently used chunks beyond the size bound."""
+        if not self.path.is_dir():
+            return
+        entries = []
+        for chunk_file in self.path.glob("*/*"):
+            with contextlib.suppress(OSError):
+                st = chunk_file.stat()
+                entries.append((st.st_mtime, st.st_size, chunk_file))
+        total = sum(size for _, size, _ in entries)
+        for _, size, chunk_file in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                chunk_file.unlink()
+                total -= size
+
+
+@contextlib.contextmanager
+def _scheduler_for(scheduler: Optional[TransferScheduler], max_workers: int) -> Iterator[TransferScheduler]:
+    if scheduler is not None:
+        yield scheduler
+        return
+    with transfer_scheduler(max_workers) as own_scheduler:
+        yield own_scheduler
+
+
+def create_version(
+    dataset_id: str,
+    files: List[Tuple[str, str]],
+    progress: Progress,
+    task_id: TaskID,
+    message: str = "",
+    max_workers: int = 8,
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, Any]:
+    """
+    Store local files as a new immutable version of a dataset.
+    
+    Files are split into content-defined chunks and only chunks the store
+    does not hold yet are uploaded, so a version that appends episodes or
+    rewrites a few files adds only the changed bytes. Files whose chunk
+    lists are in the local cache and match a file of the previous version
+    are not read at all. The manifest is written after all chunks and
+    recipes, so a version never refers to missing objects.
+    
+    Args:
+        dataset_id: Dataset ID
+        files: Files as (absolute_path, relative_path) tuples
+        progress: Rich progress instance
+        task_id: Progress task ID
+        message: Description of the version
+        max_workers: Number of files processed in parallel
+        cache: Optional local result cache for chunk lists
+        
+    Returns:
+        Summary of the new version, as listed in the version index
+    """
+    store = VersionStore(dataset_id)
+    index = store.versions()
+    parent = store.load_version(index[-1]["version"]) if index else None
+    version = index[-1]["version"] + 1 if index else 1
+    
+    known_recipes = {entry["recipe"] for entry in parent["files"]} if parent else set()
+    stored = store.stored_chunks()
+    lock = threading.Lock()
+    added = {"bytes": 0, "chunks": 0}
+    
+    progress.update(task_id, total=sum(os.path.getsize(abs_path) for abs_path, _ in files))
+    
+    def claim(key_set: Set[str], key: str) -> bool:
+        """Take the job of storing an object no other file has stored."""
+        with lock:
+            if key in key_set:
+                return False
+            key_set.add(key)
+            return True
+    
+    def store_file(file_info: Tuple[str, str]) -> Dict[str, Any]:
+        abs_path, rel_path = file_info
+        identity = file_identity(abs_path)
+        
+        cached = cache.get(abs_path, CHUNKS_CACHE_KIND, identity) if cache else None
+        if cached is not None:
+            recipe = recipe_id([(digest, size) for digest, size in cached])
+            if recipe in known_recipes:
+                return {"path": rel_path, "size": identity[0], "recipe": recipe}
+        
+        chunks: List[Chunk] = []
+        with open(abs_path, "rb") as f:
+            for data in iter_chunks(f):
+                digest = hashlib.sha256(data).hexdigest()
+                chunks.append((digest, len(data)))
+                if claim(stored, digest):
+                    store.write(_chunk_key(digest), data)
+                    with lock:
+                        added["bytes"] += len(data)
+                        added["chunks"] += 1
+        if cache:
+            cache.put(abs_path, CHUNKS_CACHE_KIND, chunks, identity)
+        
+        recipe = recipe_id(chunks)
+        size = sum(chunk_size for _, chunk_size in chunks)
+        if claim(known_recipes, recipe):
+            recipe_bytes = store.write_json(_recipe_key(recipe), {"size": size, "chunks": chunks})
+            with lock:
+                added["bytes"] += recipe_bytes
+        return {"path": rel_path, "size": size, "recipe": recipe}
+    
+    entries = []
+    with transfer_scheduler(max_workers) as scheduler:
+        futures = {scheduler.submit(dataset_id, store_file, f): f for f in files}
+        try:
+            for future in as_completed(futures):
+                abs_path, rel_path = futures[future]
+                try:
+                    entries.append(future.result())
+                except Exception as e:
+                    raise RuntimeError(f"Failed to store {rel_path}: {e}") from e
+                progress.advance(task_id, os.path.getsize(abs_path))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    
+    if store.read(_version_key(version)) is not None:
+        raise RuntimeError(f"Version {version} was created by another upload; run the command again")
+    
+    entries.sort(key=lambda entry: entry["path"])
+    summary = {
+        "version": version,
+        "parent": parent["version"] if parent else None,
+        "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "message": message,
+        "fileCount": len(entries),
+        "totalBytes": sum(entry["size"] for entry in entries),
+        "addedBytes": added["bytes"],
+        "addedChunks": added["chunks"],
+    }
+    store.write_json(_version_key(version), {**summary, "files": entries})
+    store.write_json(VERSION_INDEX_KEY, index + [summary])
+    return summary
+
+
+def download_version(
+    dataset_id: str,
+    version: Optional[int],
+    output_path: str,
+    progress: Progress,
+    task_id: TaskID,
+    max_workers: int = 4,
+    scheduler: Optional[TransferScheduler] = None,
+    base_url: Optional[str] = None,
+    cache: Optional[ResultCache] = None,
+) -> Dict[str, int]:
+    """
+    Assemble the files of a dataset version in a local folder.
+    
+    Local files that already have the version's content are kept. Other
+    files are assembled from chunks, taken from the old local copy of the
+    file, the local chunk cache (~/.datahub/chunks) or the store, in that
+    order, so moving a folder from one version to another only fetches the
+    chunks that differ. Every chunk is checked against its digest.
+    
+    Args:
+        dataset_id: Dataset ID
+        version: Version number (None for the latest version)
+        output_path: Local output directory
+        progress: Rich progress instance
+        task_id: Progress task ID
+        max_workers: Number of files assembled in parallel (without a scheduler)
+        scheduler: Shared scheduler to run the downloads on
+        base_url: Public bucket URL to read from instead of the COS SDK
+        cache: Optional local result cache for chunk lists of local files
+        
+    Returns:
+        Counts of kept, assembled and failed files and of bytes fetched
+    """
+    store = VersionStore(dataset_id, base_url)
+    manifest = store.load_version(version)
+    chunk_cache = ChunkCache()
+    result = {"version": manifest["version"], "kept": 0, "assembled": 0, "failed": 0, "bytesFetched": 0}
+    lock = threading.Lock()
+    
+    progress.update(task_id, total=manifest["totalBytes"])
+    
+    def fetch_chunk(digest: str) -> bytes:
+        data = chunk_cache.get(digest)
+        if data is None:
+            data = store.read(_chunk_key(digest))
+            if data is None or hashlib.sha256(data).hexdigest() != digest:
+                raise ValueError(f"chunk {digest[:12]} is missing or damaged")
+            chunk_cache.put(digest, data)
+            with lock:
+                result["bytesFetched"] += len(data)
+        return data
+    
+    def assemble(entry: Dict[str, Any]) -> None:
+        local_path = os.path.join(output_path, entry["path"])
+        
+        local_chunks: List[Chunk] = []
+        if os.path.isfile(local_path):
+            local_chunks = file_chunks(local_path, cache)
+            if recipe_id(local_chunks) == entry["recipe"]:
+                with lock:
+                    result["kept"] += 1
+                return
+        
+        recipe = store.read_json(_recipe_key(entry["recipe"]))
+        if recipe is None:
+            raise ValueError(f"recipe {entry['recipe'][:12]} is missing")
+        
+        # Offsets of the chunks of the old local copy
+        local_offsets: Dict[str, int] = {}
+        offset = 0
+        for digest, size in local_chunks:
+            local_offsets.setdefault(digest, offset)
+            offset += size
+        
+        Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = f"{local_path}.datahub-part"
+        try:
+            with open(temp_path, "wb") as out, contextlib.ExitStack() as stack:
+                old = stack.enter_context(open(local_path, "rb")) if local_offsets else None
+                for digest, size in recipe["chunks"]:
+                    data = None
+                    if digest in local_offsets:
+                        old.seek(local_offsets[digest])
+                        data = old.read(size)
+                        if hashlib.sha256(data).hexdigest() != digest:
+                            data = None
+                    out.write(data if data is not None else fetch_chunk(digest))
+            os.replace(temp_path, local_path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+            raise
+        
+        with lock:
+            result["assembled"] += 1
+    
+    with _scheduler_for(scheduler, max_workers) as file_scheduler:
+        futures = {file_scheduler.submit(dataset_id, assemble, entry): entry for entry in manifest["files"]}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                result["failed"] += 1
+                progress.console.print(f"[red]Failed to download {entry['path']}: {e}[/red]")
+            progress.advance(task_id, entry["size"])
+    
+    chunk_cache.trim()
+    return result
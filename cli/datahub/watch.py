@@ -0,0 +1,389 @@
+"""Continuous ingestion of newly written files for DataHub CLI (upload --watch)."""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from qcloud_cos import CosClientError, CosServiceError
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+
+from .api import APIClient, APIError
+from .cache import FileIdentity, ResultCache, file_identity
+from .cos import format_size, should_ignore, upload_bytes, upload_folder
+from .dataset_index import INDEX_KEY, build_dataset_index, dataset_aggregates, encode_index
+from .feature_stats import STATS_KEY, compute_feature_stats, encode_stats
+from .mp4_index import faststart_mp4_files, is_mp4_file
+from .parquet_optimize import optimize_parquet_files
+from .parquet_preview import is_parquet_file
+from .staging import StagingArea
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# Seconds between checks for new files (full rescans without watchdog)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# A file is uploaded once its size and mtime have not changed for this long
+DEFAULT_SETTLE_SECONDS = 5.0
+
+# Seconds between incremental upload_complete calls
+DEFAULT_PUBLISH_INTERVAL = 10.0
+
+_PARQUET_MAGIC = b"PAR1"
+
+
+def _looks_complete(file_path: str) -> bool:
+    """Check that a parquet file has its footer written (other files are assumed complete)."""
+    if not is_parquet_file(file_path):
+        return True
+    try:
+        with open(file_path, "rb") as f:
+            f.seek(-len(_PARQUET_MAGIC), os.SEEK_END)
+            return f.read() == _PARQUET_MAGIC
+    except OSError:
+        return False
+
+
+class FolderScanner:
+    """
+    Finds new and changed files in a dataset folder once they are stable.
+    
+    A file is reported when its (size, mtime, inode) differs from the one
+    last uploaded and has not changed for settle_seconds; parquet files must
+    also end with their footer. With watchdog installed, filesystem events
+    (inotify, FSEvents, ...) name the paths to check and nothing is scanned
+    while the folder is idle; otherwise the folder is rescanned every poll.
+    """
+    
+    def __init__(
+        self,
+        folder: str,
+        uploaded: Optional[Dict[str, FileIdentity]] = None,
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        use_events: bool = True,
+    ):
+        """
+        Args:
+            folder: Folder to watch
+            uploaded: Identities of files already uploaded, by relative path
+            settle_seconds: How long a file must be unchanged
+            use_events: Use filesystem events when watchdog is installed
+        """
+        self.folder = Path(folder).resolve()
+        self.settle_seconds = settle_seconds
+        self.uploaded: Dict[str, FileIdentity] = dict(uploaded or {})
+        # Changed files that are not stable yet: relative path -> (identity, first seen)
+        self._pending: Dict[str, Tuple[FileIdentity, float]] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.Lock()
+        # Files written while nothing was watching are only found by a scan
+        self._scan_needed = True
+        self._observer = None
+        
+        if use_events and WATCHDOG_AVAILABLE:
+            scanner = self
+            
+            class _Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if event.is_directory:
+                        # New or moved directories may come with files already in them
+                        if event.event_type in ("created", "moved"):
+                            scanner._mark_tree(getattr(event, "dest_path", "") or event.src_path)
+                        return
+                    scanner._mark(event.src_path)
+                    if getattr(event, "dest_path", ""):
+                        scanner._mark(event.dest_path)
+            
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), str(self.folder), recursive=True)
+            self._observer.daemon = True
+            self._observer.start()
+    
+    @property
+    def uses_events(self) -> bool:
+        """Whether filesystem events are used instead of rescans."""
+        return self._observer is not None
+    
+    def close(self) -> None:
+        """Stop watching for filesystem events."""
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+    
+    def _mark(self, path: str) -> None:
+        with self._lock:
+            self._dirty.add(path)
+    
+    def _mark_tree(self, path: str) -> None:
+        for root, _, names in os.walk(path):
+            for name in names:
+                self._mark(os.path.join(root, name))
+    
+    def _scan(self) -> List[str]:
+        """Walk the folder, skipping ignored directories."""
+        paths = []
+        for root, dirs, names in os.walk(self.folder):
+            root_path = Path(root)
+            dirs[:] = [d for d in dirs if not should_ignore(root_path / d, (root_path / d).relative_to(self.folder))]
+            paths.extend(os.path.join(root, name) for name in names)
+        return paths
+    
+    def _candidates(self) -> List[str]:
+        """Absolute paths to check in this poll."""
+        if self._observer is None or self._scan_needed:
+            self._scan_needed = False
+            return self._scan()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        return list(dirty) + [str(self.folder / rel_path) for rel_path in self._pending]
+    
+    def poll(self) -> List[Tuple[str, str, FileIdentity]]:
+        """
+        Check for new or changed files that have settled.
+        
+        Returns:
+            List of (absolute_path, relative_path, identity) tuples ready to
+            upload; pass them to mark_uploaded once uploaded
+        """
+        now = time.monotonic()
+        ready = []
+        
+        for abs_path in set(self._candidates()):
+            path = Path(abs_path)
+            try:
+                rel = path.relative_to(self.folder)
+            except ValueError:
+                continue
+            rel_path = str(rel)
+            if should_ignore(path, rel):
+                continue
+                
+            try:
+                identity = file_identity(abs_path)
+            except OSError:
+                # Deleted (or renamed away) before it settled
+                self._pending.pop(rel_path, None)
+                continue
+                
+            if self.uploaded.get(rel_path) == identity:
+                self._pending.pop(rel_path, None)
+                continue
+                
+            seen = self._pending.get(rel_path)
+            if seen is None or seen[0] != identity:
+                self._pending[rel_path] = (identity, now)
+                continue
+                
+            if now - seen[1] >= self.settle_seconds and _looks_complete(abs_path):
+                del self._pending[rel_path]
+                ready.append((abs_path, rel_path, identity))
+        
+        return ready
+    
+    def mark_uploaded(self, rel_path: str, identity: FileIdentity) -> None:
+        """Record the identity of an uploaded file."""
+        self.uploaded[rel_path] = identity
+    
+    def retry(self, rel_path: str, identity: FileIdentity) -> None:
+        """Report a file again once it has settled anew (e.g. after a failed upload)."""
+        self._pending[rel_path] = (identity, time.monotonic())
+    
+    @property
+    def pending(self) -> int:
+        """Number of changed files that have not settled yet."""
+        return len(self._pending)
+
+
+def watch_folder(
+    client: APIClient,
+    dataset_id: str,
+    folder: str,
+    console: Console,
+    uploaded: Optional[Dict[str, FileIdentity]] = None,
+    max_workers: int = 4,
+    preview_workers: Optional[int] = None,
+    build_index: bool = True,
+    compute_stats: bool = False,
+    cache: Optional[ResultCache] = None,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+    publish_interval: float = DEFAULT_PUBLISH_INTERVAL,
+    stop_event: Optional[threading.Event] = None,
+    compression: Optional[str] = None,
+    optimize_parquet: bool = False,
+    faststart: bool = False,
+    staging: Optional[StagingArea] = None,
+    staged_copies: Optional[Dict[str, str]] = None,
+) -> Dict[str, int]:
+    """
+    Upload new and changed files of a folder as they are written.
+    
+    Settled files are uploaded (with parquet previews) as soon as they are
+    found. At most every publish_interval seconds, the uploaded files are
+    sent to the server with a merging upload_complete, together with a
+    rebuilt episode index (and statistics); per-file results of unchanged
+    files come from the local cache, so rebuilding stays cheap. Deleted
+    files are not removed from the dataset. With optimize_parquet or
+    faststart, settled files are rewritten before upload, as in the initial
+    upload. A publish that fails is retried at the next interval.
+    
+    Runs until stop_event is set or KeyboardInterrupt, then publishes what
+    has been uploaded but not published yet.
+    
+    Args:
+        client: API client
+        dataset_id: Dataset ID
+        folder: Folder to watch
+        console: Console for status messages
+        uploaded: Identities of files already uploaded, by relative path
+        max_workers: Number of parallel upload workers
+        preview_workers: Maximum number of parquet preview processes
+        build_index: Rebuild and publish the episode index
+        compute_stats: Recompute and publish feature statistics
+        cache: Optional local result cache
+        poll_interval: Seconds between checks for new files
+        settle_seconds: How long a file must be unchanged before upload
+        publish_interval: Minimum seconds between upload_complete calls
+        stop_event: Event that ends the watch
+        compression: Encoding for compressible files ("gzip" or "zstd")
+        optimize_parquet: Rewrite parquet files with a poor layout first
+        faststart: Move the moov of MP4 files to the front first
+        staging: Staging area for rewritten files (default: a new one)
+        staged_copies: Rewritten copies uploaded in place of files in
+            uploaded, by path
+        
+    Returns:
+        Dictionary with the number of uploaded files and publish calls
+    """
+    scanner = FolderScanner(folder, uploaded, settle_seconds)
+    stop_event = stop_event or threading.Event()
+    if (optimize_parquet or faststart) and staging is None:
+        staging = StagingArea()
+    
+    # Manifest entries uploaded but not published yet, by path
+    unpublished: Dict[str, Dict[str, Any]] = {}
+    # Staged copies uploaded in place of rewritten files, by path, so the
+    # index describes the uploaded bytes
+    staged_copies = dict(staged_copies or {})
+    last_publish = 0.0
+    totals = {"files": 0, "publishes": 0}
+    
+    mode = "filesystem events" if scanner.uses_events else f"polling every {poll_interval:g}s"
+    console.print(f"[blue]Watching {scanner.folder} for new files ({mode}). Press Ctrl+C to stop.[/blue]")
+    
+    def upload_ready(ready: List[Tuple[str, str, FileIdentity]]) -> None:
+        files = [(abs_path, rel_path) for abs_path, rel_path, _ in ready]
+        parquet_count = sum(1 for abs_path, _ in files if is_parquet_file(abs_path))
+        # Only as many preview processes as this batch needs; they exit with it
+        workers = min(preview_workers or os.cpu_count() or 1, max(1, parquet_count))
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=console,
+            transient=True,
+        ) as progress:
+            if optimize_parquet and parquet_count:
+                task = progress.add_task("Optimizing parquet...", total=None)
+                files, _ = optimize_parquet_files(files, staging, progress, task)
+            if faststart and any(is_mp4_file(abs_path) for abs_path, _ in files):
+                task = progress.add_task("Moving video indexes to the front...", total=None)
+                files, _ = faststart_mp4_files(files, staging, progress, task)
+            task = progress.add_task(f"Uploading {len(files)} new files...", total=None)
+            manifest = upload_folder(
+                str(scanner.folder),
+                dataset_id,
+                progress,
+                task,
+                max_workers=max_workers,
+                preview_workers=workers,
+                cache=cache,
+                files=files,
+                compression=compression,
+            )
+        
+        identities = {rel_path: identity for _, rel_path, identity in ready}
+        with manifest:
+            for entry in manifest:
+                unpublished[entry["path"]] = entry
+                scanner.mark_uploaded(entry["path"], identities.pop(entry["path"]))
+                totals["files"] += 1
+        
+        # Failed uploads (reported by upload_folder) are tried again later
+        for rel_path, identity in identities.items():
+            scanner.retry(rel_path, identity)
+        for abs_path, rel_path in files:
+            if rel_path in identities:
+                continue
+            if abs_path != str(scanner.folder / rel_path):
+                staged_copies[rel_path] = abs_path
+            else:
+                staged_copies.pop(rel_path, None)
+        
+        uploaded_count = len(files) - len(identities)
+        if uploaded_count:
+            size = sum(scanner.uploaded[rel_path][0] for _, rel_path in files if rel_path not in identities)
+            console.print(f"[green]Uploaded {uploaded_count} files ({format_size(size)})[/green]")
+    
+    def publish() -> None:
+        nonlocal last_publish
+        last_publish = time.monotonic()
+        
+        all_files = [
+            (staged_copies.get(rel_path, str(scanner.folder / rel_path)), rel_path)
+            for rel_path in scanner.uploaded
+        ]
+        total_size = sum(identity[0] for identity in scanner.uploaded.values())
+        aggregates = None
+        try:
+            if build_index:
+                index = build_dataset_index(all_files, cache=cache)
+                if index:
+                    upload_bytes(encode_index(index), f"datasets/{dataset_id}/{INDEX_KEY}")
+                    aggregates = dataset_aggregates(index)
+            if compute_stats:
+                stats = compute_feature_stats(all_files, cache=cache)
+                if stats:
+                    upload_bytes(encode_stats(stats), f"datasets/{dataset_id}/{STATS_KEY}")
+            client.upload_complete(dataset_id, list(unpublished.values()), total_size, aggregates, merge=True)
+        except APIError as e:
+            # Kept for the next publish
+            console.print(f"[yellow]Warning: Failed to publish {len(unpublished)} files, will retry: {e.message}[/yellow]")
+            return
+        except (CosServiceError, CosClientError, OSError) as e:
+            # Index or statistics upload failed (requests errors are OSErrors too)
+            console.print(f"[yellow]Warning: Failed to upload the index of {len(unpublished)} files, will retry: {e}[/yellow]")
+            return
+        
+        console.print(f"[green]Published {len(unpublished)} files to {dataset_id}[/green]")
+        unpublished.clear()
+        totals["publishes"] += 1
+    
+    try:
+        while not stop_event.is_set():
+            ready = scanner.poll()
+            if ready:
+                upload_ready(ready)
+            if unpublished and time.monotonic() - last_publish >= publish_interval:
+                publish()
+            # Files are only uploaded once settled, so there is no point in
+            # waking up on every filesystem event
+            stop_event.wait(poll_interval)
+    except KeyboardInterrupt:
+        console.print("\n[blue]Stopping watch...[/blue]")
+    finally:
+        scanner.close()
+        if unpublished:
+            publish()
+    
+    return totals
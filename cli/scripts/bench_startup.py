@@ -0,0 +1,113 @@
+"""Startup benchmark for the DataHub CLI.
+
+Imports datahub.cli in fresh interpreters with `python -X importtime`,
+reports the best cumulative import time and the slowest imports, and exits
+non-zero when the time exceeds the budget or a heavy dependency is imported
+at startup. datahub.cos is checked as well: every transfer command imports
+it, so it must not pull in pyarrow/numpy.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--budget-ms 150]
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import List, Optional, Tuple
+
+# Modules that must only be imported by the commands that need them
+HEAVY_MODULES = ["requests", "qcloud_cos", "pyarrow", "numpy", "rich.progress", "rich.table"]
+
+# Modules that must not be imported with datahub.cos (the COS SDK and
+# requests are its job)
+COS_HEAVY_MODULES = ["pyarrow", "numpy"]
+
+DEFAULT_BUDGET_MS = 150
+
+
+def measure_import(module: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple of (cumulative import time of the module in ms, direct imports
+        of the module with their cumulative time in ms, names of all modules
+        imported by it)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # "import time: self [us] | cumulative | imported package", in the
+    # order imports finish, so a module's imports are listed right before
+    # it with deeper indentation
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        entries.append((len(raw_name) - len(raw_name.lstrip()), name, int(cumulative) / 1000))
+
+    for index in range(len(entries) - 1, -1, -1):
+        depth, name, total = entries[index]
+        if name == module:
+            break
+    else:
+        return 0.0, [], []
+
+    children = []
+    imported = []
+    for child_depth, child_name, child_total in reversed(entries[:index]):
+        if child_depth <= depth:
+            break
+        imported.append(child_name)
+        if child_depth == depth + 2:
+            children.append((child_name, child_total))
+
+    return total, children, imported
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="datahub.cli", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters (best run is reported)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum cumulative import time")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show")
+    args = parser.parse_args(argv)
+
+    runs = [measure_import(args.module) for _ in range(args.runs)]
+    best, children, imported = min(runs, key=lambda run: run[0])
+
+    # No time budget: the COS SDK import dominates and is needed anyway
+    cos_ms, _, cos_imported = measure_import("datahub.cos")
+
+    print(f"{args.module}: {best:.1f} ms (best of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    for name, ms in sorted(children, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    print(f"datahub.cos: {cos_ms:.1f} ms")
+
+    failed = False
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    if heavy:
+        print(f"FAIL: imported at startup: {', '.join(heavy)}")
+        failed = True
+    cos_heavy = [m for m in COS_HEAVY_MODULES if m in cos_imported]
+    if cos_heavy:
+        print(f"FAIL: imported by datahub.cos: {', '.join(cos_heavy)}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: {best:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""Tests for the COS helpers."""
+
+import pytest
+
+from datahub.cos import format_size, parse_size
+
+MB = 1024 * 1024
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("100 B", 100),
+    ("1.50 KB", 1536),
+    ("20mb", 20 * MB),
+    (" 2 GB ", 2 * 1024 ** 3),
+    (42, 42),
+])
+def test_parse_size(text, expected):
+    assert parse_size(text) == expected
+
+
+@pytest.mark.parametrize("text", [None, "", "unknown", "1.2.3 MB", "5 XB"])
+def test_parse_size_of_other_text(text):
+    assert parse_size(text) is None
+
+
+@pytest.mark.parametrize("size", [0, 1023, 1536, 7 * MB + 12345, 3 * 1024 ** 4])
+def test_parse_size_reads_format_size(size):
+    assert parse_size(format_size(size)) == pytest.approx(size, rel=0.005, abs=1)
@@ -0,0 +1,185 @@
+"""Tests for endpoint ranking and failover against local HTTP servers."""
+
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+from datahub.endpoints import Endpoint, EndpointSelector
+
+
+class StandIn:
+    """Local HTTP server answering every request after a delay with a fixed status."""
+    
+    def __init__(self, delay: float = 0.0, status: int = 200):
+        self.delay = delay
+        self.status = status
+        # Requests other than probes (HEAD)
+        self.hits = 0
+        stand_in = self
+        
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, *args):
+                pass
+                
+            def _respond(self, body: bytes):
+                if self.command != "HEAD":
+                    stand_in.hits += 1
+                time.sleep(stand_in.delay)
+                self.send_response(stand_in.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+            
+            def do_HEAD(self):
+                self._respond(b"")
+            
+            def do_GET(self):
+                self._respond(self.path.encode("utf-8"))
+            
+            def do_PUT(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._respond(b"")
+        
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def endpoint(self, name: str, bucket: str = "bucket", writable: bool = True) -> Endpoint:
+        host, port = self.server.server_address
+        return Endpoint(name, bucket, "region", domain=f"{host}:{port}", scheme="http", writable=writable)
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_ins():
+    servers = []
+    
+    def make(delay: float = 0.0, status: int = 200) -> StandIn:
+        server = StandIn(delay, status)
+        servers.append(server)
+        return server
+    
+    yield make
+    for server in servers:
+        server.close()
+
+
+def get(endpoint: Endpoint, timeout: float = 5.0) -> bytes:
+    response = requests.get(endpoint.url("datasets/d/a.json"), timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def put(endpoint: Endpoint) -> int:
+    response = requests.put(endpoint.url("datasets/d/a.json"), data=b"x", timeout=5.0)
+    response.raise_for_status()
+    return response.status_code
+
+
+def test_ranked_orders_by_probed_latency(stand_ins):
+    slow, fast = stand_ins(delay=0.2), stand_ins(delay=0.0)
+    selector = EndpointSelector([slow.endpoint("slow"), fast.endpoint("fast")])
+    selector.probe()
+    
+    assert [endpoint.name for endpoint in selector.ranked()] == ["fast", "slow"]
+    assert get(selector.ranked()[0]) == b"/datasets/d/a.json"
+
+
+def test_ranked_large_transfers_prefer_throughput():
+    near = Endpoint("near", "bucket", "region")
+    wide = Endpoint("wide", "bucket", "region", endpoint="cos.accelerate.myqcloud.com")
+    selector = EndpointSelector([near, wide])
+    selector.record_success(near, 0.01, 0)
+    selector.record_success(wide, 0.05, 0)
+    selector.record_success(near, 10.01, 10 * 1024 * 1024)
+    selector.record_success(wide, 1.05, 10 * 1024 * 1024)
+    
+    assert selector.ranked(0) == [near, wide]
+    assert selector.ranked(100 * 1024 * 1024) == [wide, near]
+
+
+@pytest.mark.parametrize("status", [500, 503, 429])
+def test_run_fails_over_on_server_errors(stand_ins, status):
+    failing, healthy = stand_ins(status=status), stand_ins(delay=0.05)
+    selector = EndpointSelector([failing.endpoint("failing"), healthy.endpoint("healthy")])
+    selector.probe()
+    
+    # Both answer probes, and the failing one answers them faster
+    assert selector.ranked()[0].name == "failing"
+    assert selector.run(get) == b"/datasets/d/a.json"
+    assert failing.hits == 1 and healthy.hits == 1
+    
+    # The failing endpoint is skipped until its backoff ends
+    assert [endpoint.name for endpoint in selector.ranked()] == ["healthy", "failing"]
+    selector.run(get)
+    assert failing.hits == 1
+
+
+def test_run_fails_over_on_timeouts(stand_ins):
+    hanging, healthy = stand_ins(delay=1.0), stand_ins(delay=0.0)
+    primary, secondary = hanging.endpoint("hanging"), healthy.endpoint("healthy")
+    selector = EndpointSelector([primary, secondary])
+    # Unprobed endpoints keep their configured order
+    selector._last_probe = time.monotonic()
+    
+    assert selector.run(lambda endpoint: get(endpoint, timeout=0.2)) == b"/datasets/d/a.json"
+    assert primary.failures == 1 and primary.down_until > time.monotonic()
+    assert secondary.failures == 0
+
+
+def test_run_raises_client_errors_without_failover(stand_ins):
+    missing, healthy = stand_ins(status=404), stand_ins(delay=0.05)
+    selector = EndpointSelector([missing.endpoint("missing"), healthy.endpoint("healthy")])
+    selector.probe()
+    
+    with pytest.raises(requests.HTTPError):
+        selector.run(get)
+    assert healthy.hits == 0
+
+
+def test_run_falls_through_mirror_404(stand_ins):
+    primary_server, mirror_server = stand_ins(delay=0.05), stand_ins(status=404)
+    primary = primary_server.endpoint("region")
+    mirror = mirror_server.endpoint("mirror@region", bucket="mirror", writable=False)
+    selector = EndpointSelector([primary, mirror])
+    selector.probe()
+    
+    assert selector.ranked()[0] is mirror
+    assert selector.run(get) == b"/datasets/d/a.json"
+    # An object not replicated yet does not mark the mirror as down
+    assert mirror.failures == 0 and mirror.down_until == 0.0
+    assert mirror_server.hits == 1 and primary_server.hits == 1
+
+
+def test_writes_skip_read_only_mirrors(stand_ins):
+    primary_server, mirror_server = stand_ins(delay=0.05), stand_ins(delay=0.0)
+    primary = primary_server.endpoint("region")
+    mirror = mirror_server.endpoint("mirror@region", bucket="mirror", writable=False)
+    selector = EndpointSelector([primary, mirror])
+    selector.probe()
+    
+    assert selector.ranked() == [mirror, primary]
+    assert selector.ranked(write=True) == [primary]
+    assert selector.run(put, write=True) == 200
+    assert mirror_server.hits == 0
+
+
+def test_writes_without_writable_endpoint_fail(stand_ins):
+    mirror_server = stand_ins()
+    primary = Endpoint("region", "bucket", "region")
+    primary.writable = False
+    mirror = mirror_server.endpoint("mirror@region", bucket="mirror", writable=False)
+    selector = EndpointSelector([primary, mirror])
+    selector._last_probe = time.monotonic()
+    
+    with pytest.raises(ValueError):
+        selector.run(put, write=True)
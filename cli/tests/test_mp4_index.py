@@ -0,0 +1,99 @@
+"""Tests for moving the movie box of MP4 files to the front."""
+
+import struct
+
+import pytest
+
+from datahub.mp4_index import faststart_mp4_file
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def offsets_box(offsets, co64: bool) -> bytes:
+    box_type, code = (b"co64", ">Q") if co64 else (b"stco", ">I")
+    table = b"".join(struct.pack(code, offset) for offset in offsets)
+    return box(box_type, struct.pack(">II", 0, len(offsets)) + table)
+
+
+def movie_box(offsets, co64: bool = False) -> bytes:
+    stbl = box(b"stbl", box(b"stsz", struct.pack(">III", 0, 8, len(offsets))) + offsets_box(offsets, co64))
+    trak = box(b"trak", box(b"mdia", box(b"minf", stbl)))
+    return box(b"moov", box(b"mvhd", b"\0" * 100) + trak + box(b"udta", b"\0" * 10))
+
+
+def chunk(n: int) -> bytes:
+    return b"CHUNK%03d" % n
+
+
+def write_mp4(path, co64: bool = False) -> list:
+    """
+    Write ftyp, mdat, moov, mdat: chunks 0-2 before the movie box and
+    chunks 3-4 after it.
+    
+    Returns:
+        The chunk markers, in chunk offset order
+    """
+    ftyp = box(b"ftyp", b"isom\0\0\2\0isomavc1")
+    first = box(b"mdat", chunk(0) + chunk(1) + b"pad" + chunk(2))
+    first_offsets = [len(ftyp) + 8, len(ftyp) + 16, len(ftyp) + 27]
+    # Both movie boxes have the same size, so the offsets of the second
+    # mdat can be computed before the table is filled in
+    moov_size = len(movie_box([0] * 5, co64))
+    second_start = len(ftyp) + len(first) + moov_size
+    second = box(b"mdat", chunk(3) + chunk(4))
+    offsets = first_offsets + [second_start + 8, second_start + 16]
+    with open(path, "wb") as f:
+        f.write(ftyp + first + movie_box(offsets, co64) + second)
+    return [chunk(n) for n in range(5)]
+
+
+def top_level(data: bytes) -> list:
+    boxes, position = [], 0
+    while position < len(data):
+        size, box_type = struct.unpack_from(">I4s", data, position)
+        boxes.append((box_type, position, size))
+        position += size
+    return boxes
+
+
+def chunk_offsets(data: bytes) -> tuple:
+    """Find the chunk offset table of the single track."""
+    (moov_offset, moov_size), = [
+        (offset, size) for box_type, offset, size in top_level(data) if box_type == b"moov"
+    ]
+    for box_type, width, code in ((b"stco", 4, ">I"), (b"co64", 8, ">Q")):
+        index = data.find(box_type, moov_offset, moov_offset + moov_size)
+        if index >= 0:
+            count, = struct.unpack_from(">I", data, index + 8)
+            return box_type, [struct.unpack_from(code, data, index + 12 + width * i)[0] for i in range(count)]
+    raise AssertionError("no chunk offset table")
+
+
+@pytest.mark.parametrize("co64", [False, True])
+def test_faststart_relocates_chunk_offsets(tmp_path, co64):
+    src, dst = tmp_path / "in.mp4", tmp_path / "out.mp4"
+    markers = write_mp4(src, co64)
+    before = src.read_bytes()
+    
+    report = faststart_mp4_file(str(src), str(dst))
+    after = dst.read_bytes()
+    
+    boxes = top_level(after)
+    assert [box_type for box_type, _, _ in boxes] == [b"ftyp", b"moov", b"mdat", b"mdat"]
+    assert report == {"moovSize": boxes[1][2], "sizeBefore": len(before), "sizeAfter": len(before)}
+    assert len(after) == len(before)
+    table, offsets = chunk_offsets(after)
+    assert table == (b"co64" if co64 else b"stco")
+    assert [after[offset:offset + 8] for offset in offsets] == markers
+    # The source is left as it was
+    assert src.read_bytes() == before
+
+
+def test_faststart_skips_files_with_moov_first(tmp_path):
+    src, dst, again = tmp_path / "in.mp4", tmp_path / "out.mp4", tmp_path / "again.mp4"
+    write_mp4(src)
+    assert faststart_mp4_file(str(src), str(dst)) is not None
+    assert faststart_mp4_file(str(dst), str(again)) is None
+    assert not again.exists()
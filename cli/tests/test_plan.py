@@ -0,0 +1,51 @@
+"""Tests for transfer planning."""
+
+import pytest
+
+from datahub.plan import _fit
+
+MB = 1024 * 1024
+
+
+def make_run(files: int, workers: int, nbytes: int, per_file: float, bandwidth: float) -> dict:
+    seconds = files / workers * per_file + nbytes / bandwidth
+    return {"files": files, "workers": workers, "bytes": nbytes, "seconds": seconds}
+
+
+def test_fit_recovers_per_file_time_and_bandwidth():
+    runs = [
+        make_run(files, workers, nbytes, 0.2, 50 * MB)
+        for files, workers, nbytes in ((1000, 8, 100 * MB), (10, 4, 2000 * MB), (400, 16, 700 * MB))
+    ]
+    per_file, bandwidth = _fit(runs)
+    assert per_file == pytest.approx(0.2)
+    assert bandwidth == pytest.approx(50 * MB)
+
+
+def test_fit_of_alike_runs_is_all_bandwidth():
+    runs = [make_run(100, 4, 100 * MB, 0.1, 10 * MB), make_run(200, 4, 200 * MB, 0.1, 10 * MB)]
+    per_file, bandwidth = _fit(runs)
+    assert per_file == 0.0
+    assert bandwidth == pytest.approx(sum(run["bytes"] for run in runs) / sum(run["seconds"] for run in runs))
+
+
+def test_fit_of_single_run():
+    run = make_run(10, 2, 40 * MB, 0.5, 20 * MB)
+    assert _fit([run]) == (0.0, pytest.approx(40 * MB / run["seconds"]))
+
+
+def test_fit_ignores_empty_runs():
+    assert _fit([]) is None
+    assert _fit([{"files": 3, "workers": 1, "bytes": 0, "seconds": 2.0}]) is None
+    assert _fit([{"files": 3, "workers": 1, "bytes": 10, "seconds": 0}]) is None
+
+
+def test_fit_never_returns_negative_per_file_time():
+    # Noisy runs where more files took less time
+    runs = [
+        {"files": 10, "workers": 1, "bytes": 100 * MB, "seconds": 12.0},
+        {"files": 1000, "workers": 1, "bytes": 110 * MB, "seconds": 10.0},
+    ]
+    per_file, bandwidth = _fit(runs)
+    assert per_file >= 0 and bandwidth > 0
+
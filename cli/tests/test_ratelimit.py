@@ -0,0 +1,90 @@
+"""Tests for the host-wide rate limiter."""
+
+import time
+
+import pytest
+
+from datahub.ratelimit import BURST_SECONDS, BYTES_QUANTUM, HostRateLimiter
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    limiter = HostRateLimiter(path=str(tmp_path / "ratelimit.state"))
+    yield limiter
+    limiter.close()
+
+
+def read_state(limiter: HostRateLimiter) -> list:
+    with limiter._state() as state:
+        return list(state)
+
+
+def elapsed(fn, *args, **kwargs) -> float:
+    started = time.monotonic()
+    fn(*args, **kwargs)
+    return time.monotonic() - started
+
+
+def test_large_transfer_goes_into_debt(limiter):
+    limiter.set_limits(8 * MB, 0)
+    # Larger than the burst, but let through while the bucket has tokens
+    assert elapsed(limiter.acquire, 12 * MB) < 0.2
+    assert read_state(limiter)[0] < -3 * MB
+    
+    # The next transfer waits until the debt is refilled
+    waited = elapsed(limiter.acquire, BYTES_QUANTUM)
+    assert 0.35 < waited < 1.0
+
+
+def test_small_reads_use_the_rest_of_a_quantum(limiter):
+    limiter.set_limits(8 * MB, 0)
+    tokens = read_state(limiter)[0]
+    limiter.acquire(1000)
+    after_first = read_state(limiter)[0]
+    assert tokens - after_first == pytest.approx(BYTES_QUANTUM, abs=0.01 * MB)
+    
+    # Served from the credit of the first quantum, without touching the buckets
+    for _ in range(10):
+        limiter.acquire(1000)
+    assert limiter._credit == BYTES_QUANTUM - 11 * 1000
+    assert read_state(limiter)[0] >= after_first
+
+
+def test_request_debt(limiter):
+    limiter.set_limits(0, 20)
+    assert elapsed(limiter.acquire, requests=30) < 0.2
+    # 10 requests of debt, refilled at 20 per second
+    waited = elapsed(limiter.acquire, requests=1)
+    assert 0.35 < waited < 1.0
+
+
+def test_state_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "ratelimit.state")
+    first, second = HostRateLimiter(4 * MB, 0, path), HostRateLimiter(4 * MB, 0, path)
+    try:
+        first.acquire(6 * MB)
+        # The other limiter sees the debt left by the first one
+        assert 0.35 < elapsed(second.acquire, BYTES_QUANTUM) < 1.0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_unlimited_never_waits(limiter):
+    assert elapsed(limiter.acquire, 100 * MB, 1000) < 0.05
+    assert limiter._credit == 0
+
+
+def test_debt_is_refilled_up_to_the_burst(limiter):
+    limiter.set_limits(8 * MB, 0)
+    limiter.acquire(12 * MB)
+    time.sleep(0.25)
+    state = read_state(limiter)
+    # 2 MB of the 4 MB debt refilled
+    limiter._refill(state, time.time(), 8 * MB, 0)
+    assert -2.5 * MB < state[0] < -0.5 * MB
+    
+    limiter._refill(state, time.time() + 10, 8 * MB, 0)
+    assert state[0] == pytest.approx(8 * MB * BURST_SECONDS)
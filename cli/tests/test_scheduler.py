@@ -0,0 +1,65 @@
+"""Tests for the shared transfer scheduler."""
+
+import threading
+
+from datahub.scheduler import TransferScheduler
+
+
+def hold_worker(scheduler: TransferScheduler) -> threading.Event:
+    """Block the only worker until the returned event is set."""
+    running, release = threading.Event(), threading.Event()
+    
+    def wait():
+        running.set()
+        release.wait()
+    
+    scheduler.submit("hold", wait)
+    assert running.wait(timeout=5)
+    return release
+
+
+def test_groups_take_turns():
+    started = []
+    with TransferScheduler(max_workers=1) as scheduler:
+        release = hold_worker(scheduler)
+        futures = [
+            scheduler.submit(group, started.append, f"{group}{n}")
+            for group, count in (("a", 3), ("b", 1), ("c", 2))
+            for n in range(1, count + 1)
+        ]
+        assert scheduler.pending() == 6 and scheduler.pending("a") == 3
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+    
+    assert started == ["a1", "b1", "c1", "a2", "c2", "a3"]
+
+
+def test_groups_rejoin_in_arrival_order():
+    started = []
+    with TransferScheduler(max_workers=1) as scheduler:
+        release = hold_worker(scheduler)
+        futures = [scheduler.submit("a", started.append, "a1"), scheduler.submit("b", started.append, "b1")]
+        release.set()
+        futures[-1].result(timeout=5)
+        # Both groups ran out of jobs, so they take turns in the order they return
+        release = hold_worker(scheduler)
+        futures += [
+            scheduler.submit(group, started.append, f"{group}{n}")
+            for group, n in (("b", 2), ("a", 2), ("b", 3))
+        ]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+    
+    assert started == ["a1", "b1", "b2", "a2", "b3"]
+
+
+def test_errors_are_set_on_futures():
+    def fail():
+        raise RuntimeError("transfer failed")
+    
+    with TransferScheduler(max_workers=2) as scheduler:
+        future = scheduler.submit("a", fail)
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+        assert scheduler.submit("a", lambda: 42).result(timeout=5) == 42
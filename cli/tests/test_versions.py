@@ -0,0 +1,49 @@
+"""Tests for content-defined chunking."""
+
+import io
+import random
+
+import pytest
+
+from datahub.versions import MAX_CHUNK_BYTES, MIN_CHUNK_BYTES, iter_chunks
+
+
+def random_bytes(size: int, seed: int = 0) -> bytes:
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little")
+
+
+def chunk_sizes(data: bytes, block_size: int) -> list:
+    chunks = list(iter_chunks(io.BytesIO(data), block_size))
+    assert b"".join(chunks) == data
+    return [len(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("block_size", [4099, 64 * 1024 + 1, 1024 * 1024 + 3, 16 * 1024 * 1024])
+def test_boundaries_do_not_depend_on_read_block_size(block_size):
+    data = random_bytes(12 * 1024 * 1024)
+    assert chunk_sizes(data, block_size) == chunk_sizes(data, 4 * 1024 * 1024)
+
+
+def test_chunk_sizes_are_bounded():
+    sizes = chunk_sizes(random_bytes(12 * 1024 * 1024, seed=1), 4 * 1024 * 1024)
+    assert len(sizes) > 2
+    assert all(MIN_CHUNK_BYTES <= size <= MAX_CHUNK_BYTES for size in sizes[:-1])
+    assert 0 < sizes[-1] <= MAX_CHUNK_BYTES
+
+
+def test_chunks_never_end_before_min_size():
+    # Every window of uniform data is a boundary
+    sizes = chunk_sizes(b"\0" * (MAX_CHUNK_BYTES * 2 + 100), 1024 * 1024 + 3)
+    assert sizes == [MIN_CHUNK_BYTES] * (MAX_CHUNK_BYTES * 2 // MIN_CHUNK_BYTES) + [100]
+
+
+def test_insertion_only_changes_nearby_chunks():
+    data = random_bytes(12 * 1024 * 1024, seed=2)
+    edited = data[:5 * 1024 * 1024] + b"inserted" + data[5 * 1024 * 1024:]
+    before = set(iter_chunks(io.BytesIO(data)))
+    after = list(iter_chunks(io.BytesIO(edited)))
+    assert sum(1 for chunk in after if chunk not in before) <= 2
+
+
+def test_empty_stream_has_no_chunks():
+    assert list(iter_chunks(io.BytesIO(b""))) == []
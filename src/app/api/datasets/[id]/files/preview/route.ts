@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import { getFileContentWithLimit, getPublicUrl, getSignedDownloadUrl, getFileType } from "@/lib/oss";
 import { sql } from "@/db";
+import { toRowPreview } from "@/lib/parquet-preview";
 
 /**
  * GET /api/datasets/[id]/files/preview?path=...
@@ -8,7 +9,7 @@ import { sql } from "@/db";
  * Fetches file content for preview. Supports:
  * - JSON files: Returns parsed JSON content
  * - Markdown files: Returns raw markdown content
- * - MP4 files: Returns signed video URL
+ * - MP4 files: Returns signed video URL and the container index if uploaded with one
  * - Parquet files: Returns preview data from database if available
  */
 export async function GET(
@@ -59,17 +60,21 @@ export async function GET(
 
       case "mp4": {
         // Generate a signed URL for video playback
-        const videoUrl = await getSignedDownloadUrl(cosKey, 3600); // 1 hour expiry
+        const [videoUrl, rows] = await Promise.all([
+          getSignedDownloadUrl(cosKey, 3600), // 1 hour expiry
+          sql`SELECT video_info FROM dataset_files WHERE dataset_id = ${id} AND path = ${filePath}`,
+        ]);
         return NextResponse.json({
           type: "mp4",
           videoUrl,
+          videoInfo: rows[0]?.video_info || undefined,
         });
       }
 
       case "parquet": {
         // Try to get preview data from database
         const rows = await sql`
-          SELECT preview_data 
+          SELECT preview_data, summary
           FROM dataset_files 
           WHERE dataset_id = ${id} AND path = ${filePath}
         `;
@@ -77,7 +82,8 @@ export async function GET(
         if (rows.length > 0 && rows[0].preview_data) {
           return NextResponse.json({
             type: "parquet",
-            parquetPreview: rows[0].preview_data,
+            parquetPreview: toRowPreview(rows[0].preview_data),
+            parquetSummary: rows[0].summary || undefined,
           });
         }
         
@@ -1,5 +1,14 @@
 import { NextRequest, NextResponse } from "next/server";
-import { getFileTree } from "@/db/datasets";
+import { isAuthenticated } from "@/lib/auth";
+import { getFileTree, updateFileMetadata } from "@/db/datasets";
+import { readJsonBody } from "@/lib/request";
+import { ColumnarParquetPreview, ParquetPreview, ParquetSummary } from "@/types/dataset";
+
+interface FileMetadataUpdate {
+  path: string;
+  previewData?: ParquetPreview | ColumnarParquetPreview;
+  summary?: ParquetSummary;
+}
 
 /**
  * GET /api/datasets/[id]/files
@@ -34,3 +43,41 @@ export async function GET(
     );
   }
 }
+
+/**
+ * PATCH /api/datasets/[id]/files
+ * 
+ * Body: { files: [{ path, previewData?, summary? }] } (optionally gzip-encoded)
+ * 
+ * Sets preview data and footer summaries of existing files, e.g. when the
+ * CLI backfills previews for datasets uploaded by older versions.
+ */
+export async function PATCH(
+  request: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  const authenticated = await isAuthenticated();
+  if (!authenticated) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const { id } = await params;
+
+  try {
+    const body = await readJsonBody<{ files?: FileMetadataUpdate[] }>(request);
+    const files = Array.isArray(body.files) ? body.files.filter((f) => typeof f.path === "string") : [];
+
+    if (files.length === 0) {
+      return NextResponse.json({ error: "No files provided" }, { status: 400 });
+    }
+
+    const updated = await updateFileMetadata(id, files);
+    return NextResponse.json({ updated });
+  } catch (error) {
+    console.error("Failed to update file metadata:", error);
+    return NextResponse.json(
+      { error: "Failed to update file metadata" },
+      { status: 500 }
+    );
+  }
+}
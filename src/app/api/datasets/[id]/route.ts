@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import { isAuthenticated } from "@/lib/auth";
 import { getDatasetById, updateDataset, deleteDataset } from "@/db/datasets";
+import { jsonWithETag } from "@/lib/request";
 
 export async function GET(
   request: NextRequest,
@@ -15,7 +16,7 @@ export async function GET(
       return NextResponse.json({ error: "Dataset not found" }, { status: 404 });
     }
 
-    return NextResponse.json(dataset);
+    return jsonWithETag(request, dataset);
   } catch (error) {
     console.error("Failed to fetch dataset:", error);
     return NextResponse.json(
@@ -1,9 +1,85 @@
 import { NextRequest, NextResponse } from "next/server";
 import { isAuthenticated } from "@/lib/auth";
-import { getDatasetById, updateDataset } from "@/db/datasets";
+import { getDatasetById, updateDataset, upsertDatasetFiles } from "@/db/datasets";
+import { getUploadSession, stageUploadChunk, getStagedChunks, finalizeUploadSession } from "@/db/uploads";
 import { formatFileSize, getFileType } from "@/lib/oss";
-import { DatasetFile } from "@/types/dataset";
+import { readJsonBody } from "@/lib/request";
+import { ColumnarParquetPreview, DatasetFile, ParquetPreview, ParquetSummary, VideoInfo } from "@/types/dataset";
 
+interface UploadedFile {
+  name: string;
+  path: string;
+  size: number;
+  url: string;
+  previewData?: ParquetPreview | ColumnarParquetPreview;
+  summary?: ParquetSummary;
+  videoInfo?: VideoInfo;
+}
+
+interface UploadCompleteBody {
+  // Single-request upload (older CLI versions)
+  files?: UploadedFile[];
+  totalSize?: number;
+  // Chunked upload: chunks are staged under uploadId, then finalized
+  uploadId?: string;
+  chunkIndex?: number;
+  finalize?: boolean;
+  totalChunks?: number;
+  // Add the files to the dataset (replacing same paths) instead of
+  // replacing its whole file list; used for incremental uploads
+  merge?: boolean;
+  // Aggregates derived from parquet metadata by the CLI
+  totalEpisodes?: number;
+  totalFrames?: number;
+  fps?: number;
+}
+
+// Process uploaded file info from CLI
+function toDatasetFile(file: UploadedFile): DatasetFile {
+  return {
+    name: file.name,
+    path: file.path,
+    type: getFileType(file.name),
+    size: formatFileSize(file.size),
+    ossUrl: file.url,
+    videoUrl: file.name.endsWith(".mp4") ? file.url : undefined,
+    previewData: file.previewData || undefined,
+    summary: file.summary || undefined,
+    videoInfo: file.videoInfo || undefined,
+  };
+}
+
+async function completeUpload(id: string, files: UploadedFile[], body: UploadCompleteBody) {
+  if (body.merge) {
+    await upsertDatasetFiles(id, files.map(toDatasetFile));
+  }
+
+  // Update dataset with files, size, and the episode aggregates the CLI
+  // derived from parquet metadata (left unchanged when not provided)
+  return updateDataset(id, {
+    files: body.merge ? undefined : files.map(toDatasetFile),
+    size: body.merge && typeof body.totalSize !== "number" ? undefined : formatFileSize(body.totalSize || 0),
+    totalEpisodes: typeof body.totalEpisodes === "number" ? body.totalEpisodes : undefined,
+    totalFrames: typeof body.totalFrames === "number" ? body.totalFrames : undefined,
+    fps: typeof body.fps === "number" ? body.fps : undefined,
+    updatedAt: new Date().toISOString().split("T")[0],
+  });
+}
+
+/**
+ * POST /api/datasets/[id]/upload-complete
+ *
+ * Accepts either a single request with the full `files` array, or a chunked
+ * manifest (optionally gzip-compressed):
+ * - `{ uploadId, chunkIndex, files }` stages one chunk (idempotent per index)
+ * - `{ uploadId, finalize: true, totalChunks, totalSize, ... }` replaces the
+ *   dataset files with all staged chunks (idempotent once finalized)
+ *
+ * With `merge: true` the files are added to the dataset instead, replacing
+ * files with the same path and keeping the rest; `totalSize` is then the
+ * size of the whole dataset, and leaves the size unchanged when omitted
+ * (partial manifests published while an upload is still running).
+ */
 export async function POST(
   request: NextRequest,
   { params }: { params: Promise<{ id: string }> }
@@ -22,43 +98,68 @@ export async function POST(
       return NextResponse.json({ error: "Dataset not found" }, { status: 404 });
     }
 
-    const { files, totalSize } = await request.json();
+    const body = await readJsonBody<UploadCompleteBody>(request);
 
-    if (!files || !Array.isArray(files)) {
+    if (body.uploadId) {
+      const session = await getUploadSession(body.uploadId);
+      if (session && session.datasetId !== id) {
+        return NextResponse.json(
+          { error: "Upload ID belongs to another dataset" },
+          { status: 409 }
+        );
+      }
+
+      if (!body.finalize) {
+        if (typeof body.chunkIndex !== "number" || !Array.isArray(body.files)) {
+          return NextResponse.json(
+            { error: "chunkIndex and files array are required" },
+            { status: 400 }
+          );
+        }
+        if (session?.finalizedAt) {
+          return NextResponse.json({ error: "Upload already finalized" }, { status: 409 });
+        }
+
+        await stageUploadChunk(body.uploadId, id, body.chunkIndex, body.files);
+        return NextResponse.json({ uploadId: body.uploadId, chunkIndex: body.chunkIndex });
+      }
+
+      // Finalizing twice returns the dataset as it is
+      if (session?.finalizedAt) {
+        return NextResponse.json(dataset);
+      }
+
+      const chunks = await getStagedChunks(body.uploadId);
+      const totalChunks = body.totalChunks ?? chunks.length;
+      const received = new Set(chunks.map((chunk) => chunk.chunkIndex));
+      const missing: number[] = [];
+      for (let i = 0; i < totalChunks; i++) {
+        if (!received.has(i)) missing.push(i);
+      }
+      if (missing.length > 0) {
+        return NextResponse.json(
+          { error: `Missing manifest chunks: ${missing.join(", ")}`, missing },
+          { status: 409 }
+        );
+      }
+
+      const files = chunks
+        .filter((chunk) => chunk.chunkIndex < totalChunks)
+        .flatMap((chunk) => chunk.files as UploadedFile[]);
+      const updated = await completeUpload(id, files, body);
+      await finalizeUploadSession(body.uploadId, id);
+
+      return NextResponse.json(updated);
+    }
+
+    if (!body.files || !Array.isArray(body.files)) {
       return NextResponse.json(
         { error: "Files array is required" },
         { status: 400 }
       );
     }
 
-    // Process uploaded files info from CLI
-    const datasetFiles: DatasetFile[] = files.map((file: {
-      name: string;
-      path: string;
-      size: number;
-      url: string;
-      previewData?: {
-        columns: string[];
-        rows: Record<string, unknown>[];
-        totalRows: number;
-      };
-    }) => ({
-      name: file.name,
-      path: file.path,
-      type: getFileType(file.name),
-      size: formatFileSize(file.size),
-      ossUrl: file.url,
-      videoUrl: file.name.endsWith(".mp4") ? file.url : undefined,
-      previewData: file.previewData || undefined,
-    }));
-
-    // Update dataset with files and size
-    const updated = await updateDataset(id, {
-      files: datasetFiles,
-      size: formatFileSize(totalSize),
-      updatedAt: new Date().toISOString().split("T")[0],
-    });
-
+    const updated = await completeUpload(id, body.files, body);
     return NextResponse.json(updated);
   } catch (error) {
     console.error("Failed to complete upload:", error);
@@ -1,11 +1,47 @@
 import { NextRequest, NextResponse } from "next/server";
 import { isAuthenticated } from "@/lib/auth";
-import { getAllDatasets, createDataset } from "@/db/datasets";
+import { listDatasets, createDataset } from "@/db/datasets";
+import { jsonWithETag } from "@/lib/request";
+import { Dataset } from "@/types/dataset";
+
+const MAX_PAGE_SIZE = 200;
+
+/**
+ * GET /api/datasets
+ * 
+ * Query parameters (all optional):
+ * - author, robotType, taskType, format: Exact-match filters
+ * - updatedSince: Only datasets updated on or after this date (YYYY-MM-DD)
+ * - fields: Comma-separated fields to return (id is always included)
+ * - limit: Page size (max 200); enables pagination
+ * - cursor: nextCursor from the previous page; enables pagination
+ * 
+ * Without limit/cursor, returns an array of all matching datasets. With
+ * them, returns { items, hasMore, nextCursor }.
+ */
+export async function GET(request: NextRequest) {
+  const searchParams = request.nextUrl.searchParams;
+  const paginated = searchParams.has("limit") || searchParams.has("cursor");
+  const format = searchParams.get("format");
+  const fields = searchParams.get("fields");
+  const updatedSince = searchParams.get("updatedSince");
 
-export async function GET() {
   try {
-    const datasets = await getAllDatasets();
-    return NextResponse.json(datasets);
+    const result = await listDatasets({
+      author: searchParams.get("author") || undefined,
+      robotType: searchParams.get("robotType") || undefined,
+      taskType: searchParams.get("taskType") || undefined,
+      format: format === "lerobot" || format === "corobot" ? format : undefined,
+      updatedSince: /^\d{4}-\d{2}-\d{2}$/.test(updatedSince || "") ? updatedSince! : undefined,
+      fields: fields
+        ? (fields.split(",").map((f) => f.trim()).filter(Boolean) as (keyof Dataset)[])
+        : undefined,
+      cursor: searchParams.get("cursor") || undefined,
+      limit: paginated
+        ? Math.min(Math.max(parseInt(searchParams.get("limit") || "50", 10) || 50, 1), MAX_PAGE_SIZE)
+        : undefined,
+    });
+    return jsonWithETag(request, paginated ? result : result.items);
   } catch (error) {
     console.error("Failed to fetch datasets:", error);
     return NextResponse.json(
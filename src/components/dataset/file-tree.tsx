@@ -26,8 +26,8 @@ import {
   FileCode,
   AlertCircle,
 } from "lucide-react";
-import { FileTreeItem, FileTreeResponse, DatasetFile, ParquetPreview, JsonPreview, FilePreviewResponse, FileType } from "@/types/dataset";
-import { cn } from "@/lib/utils";
+import { FileTreeItem, FileTreeResponse, DatasetFile, ParquetPreview, ParquetSummary, JsonPreview, FilePreviewResponse, FileType, VideoInfo } from "@/types/dataset";
+import { cn, formatFileSize } from "@/lib/utils";
 import ReactMarkdown from "react-markdown";
 import remarkGfm from "remark-gfm";
 
@@ -127,6 +127,53 @@ function ParquetPreviewContent({ preview }: { preview: ParquetPreview }) {
   );
 }
 
+function ParquetSummaryContent({ summary }: { summary: ParquetSummary }) {
+  return (
+    <div className="space-y-4">
+      <div className="flex items-center justify-between text-sm text-muted-foreground">
+        <span>{summary.numRowGroups} row groups</span>
+        <span>
+          {formatFileSize(summary.compressedSize)} compressed / {formatFileSize(summary.uncompressedSize)} uncompressed
+        </span>
+      </div>
+      <div className="rounded-lg border overflow-x-auto">
+        <table className="w-full text-sm">
+          <thead className="bg-muted/50 sticky top-0">
+            <tr>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Column</th>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Type</th>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Min</th>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Max</th>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Nulls</th>
+              <th className="px-4 py-3 text-left font-medium whitespace-nowrap">Size</th>
+            </tr>
+          </thead>
+          <tbody>
+            {summary.columns.map((col) => (
+              <tr key={col.name} className="border-t">
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap">{col.name}</td>
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap">{col.physicalType}</td>
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap max-w-48 truncate">
+                  {formatCellValue(col.min)}
+                </td>
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap max-w-48 truncate">
+                  {formatCellValue(col.max)}
+                </td>
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap">
+                  {formatCellValue(col.nullCount)}
+                </td>
+                <td className="px-4 py-2 font-mono text-xs whitespace-nowrap">
+                  {formatFileSize(col.compressedSize)}
+                </td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      </div>
+    </div>
+  );
+}
+
 function JsonPreviewContent({ content, truncated }: { content: string; truncated?: boolean }) {
   return (
     <div className="space-y-4">
@@ -217,7 +264,17 @@ function MarkdownPreviewContent({ content, truncated }: { content: string; trunc
   );
 }
 
-function VideoPreviewContent({ videoUrl }: { videoUrl: string }) {
+function VideoPreviewContent({ videoUrl, info }: { videoUrl: string; info?: VideoInfo }) {
+  const details = info
+    ? [
+        info.width && info.height ? `${info.width}×${info.height}` : null,
+        info.fps ? `${info.fps} fps` : null,
+        info.codec || null,
+        info.duration != null ? `${info.duration.toFixed(1)} s` : null,
+        info.keyframeCount != null ? `${info.keyframeCount} keyframes` : null,
+      ].filter(Boolean)
+    : [];
+
   return (
     <div className="space-y-4">
       <video
@@ -228,6 +285,15 @@ function VideoPreviewContent({ videoUrl }: { videoUrl: string }) {
         <source src={videoUrl} type="video/mp4" />
         Your browser does not support the video tag.
       </video>
+      {details.length > 0 && (
+        <div className="text-sm text-muted-foreground">{details.join(" · ")}</div>
+      )}
+      {info && !info.faststart && (
+        <div className="text-sm text-muted-foreground">
+          The video index is stored at the end of the file, so playback starts only after it has been fetched.
+          Upload with <code>datahub upload --faststart</code> to move it to the front.
+        </div>
+      )}
     </div>
   );
 }
@@ -331,11 +397,14 @@ function FilePreviewDialog({ item, datasetId, isOpen, onClose }: FilePreviewDial
                 <MarkdownPreviewContent content={preview.content} truncated={preview.truncated} />
               )}
               {preview.type === "mp4" && preview.videoUrl && (
-                <VideoPreviewContent videoUrl={preview.videoUrl} />
+                <VideoPreviewContent videoUrl={preview.videoUrl} info={preview.videoInfo} />
               )}
               {preview.type === "parquet" && preview.parquetPreview && (
                 <ParquetPreviewContent preview={preview.parquetPreview} />
               )}
+              {preview.type === "parquet" && preview.parquetSummary && (
+                <ParquetSummaryContent summary={preview.parquetSummary} />
+              )}
               {preview.type === "parquet" && !preview.parquetPreview && preview.error && (
                 <PreviewError message={preview.error} />
               )}
@@ -1,5 +1,5 @@
 import { sql } from "./index";
-import { Dataset, ObservationType, EpisodePreview, ActionSpace, DatasetFile, FileTreeItem, FileTreeResponse, FileType } from "@/types/dataset";
+import { Dataset, DatasetListOptions, DatasetListResponse, ObservationType, EpisodePreview, ActionSpace, DatasetFile, FileTreeItem, FileTreeResponse, FileType } from "@/types/dataset";
 
 // Helper to detect file type from filename
 function detectFileType(filename: string): FileType {
@@ -64,6 +64,8 @@ interface DbDatasetFile {
   type: string;
   size: string | null;
   preview_data: unknown | null;
+  summary: unknown | null;
+  video_info: unknown | null;
   video_url: string | null;
   oss_url: string | null;
 }
@@ -77,7 +79,7 @@ async function getDatasetRelations(datasetId: string) {
   const [observationTypes, episodes, files] = await Promise.all([
     sql`SELECT name, type, shape, description FROM observation_types WHERE dataset_id = ${datasetId}`,
     sql`SELECT episode_id, length, success, reward, task FROM episode_previews WHERE dataset_id = ${datasetId} ORDER BY episode_id LIMIT 10`,
-    sql`SELECT name, path, type, size, preview_data, video_url, oss_url FROM dataset_files WHERE dataset_id = ${datasetId}`,
+    sql`SELECT name, path, type, size, preview_data, summary, video_info, video_url, oss_url FROM dataset_files WHERE dataset_id = ${datasetId}`,
   ]);
 
   return {
@@ -100,6 +102,8 @@ async function getDatasetRelations(datasetId: string) {
       type: f.type as DatasetFile["type"],
       size: f.size || "",
       previewData: f.preview_data as DatasetFile["previewData"],
+      summary: f.summary as DatasetFile["summary"],
+      videoInfo: f.video_info as DatasetFile["videoInfo"],
       videoUrl: f.video_url || undefined,
       ossUrl: f.oss_url || undefined,
     })),
@@ -145,38 +149,103 @@ function mapDbToDataset(
 }
 
 export async function getAllDatasets(): Promise<Dataset[]> {
+  const { items } = await listDatasets();
+  return items as Dataset[];
+}
+
+// Cursors are opaque to clients: base64url of [updatedAt, id] of the last item
+function encodeListCursor(dataset: Dataset): string {
+  return Buffer.from(JSON.stringify([dataset.updatedAt, dataset.id])).toString("base64url");
+}
+
+function decodeListCursor(cursor: string): [string, string] | null {
+  try {
+    const value = JSON.parse(Buffer.from(cursor, "base64url").toString("utf-8"));
+    return Array.isArray(value) && value.length === 2 ? [String(value[0]), String(value[1])] : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * List datasets, newest first, with optional filters, field projection and
+ * keyset pagination
+ * 
+ * @param options - Filters, fields, cursor and page size
+ */
+export async function listDatasets(options: DatasetListOptions = {}): Promise<DatasetListResponse> {
+  const { author, robotType, taskType, format, updatedSince, fields, limit } = options;
+  const cursor = options.cursor ? decodeListCursor(options.cursor) : null;
+  const wants = (field: keyof Dataset) => !fields || fields.includes(field);
+  // Fetch one extra row to know whether another page follows
+  const rowLimit = limit ? limit + 1 : null;
+
   const rows = await sql`
-    SELECT id, name, author, description, tags, downloads, 
+    SELECT id, name, author, description, tags, downloads,
            updated_at, size, license, dataset_format, robot_type, task_type,
            total_episodes, total_frames, fps, action_space_type,
            action_space_dimensions, action_space_description,
-           environment, simulation_framework, readme
+           environment, simulation_framework,
+           CASE WHEN ${wants("readme")} THEN readme END AS readme
     FROM datasets
-    ORDER BY updated_at DESC
+    WHERE (${author ?? null}::text IS NULL OR author = ${author ?? null})
+      AND (${robotType ?? null}::text IS NULL OR robot_type = ${robotType ?? null})
+      AND (${taskType ?? null}::text IS NULL OR task_type = ${taskType ?? null})
+      AND (${format ?? null}::text IS NULL OR dataset_format = ${format ?? null})
+      AND (${updatedSince ?? null}::date IS NULL OR updated_at >= ${updatedSince ?? null}::date)
+      AND (${cursor ? cursor[0] : null}::date IS NULL
+           OR updated_at < ${cursor ? cursor[0] : null}::date
+           OR (updated_at = ${cursor ? cursor[0] : null}::date AND id > ${cursor ? cursor[1] : null}))
+    ORDER BY updated_at DESC, id ASC
+    LIMIT ${rowLimit}
   `;
 
-  // Get observation types for all datasets
-  const datasetsWithRelations = await Promise.all(
-    (rows as DbDataset[]).map(async (row) => {
-      const observationTypes = await sql`
-        SELECT name, type, shape, description 
-        FROM observation_types 
-        WHERE dataset_id = ${row.id}
-      `;
-      return mapDbToDataset(row, {
-        observationTypes: (observationTypes as DbObservationType[]).map((o) => ({
-          name: o.name,
-          type: o.type as ObservationType["type"],
-          shape: o.shape || undefined,
-          description: o.description || undefined,
-        })),
-        episodes: [],
-        files: [],
+  const pageRows = (rows as DbDataset[]).slice(0, limit || rows.length);
+  const hasMore = limit ? rows.length > limit : false;
+
+  // Observation types for the whole page in one query
+  const observationTypes = new Map<string, ObservationType[]>();
+  if (wants("observationTypes") && pageRows.length > 0) {
+    const typeRows = await sql`
+      SELECT dataset_id, name, type, shape, description
+      FROM observation_types
+      WHERE dataset_id = ANY(${pageRows.map((row) => row.id)})
+    `;
+    for (const o of typeRows as (DbObservationType & { dataset_id: string })[]) {
+      const list = observationTypes.get(o.dataset_id) || [];
+      list.push({
+        name: o.name,
+        type: o.type as ObservationType["type"],
+        shape: o.shape || undefined,
+        description: o.description || undefined,
       });
+      observationTypes.set(o.dataset_id, list);
+    }
+  }
+
+  const datasets = pageRows.map((row) =>
+    mapDbToDataset(row, {
+      observationTypes: observationTypes.get(row.id) || [],
+      episodes: [],
+      files: [],
     })
   );
 
-  return datasetsWithRelations;
+  const items = fields
+    ? datasets.map((dataset) => {
+        const projected: Partial<Dataset> = { id: dataset.id };
+        for (const field of fields) {
+          (projected as Record<string, unknown>)[field] = dataset[field];
+        }
+        return projected;
+      })
+    : datasets;
+
+  return {
+    items,
+    hasMore,
+    nextCursor: hasMore ? encodeListCursor(datasets[datasets.length - 1]) : undefined,
+  };
 }
 
 export async function getDatasetById(id: string): Promise<Dataset | null> {
@@ -262,8 +331,8 @@ export async function createDataset(
   if (dataset.files && dataset.files.length > 0) {
     for (const file of dataset.files) {
       await sql`
-        INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, video_url, oss_url)
-        VALUES (${id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.videoUrl || null}, ${file.ossUrl || null})
+        INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, summary, video_info, video_url, oss_url)
+        VALUES (${id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.summary ? JSON.stringify(file.summary) : null}, ${file.videoInfo ? JSON.stringify(file.videoInfo) : null}, ${file.videoUrl || null}, ${file.ossUrl || null})
       `;
     }
   }
@@ -336,8 +405,8 @@ export async function updateDataset(
       await sql`DELETE FROM dataset_files WHERE dataset_id = ${id}`;
       for (const file of updates.files) {
         await sql`
-          INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, video_url, oss_url)
-          VALUES (${id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.videoUrl || null}, ${file.ossUrl || null})
+          INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, summary, video_info, video_url, oss_url)
+          VALUES (${id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.summary ? JSON.stringify(file.summary) : null}, ${file.videoInfo ? JSON.stringify(file.videoInfo) : null}, ${file.videoUrl || null}, ${file.ossUrl || null})
         `;
       }
     }
@@ -353,6 +422,50 @@ export async function deleteDataset(id: string): Promise<boolean> {
   return result.length > 0;
 }
 
+/**
+ * Add or replace dataset files by path, keeping all other files
+ * 
+ * @param datasetId - The dataset ID
+ * @param files - Files to add; existing files with the same path are replaced
+ */
+export async function upsertDatasetFiles(datasetId: string, files: DatasetFile[]): Promise<void> {
+  for (const file of files) {
+    await sql`DELETE FROM dataset_files WHERE dataset_id = ${datasetId} AND path = ${file.path}`;
+    await sql`
+      INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, summary, video_info, video_url, oss_url)
+      VALUES (${datasetId}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.summary ? JSON.stringify(file.summary) : null}, ${file.videoInfo ? JSON.stringify(file.videoInfo) : null}, ${file.videoUrl || null}, ${file.ossUrl || null})
+    `;
+  }
+}
+
+/**
+ * Update preview data and/or footer summaries of existing dataset files
+ * Fields that are not provided are left unchanged
+ * 
+ * @param datasetId - The dataset ID
+ * @param files - File paths with the metadata to set
+ * @returns Number of files that were updated
+ */
+export async function updateFileMetadata(
+  datasetId: string,
+  files: Pick<DatasetFile, "path" | "previewData" | "summary">[]
+): Promise<number> {
+  let updated = 0;
+  
+  for (const file of files) {
+    const result = await sql`
+      UPDATE dataset_files SET
+        preview_data = COALESCE(${file.previewData ? JSON.stringify(file.previewData) : null}::jsonb, preview_data),
+        summary = COALESCE(${file.summary ? JSON.stringify(file.summary) : null}::jsonb, summary)
+      WHERE dataset_id = ${datasetId} AND path = ${file.path}
+      RETURNING path
+    `;
+    updated += result.length;
+  }
+  
+  return updated;
+}
+
 /**
  * Get file tree for a dataset at a specific path
  * Supports pagination with cursor-based navigation
@@ -69,10 +69,28 @@ CREATE TABLE IF NOT EXISTS dataset_files (
     type VARCHAR(50) NOT NULL, -- 'parquet', 'json', 'mp4', 'other'
     size VARCHAR(50),
     preview_data JSONB, -- For parquet and json preview
+    summary JSONB, -- Parquet footer schema and column statistics
+    video_info JSONB, -- MP4 duration, format and keyframe offsets
     video_url VARCHAR(1000), -- For mp4 files
     oss_url VARCHAR(1000) -- COS download URL
 );
 
+-- Upload sessions for chunked upload-complete requests from the CLI
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    upload_id VARCHAR(64) PRIMARY KEY,
+    dataset_id VARCHAR(255) REFERENCES datasets(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finalized_at TIMESTAMP
+);
+
+-- Staged manifest chunks, removed once the upload is finalized
+CREATE TABLE IF NOT EXISTS upload_chunks (
+    upload_id VARCHAR(64) REFERENCES upload_sessions(upload_id) ON DELETE CASCADE,
+    chunk_index INTEGER NOT NULL,
+    files JSONB NOT NULL,
+    PRIMARY KEY (upload_id, chunk_index)
+);
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_datasets_dataset_format ON datasets(dataset_format);
 CREATE INDEX IF NOT EXISTS idx_datasets_robot_type ON datasets(robot_type);
@@ -83,6 +101,13 @@ CREATE INDEX IF NOT EXISTS idx_datasets_downloads ON datasets(downloads DESC);
 CREATE INDEX IF NOT EXISTS idx_observation_types_dataset_id ON observation_types(dataset_id);
 CREATE INDEX IF NOT EXISTS idx_episode_previews_dataset_id ON episode_previews(dataset_id);
 CREATE INDEX IF NOT EXISTS idx_dataset_files_dataset_id ON dataset_files(dataset_id);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_dataset_id ON upload_sessions(dataset_id);
+
+-- Migration: Add parquet summary column (run manually on existing databases)
+-- ALTER TABLE dataset_files ADD COLUMN IF NOT EXISTS summary JSONB;
+
+-- Migration: Add video info column (run manually on existing databases)
+-- ALTER TABLE dataset_files ADD COLUMN IF NOT EXISTS video_info JSONB;
 
 -- Migration: Remove git columns if they exist (run manually if needed)
 -- ALTER TABLE datasets DROP COLUMN IF EXISTS repo_url;
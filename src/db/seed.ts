@@ -16,6 +16,8 @@ const sql = neon(DATABASE_URL);
 
 async function dropTables() {
   console.log("Dropping existing tables...");
+  await sql`DROP TABLE IF EXISTS upload_chunks CASCADE`;
+  await sql`DROP TABLE IF EXISTS upload_sessions CASCADE`;
   await sql`DROP TABLE IF EXISTS dataset_files CASCADE`;
   await sql`DROP TABLE IF EXISTS episode_previews CASCADE`;
   await sql`DROP TABLE IF EXISTS observation_types CASCADE`;
@@ -90,11 +92,31 @@ async function createTables() {
       type VARCHAR(50) NOT NULL,
       size VARCHAR(50),
       preview_data JSONB,
+      summary JSONB,
+      video_info JSONB,
       video_url VARCHAR(1000),
       oss_url VARCHAR(1000)
     )
   `;
 
+  await sql`
+    CREATE TABLE IF NOT EXISTS upload_sessions (
+      upload_id VARCHAR(64) PRIMARY KEY,
+      dataset_id VARCHAR(255) REFERENCES datasets(id) ON DELETE CASCADE,
+      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      finalized_at TIMESTAMP
+    )
+  `;
+
+  await sql`
+    CREATE TABLE IF NOT EXISTS upload_chunks (
+      upload_id VARCHAR(64) REFERENCES upload_sessions(upload_id) ON DELETE CASCADE,
+      chunk_index INTEGER NOT NULL,
+      files JSONB NOT NULL,
+      PRIMARY KEY (upload_id, chunk_index)
+    )
+  `;
+
   // Create indexes
   await sql`CREATE INDEX IF NOT EXISTS idx_datasets_dataset_format ON datasets(dataset_format)`;
   await sql`CREATE INDEX IF NOT EXISTS idx_datasets_robot_type ON datasets(robot_type)`;
@@ -105,6 +127,7 @@ async function createTables() {
   await sql`CREATE INDEX IF NOT EXISTS idx_observation_types_dataset_id ON observation_types(dataset_id)`;
   await sql`CREATE INDEX IF NOT EXISTS idx_episode_previews_dataset_id ON episode_previews(dataset_id)`;
   await sql`CREATE INDEX IF NOT EXISTS idx_dataset_files_dataset_id ON dataset_files(dataset_id)`;
+  await sql`CREATE INDEX IF NOT EXISTS idx_upload_sessions_dataset_id ON upload_sessions(dataset_id)`;
 
   console.log("Tables created successfully!");
 }
@@ -171,8 +194,8 @@ async function seedData() {
     if (dataset.files) {
       for (const file of dataset.files) {
         await sql`
-          INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, video_url)
-          VALUES (${dataset.id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.videoUrl || null})
+          INSERT INTO dataset_files (dataset_id, name, path, type, size, preview_data, summary, video_info, video_url)
+          VALUES (${dataset.id}, ${file.name}, ${file.path}, ${file.type}, ${file.size || null}, ${file.previewData ? JSON.stringify(file.previewData) : null}, ${file.summary ? JSON.stringify(file.summary) : null}, ${file.videoInfo ? JSON.stringify(file.videoInfo) : null}, ${file.videoUrl || null})
         `;
       }
     }
@@ -0,0 +1,84 @@
+import { sql } from "./index";
+
+export interface UploadSession {
+  uploadId: string;
+  datasetId: string;
+  finalizedAt: string | null;
+}
+
+interface DbUploadSession {
+  upload_id: string;
+  dataset_id: string;
+  finalized_at: string | null;
+}
+
+export async function getUploadSession(uploadId: string): Promise<UploadSession | null> {
+  const rows = await sql`
+    SELECT upload_id, dataset_id, finalized_at
+    FROM upload_sessions
+    WHERE upload_id = ${uploadId}
+  `;
+
+  if (rows.length === 0) return null;
+
+  const row = rows[0] as DbUploadSession;
+  return {
+    uploadId: row.upload_id,
+    datasetId: row.dataset_id,
+    finalizedAt: row.finalized_at,
+  };
+}
+
+/**
+ * Stage one chunk of an upload manifest.
+ * Re-sending the same chunk index replaces the previous copy, so retries are safe.
+ */
+export async function stageUploadChunk(
+  uploadId: string,
+  datasetId: string,
+  chunkIndex: number,
+  files: unknown[]
+): Promise<void> {
+  await sql`
+    INSERT INTO upload_sessions (upload_id, dataset_id)
+    VALUES (${uploadId}, ${datasetId})
+    ON CONFLICT (upload_id) DO NOTHING
+  `;
+
+  await sql`
+    INSERT INTO upload_chunks (upload_id, chunk_index, files)
+    VALUES (${uploadId}, ${chunkIndex}, ${JSON.stringify(files)})
+    ON CONFLICT (upload_id, chunk_index) DO UPDATE SET files = EXCLUDED.files
+  `;
+}
+
+/**
+ * Get the staged chunks of an upload, ordered by chunk index
+ */
+export async function getStagedChunks(
+  uploadId: string
+): Promise<{ chunkIndex: number; files: unknown[] }[]> {
+  const rows = await sql`
+    SELECT chunk_index, files
+    FROM upload_chunks
+    WHERE upload_id = ${uploadId}
+    ORDER BY chunk_index
+  `;
+
+  return (rows as { chunk_index: number; files: unknown[] }[]).map((row) => ({
+    chunkIndex: Number(row.chunk_index),
+    files: row.files,
+  }));
+}
+
+/**
+ * Mark an upload as finalized and drop its staged chunks
+ */
+export async function finalizeUploadSession(uploadId: string, datasetId: string): Promise<void> {
+  await sql`
+    INSERT INTO upload_sessions (upload_id, dataset_id, finalized_at)
+    VALUES (${uploadId}, ${datasetId}, CURRENT_TIMESTAMP)
+    ON CONFLICT (upload_id) DO UPDATE SET finalized_at = CURRENT_TIMESTAMP
+  `;
+  await sql`DELETE FROM upload_chunks WHERE upload_id = ${uploadId}`;
+}
@@ -1,5 +1,6 @@
 import { S3Client, PutObjectCommand, GetObjectCommand, ListObjectsV2Command, DeleteObjectsCommand } from "@aws-sdk/client-s3";
 import { getSignedUrl } from "@aws-sdk/s3-request-presigner";
+import zlib from "zlib";
 
 // Tencent Cloud COS Configuration (S3-compatible)
 const COS_REGION = process.env.COS_REGION || "ap-shanghai";
@@ -86,8 +87,30 @@ export async function getFileContent(key: string): Promise<string> {
   });
 
   const response = await s3Client.send(command);
-  const body = await response.Body?.transformToString();
-  return body || "";
+  const body = await response.Body?.transformToByteArray();
+  return body ? decodeBody(body, response.ContentEncoding) : "";
+}
+
+/**
+ * Decode an object body to text, undoing the Content-Encoding set by
+ * `datahub upload --compress`. Bodies cut off by a range request are
+ * decoded as far as they go.
+ */
+function decodeBody(body: Uint8Array, contentEncoding?: string): string {
+  const buffer = Buffer.from(body);
+  const encoding = (contentEncoding || "").trim().toLowerCase();
+  if (encoding === "gzip") {
+    return zlib.gunzipSync(buffer, { finishFlush: zlib.constants.Z_SYNC_FLUSH }).toString("utf-8");
+  }
+  if (encoding === "zstd") {
+    // zstd is only built into newer Node releases
+    const zstdDecompressSync = (zlib as unknown as { zstdDecompressSync?: (buf: Buffer, opts?: object) => Buffer }).zstdDecompressSync;
+    if (!zstdDecompressSync) {
+      throw new Error("zstd-encoded objects require a Node.js release with zstd support");
+    }
+    return zstdDecompressSync(buffer, { finishFlush: zlib.constants.Z_SYNC_FLUSH }).toString("utf-8");
+  }
+  return buffer.toString("utf-8");
 }
 
 /**
@@ -119,16 +142,8 @@ export async function deleteDatasetFiles(datasetId: string): Promise<void> {
   await deleteFiles(files);
 }
 
-/**
- * Calculate human-readable file size
- */
-export function formatFileSize(bytes: number): string {
-  if (bytes === 0) return "0 B";
-  const k = 1024;
-  const sizes = ["B", "KB", "MB", "GB", "TB"];
-  const i = Math.floor(Math.log(bytes) / Math.log(k));
-  return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + " " + sizes[i];
-}
+// Re-exported so existing server imports keep working
+export { formatFileSize } from "@/lib/utils";
 
 /**
  * Get file type from extension
@@ -170,10 +185,10 @@ export async function getFileContentWithLimit(key: string, maxBytes: number = 10
 
   const response = await s3Client.send(command);
   const contentLength = response.ContentLength || 0;
-  const body = await response.Body?.transformToString();
+  const body = await response.Body?.transformToByteArray();
   
   return {
-    content: body || "",
+    content: body ? decodeBody(body, response.ContentEncoding) : "",
     truncated: contentLength >= maxBytes,
   };
 }
@@ -0,0 +1,36 @@
+import { ColumnarParquetPreview, ParquetPreview } from "@/types/dataset";
+
+function isColumnarPreview(data: unknown): data is ColumnarParquetPreview {
+  return (
+    typeof data === "object" &&
+    data !== null &&
+    (data as ColumnarParquetPreview).encoding === "columnar"
+  );
+}
+
+/**
+ * Convert stored parquet preview data to the row-oriented form used by the UI.
+ * The CLI uploads previews column-oriented to avoid repeating column names
+ * in every row; older uploads are already row-oriented and pass through.
+ */
+export function toRowPreview(data: unknown): ParquetPreview | null {
+  if (!data) return null;
+  if (!isColumnarPreview(data)) return data as ParquetPreview;
+
+  const rowCount = data.columnData.reduce((max, values) => Math.max(max, values.length), 0);
+  const rows: Record<string, unknown>[] = [];
+
+  for (let i = 0; i < rowCount; i++) {
+    const row: Record<string, unknown> = {};
+    data.columns.forEach((column, j) => {
+      row[column] = data.columnData[j]?.[i] ?? null;
+    });
+    rows.push(row);
+  }
+
+  return {
+    columns: data.columns,
+    rows,
+    totalRows: data.totalRows,
+  };
+}
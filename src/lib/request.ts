@@ -0,0 +1,39 @@
+import { createHash } from "crypto";
+import { gunzipSync } from "zlib";
+import { NextRequest, NextResponse } from "next/server";
+
+/**
+ * Parse a JSON request body, decompressing it first when the client sent
+ * it with `Content-Encoding: gzip` (used by the CLI for large manifests).
+ */
+export async function readJsonBody<T = unknown>(request: NextRequest): Promise<T> {
+  const encoding = request.headers.get("content-encoding");
+
+  if (encoding === "gzip") {
+    const buffer = Buffer.from(await request.arrayBuffer());
+    return JSON.parse(gunzipSync(buffer).toString("utf-8")) as T;
+  }
+
+  return (await request.json()) as T;
+}
+
+/**
+ * Build a JSON response with a weak ETag of its body. When the request's
+ * `If-None-Match` already names that ETag, an empty 304 is returned instead,
+ * so clients that cache responses (the CLI) only revalidate them.
+ */
+export function jsonWithETag(request: NextRequest, data: unknown): NextResponse {
+  const body = JSON.stringify(data);
+  const etag = `W/"${createHash("sha1").update(body).digest("base64url")}"`;
+  const headers = { ETag: etag, "Cache-Control": "no-cache" };
+
+  const ifNoneMatch = request.headers.get("if-none-match");
+  if (ifNoneMatch && ifNoneMatch.split(",").some((tag) => tag.trim() === etag)) {
+    return new NextResponse(null, { status: 304, headers });
+  }
+
+  return new NextResponse(body, {
+    status: 200,
+    headers: { ...headers, "Content-Type": "application/json" },
+  });
+}
@@ -74,7 +74,11 @@ export interface DatasetFile {
   type: FileType;
   size: string;
   // Preview content (for parquet and json)
-  previewData?: ParquetPreview | JsonPreview | null;
+  previewData?: ParquetPreview | ColumnarParquetPreview | JsonPreview | null;
+  // Footer-derived schema and column statistics (for parquet)
+  summary?: ParquetSummary | null;
+  // Container index from the moov box (for mp4)
+  videoInfo?: VideoInfo | null;
   // Video URL (for mp4)
   videoUrl?: string;
   // COS download URL
@@ -96,7 +100,9 @@ export interface FilePreviewResponse {
   type: FileType;
   content?: string; // For json, md files
   parquetPreview?: ParquetPreview; // For parquet files
+  parquetSummary?: ParquetSummary; // For parquet files
   videoUrl?: string; // For mp4 files
+  videoInfo?: VideoInfo; // For mp4 files
   truncated?: boolean; // Whether content was truncated
   error?: string;
 }
@@ -108,12 +114,80 @@ export interface FileTreeResponse {
   totalCount: number;
 }
 
+export interface DatasetListOptions {
+  author?: string;
+  robotType?: string;
+  taskType?: string;
+  format?: Dataset["datasetFormat"];
+  // Only datasets updated on or after this date (YYYY-MM-DD)
+  updatedSince?: string;
+  // Only return these fields (id is always included)
+  fields?: (keyof Dataset)[];
+  // Cursor from a previous page's nextCursor
+  cursor?: string;
+  // Page size; all matching datasets are returned when omitted
+  limit?: number;
+}
+
+export interface DatasetListResponse {
+  items: Partial<Dataset>[];
+  hasMore: boolean;
+  nextCursor?: string;
+}
+
 export interface ParquetPreview {
   columns: string[];
   rows: Record<string, unknown>[];
   totalRows: number;
 }
 
+// Column-oriented parquet preview as uploaded by the CLI
+export interface ColumnarParquetPreview {
+  encoding: "columnar";
+  columns: string[];
+  columnData: unknown[][];
+  totalRows: number;
+}
+
+export interface ParquetColumnSummary {
+  name: string;
+  physicalType: string;
+  compression: string;
+  compressedSize: number;
+  uncompressedSize: number;
+  nullCount: number | null;
+  min: unknown;
+  max: unknown;
+}
+
+export interface ParquetSummary {
+  numRows: number;
+  numRowGroups: number;
+  compressedSize: number;
+  uncompressedSize: number;
+  createdBy?: string;
+  schema: { name: string; type: string; nullable: boolean }[];
+  columns: ParquetColumnSummary[];
+}
+
+export interface VideoInfo {
+  duration?: number | null; // Seconds
+  fps?: number | null;
+  frames?: number;
+  width?: number | null;
+  height?: number | null;
+  codec?: string; // RFC 6381 codec string where known (avc1.64001f), else the sample entry type
+  // Whether the moov box precedes the media data, so playback can start
+  // after one small range request
+  faststart: boolean;
+  moovOffset: number;
+  moovSize: number;
+  keyframeCount?: number;
+  // [sample number (0-based), media time in seconds, byte offset], thinned
+  // out evenly for long videos
+  keyframes?: [number, number, number][];
+}
+
 export interface JsonPreview {
   content: Record<string, unknown> | unknown[];
   truncated: boolean;